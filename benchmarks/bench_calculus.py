@@ -0,0 +1,95 @@
+"""
+Benchmark: numeric integration and differentiation
+
+Integrates standard test functions with known integrals (smooth, periodic
+over many cycles, an endpoint singularity, a sharp peak) with calc_calculus
+and reports the time, the number of function evaluations, the true error and
+the estimated one (after checking that integrals over a non-integrable
+singularity raise instead). Then differentiates an expression at many
+points at once.
+For comparison, the scalar engine is timed evaluating the same number of
+points one call at a time, the cost of any quadrature rule without batching.
+
+Usage:
+    python benchmarks/bench_calculus.py [repeats] [points]
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import calc_calculus
+import calc_engine
+
+# expression, interval, degree mode, exact integral
+INTEGRALS = [
+    ("x² - ln(x)", 1, 2, False, 7 / 3 - (2 * math.log(2) - 1)),
+    ("sin(x)", 0, 180, True, 360 / math.pi),
+    ("sin(x)^2", 0, 100, False, 50 - math.sin(200) / 4),
+    ("1/√x", 0, 1, False, 2.0),
+    ("1/(1 + 10000*x^2)", -1, 1, False, 2 * math.atan(100) / 100),
+]
+# expression, interval: integrals that do not converge
+DIVERGENT = [("1/x", -1, 1), ("1/x^2", 0, 1), ("1/(x - 0.3)", 0, 1)]
+DERIVATIVE = "sin(x) * x^2"
+
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def scalar_seconds(expression, low, high, is_degree, count):
+    """Time to evaluate count points of an expression with the scalar engine"""
+    compiled, unknown = calc_calculus.parse_expression(expression)
+    start = time.perf_counter()
+    for x in np.linspace(low, high, count + 2)[1:-1].tolist():
+        calc_engine.evaluate(compiled, is_degree, **{unknown: x})
+    return time.perf_counter() - start
+
+
+def check_divergent():
+    for expression, low, high in DIVERGENT:
+        try:
+            result = calc_calculus.integrate(expression, low, high, False)
+        except calc_engine.CalculationError:
+            continue
+        raise AssertionError(f"∫ {expression} over [{low:g}, {high:g}] returned {result}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    check_divergent()
+    print(f"{'integral':28}{'ms':>8}{'evals':>8}{'true error':>12}{'estimate':>11}"
+          f"{'scalar ms':>11}{'speedup':>9}")
+    for expression, low, high, is_degree, exact in INTEGRALS:
+        result, seconds = timed(lambda: calc_calculus.integrate(expression, low, high, is_degree),
+                                repeats)
+        scalar = scalar_seconds(expression, low, high, is_degree, result.evaluations)
+        name = f"{expression} [{low:g}, {high:g}]"
+        print(f"{name:28}{seconds * 1e3:8.2f}{result.evaluations:8d}"
+              f"{abs(result.value - exact):12.1e}{result.error:11.1e}"
+              f"{scalar * 1e3:11.1f}{scalar / seconds:8.1f}x")
+
+    print()
+    xs = np.linspace(-100, 100, points)
+    derivative, seconds = timed(lambda: calc_calculus.differentiate(DERIVATIVE, xs, False), repeats)
+    exact = np.cos(xs) * xs ** 2 + 2 * xs * np.sin(xs)
+    scalar = scalar_seconds(DERIVATIVE, -100, 100, False, 2 * calc_calculus.STEPS * points)
+    print(f"d/dx {DERIVATIVE} at {points} points: {seconds * 1e3:.1f} ms "
+          f"({points / seconds:,.0f} points/s)")
+    print(f"  max true error {np.max(np.abs(derivative.value - exact)):.1e}, "
+          f"max estimate {np.max(derivative.error):.1e}")
+    print(f"  scalar engine, same evaluations: {scalar * 1e3:.1f} ms ({scalar / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: registry dispatch vs. the original if/elif chains
+
+Times dispatching every scientific function (15 buttons) and basic operator
+(6) through calc_engine.REGISTRY and through a copy of the string-comparison
+chains the GUI used before the registry existed. Both sides call the same
+math, so the difference is the dispatch overhead.
+
+Usage:
+    python benchmarks/bench_dispatch.py [iterations]
+"""
+
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_engine
+
+SCIENTIFIC = ['sin', 'cos', 'tan', 'x^y', '√', 'ln', 'log', '∛', 'x²', '|x|',
+              'n!', '%', '+/-', 'mod', 'π']
+BASIC = ['+', '-', '*', '/', '%', '**']
+
+
+def chain_scientific(func, num, is_degree):
+    """The pre-registry handle_scientific dispatch"""
+    if func == 'π':
+        return math.pi
+    if func == 'mod':
+        return None
+    if func == 'x^y':
+        return None
+    if func == 'sin':
+        return math.sin(math.radians(num) if is_degree else num)
+    elif func == 'cos':
+        return math.cos(math.radians(num) if is_degree else num)
+    elif func == 'tan':
+        return math.tan(math.radians(num) if is_degree else num)
+    elif func == '√':
+        return math.sqrt(num)
+    elif func == '∛':
+        return num ** (1/3)
+    elif func == 'ln':
+        return math.log(num)
+    elif func == 'log':
+        return math.log10(num)
+    elif func == 'x²':
+        return num ** 2
+    elif func == '|x|':
+        return abs(num)
+    elif func == 'n!':
+        return math.factorial(int(num))
+    elif func == '%':
+        return num / 100
+    elif func == '+/-':
+        return -num
+
+
+def chain_operator(operator, num1, num2):
+    """The pre-registry calculate dispatch"""
+    if operator == '+':
+        return num1 + num2
+    elif operator == '-':
+        return num1 - num2
+    elif operator == '*':
+        return num1 * num2
+    elif operator == '/':
+        return num1 / num2
+    elif operator == '%':
+        return num1 % num2
+    elif operator == '**':
+        return num1 ** num2
+    return num2
+
+
+# The GUI handles π, mod and x^y as input actions, not registry functions
+SPECIAL = {'π': lambda: math.pi, 'mod': lambda: None, 'x^y': lambda: None}
+
+
+FUNCTION_CALLS = calc_engine.REGISTRY.function_calls
+OPERATOR_CALLS = calc_engine.REGISTRY.operator_calls
+
+
+def registry_scientific(func, num, is_degree):
+    action = SPECIAL.get(func)
+    if action is not None:
+        return action()
+    return FUNCTION_CALLS[func](num, is_degree)
+
+
+def registry_operator(operator, num1, num2):
+    return OPERATOR_CALLS[operator](num1, num2)
+
+
+def chain_select(label):
+    """Branch selection alone, as the old chains did it"""
+    if label == 'sin':
+        return 0
+    elif label == 'cos':
+        return 1
+    elif label == 'tan':
+        return 2
+    elif label == 'x^y':
+        return 3
+    elif label == '√':
+        return 4
+    elif label == 'ln':
+        return 5
+    elif label == 'log':
+        return 6
+    elif label == '∛':
+        return 7
+    elif label == 'x²':
+        return 8
+    elif label == '|x|':
+        return 9
+    elif label == 'n!':
+        return 10
+    elif label == '%':
+        return 11
+    elif label == '+/-':
+        return 12
+    elif label == 'mod':
+        return 13
+    elif label == 'π':
+        return 14
+
+
+SELECT_TABLE = {label: position for position, label in enumerate(SCIENTIFIC)}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    num = 7.0
+
+    print(f"{'label':>6} {'chain (ns)':>11} {'registry (ns)':>14}")
+    rows = [(label, chain_scientific, registry_scientific, (label, num, True))
+            for label in SCIENTIFIC]
+    rows += [(label, chain_operator, registry_operator, (label, num, 3.0))
+             for label in BASIC]
+    chain_total = registry_total = 0.0
+    for label, chain, registry, args in rows:
+        chain_ns = min(timeit.repeat(lambda: chain(*args), number=iterations, repeat=3)) / iterations * 1e9
+        registry_ns = min(timeit.repeat(lambda: registry(*args), number=iterations, repeat=3)) / iterations * 1e9
+        chain_total += chain_ns
+        registry_total += registry_ns
+        print(f"{label:>6} {chain_ns:11.1f} {registry_ns:14.1f}")
+    print(f"{'mean':>6} {chain_total / len(rows):11.1f} {registry_total / len(rows):14.1f}")
+
+    # Branch selection alone (no math), averaged over all 15 labels
+    select_table = SELECT_TABLE.get
+    chain_ns = table_ns = 0.0
+    for label in SCIENTIFIC:
+        chain_ns += min(timeit.repeat(lambda: chain_select(label), number=iterations, repeat=3))
+        table_ns += min(timeit.repeat(lambda: select_table(label), number=iterations, repeat=3))
+    scale = 1e9 / iterations / len(SCIENTIFIC)
+    print(f"\nbranch selection, mean over {len(SCIENTIFIC)} labels: "
+          f"chain {chain_ns * scale:.1f} ns, dict {table_ns * scale:.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
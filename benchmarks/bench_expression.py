@@ -0,0 +1,100 @@
+"""
+Benchmark: live preview cost per keystroke vs. expression length
+
+Types random expressions of growing length into an ExpressionBuffer and
+times each keystroke plus its preview(), against re-parsing and evaluating
+the whole text with calc_engine after every keystroke. The incremental cost
+should stay flat as expressions grow; re-parsing grows linearly.
+
+First checks that compile() leaves heavy constant steps such as 1000000!
+unfolded, so compiling them returns at once.
+
+Usage:
+    python benchmarks/bench_expression.py [expressions per length]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_engine
+import calc_expression
+
+LENGTHS = [5, 50, 500]
+OPERATORS = ['+', '-', '*', '/', '**']
+# Constant expressions too costly to fold at compile time
+HEAVY_CONSTANTS = ['1000000!', 'fact(250000) + 1', '(30000!)/2']
+
+
+def random_keys(operands, rng):
+    """Keystrokes of a random expression with parentheses and unary minus"""
+    keys, depth = [], 0
+    for i in range(operands):
+        if rng.random() < 0.2:
+            keys.append(('open',))
+            depth += 1
+        if rng.random() < 0.1:
+            keys.append(('operator', '-'))
+        keys.extend(('digit', char) for char in str(rng.randint(1, 99)))
+        if depth and rng.random() < 0.2:
+            keys.append(('close',))
+            depth -= 1
+        if i < operands - 1:
+            # Keep powers small so the values stay finite
+            keys.append(('operator', rng.choice(OPERATORS) if rng.random() < 0.9 else '+'))
+    return keys
+
+
+def time_incremental(keys):
+    buffer = calc_expression.ExpressionBuffer()
+    start = time.perf_counter()
+    for key in keys:
+        getattr(buffer, key[0])(*key[1:])
+        buffer.preview()
+    return time.perf_counter() - start
+
+
+def time_reparse(keys):
+    buffer = calc_expression.ExpressionBuffer()
+    texts = []
+    for key in keys:
+        getattr(buffer, key[0])(*key[1:])
+        texts.append(buffer.finished_text)
+    start = time.perf_counter()
+    for text in texts:
+        try:
+            calc_engine.evaluate(text)
+        except calc_engine.CalculationError:
+            pass
+    return time.perf_counter() - start
+
+
+def check_heavy_fold():
+    """compile() leaves heavy constant steps unfolded and returns at once"""
+    for text in HEAVY_CONSTANTS:
+        start = time.perf_counter()
+        compiled = calc_engine.compile(text)
+        elapsed = time.perf_counter() - start
+        if compiled.tree[0] == 'num' or elapsed > 0.1:
+            raise AssertionError(f"compile({text!r}) folded a heavy step ({elapsed:.2f} s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = random.Random(0)
+
+    check_heavy_fold()
+    print(f"{'operands':>9}{'keys':>8}{'incremental us/key':>20}{'re-parse us/key':>17}{'speedup':>9}")
+    for operands in LENGTHS:
+        expressions = [random_keys(operands, rng) for _ in range(count)]
+        keys = sum(len(e) for e in expressions)
+        incremental = sum(time_incremental(e) for e in expressions) / keys * 1e6
+        reparse = sum(time_reparse(e) for e in expressions) / keys * 1e6
+        print(f"{operands:9d}{keys // count:8d}{incremental:20.1f}{reparse:17.1f}{reparse / incremental:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: parallel batch evaluator scaling
+
+Evaluates a mixed workload of cheap (+, *) and expensive (n!, big powers)
+expressions with calc_parallel.evaluate_parallel for 1..N workers, checks
+that every run returns the same results in the same order, and prints the
+throughput and speedup per worker count.
+
+Usage:
+    python benchmarks/bench_parallel.py [expressions] [max_workers] [chunk_size]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_parallel
+
+
+def workload(count, seed=0):
+    rng = random.Random(seed)
+    expressions = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.90:
+            expressions.append(f"{rng.uniform(-1e3, 1e3):.4f} + {rng.uniform(-1e3, 1e3):.4f}")
+        elif kind < 0.97:
+            expressions.append(f"sin({rng.randint(0, 720)}) * {rng.randint(1, 99)}")
+        elif kind < 0.995:
+            expressions.append(f"{rng.randint(300, 3000)}!")
+        else:
+            expressions.append(f"1.0001 ^ {rng.randint(1000, 5000000)}")
+    return expressions
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else calc_parallel.DEFAULT_CHUNK_SIZE
+    expressions = workload(count)
+
+    print(f"{count} expressions, chunk size {chunk_size}")
+    print(f"{'workers':>7} {'seconds':>9} {'expr/s':>10} {'speedup':>8}")
+    baseline = reference = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        results = list(calc_parallel.evaluate_parallel(expressions, workers, chunk_size))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference, baseline = results, elapsed
+        elif results != reference:
+            raise AssertionError(f"{workers} workers returned different or reordered results")
+        print(f"{workers:>7} {elapsed:9.2f} {count / elapsed:10,.0f} {baseline / elapsed:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: cost of the precision modes
+
+Times a set of expressions in float mode (the normal engine), decimal mode at
+a few digit counts and exact (Fraction) mode, and prints the microseconds per
+evaluation plus the slowdown against float.
+
+Usage:
+    python benchmarks/bench_precision.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_precision
+
+EXPRESSIONS = [
+    '0.1 + 0.2',
+    '1 / 3 * 3',
+    '2 ** 64 - 1',
+    '√2',
+    'ln(10)',
+    'sin(30) + cos(45)',
+    'sin(1.2345)',
+    '20!',
+]
+
+# (label, mode, precision)
+MODES = [
+    ('float', 'float', calc_precision.DEFAULT_PRECISION),
+    ('dec 15', 'decimal', 15),
+    ('dec 28', 'decimal', 28),
+    ('dec 50', 'decimal', 50),
+    ('dec 100', 'decimal', 100),
+    ('exact', 'exact', calc_precision.DEFAULT_PRECISION),
+]
+
+
+def time_expression(expr, mode, precision, iterations):
+    """Microseconds per evaluation (best of 3)"""
+    calc_precision.evaluate(expr, mode, precision)
+    seconds = min(timeit.repeat(lambda: calc_precision.evaluate(expr, mode, precision),
+                                number=iterations, repeat=3))
+    return seconds / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print(f"{'expression':>18}" + ''.join(f"{label:>10}" for label, _, _ in MODES))
+    totals = [0.0] * len(MODES)
+    for expr in EXPRESSIONS:
+        row = []
+        for i, (_, mode, precision) in enumerate(MODES):
+            us = time_expression(expr, mode, precision, iterations)
+            totals[i] += us
+            row.append(us)
+        print(f"{expr:>18}" + ''.join(f"{us:10.1f}" for us in row))
+
+    print(f"{'slowdown vs float':>18}" + ''.join(f"{total / totals[0]:9.1f}x" for total in totals))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark: calculation service load test
+
+Starts calc_server.py on a free localhost port (or uses a running one given
+with --port) and sends /eval requests from several keep-alive connections,
+each keeping --pipeline requests in flight. Prints requests per second and
+the latency distribution (p50/p99/p99.9/max). With --heavy, that fraction of
+the requests are big exact powers, which the service hands to its process
+pool; the light requests' tail latency shows whether the event loop stalls.
+Before the load, checks that a request over calc_server.MAX_DIGITS digits is
+refused with 400 and that a high-digit one is answered off the event loop.
+
+Usage:
+    python benchmarks/bench_server.py [--requests 20000] [--connections 16]
+                                      [--pipeline 1] [--heavy 0.0] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calc_server
+import calc_worker
+
+# Light request answered while a high-digit one is computed, and how long it may take
+PROBE = {'expr': "1 + 1"}
+PROBE_SECONDS = 0.5
+
+
+def workload(count, heavy, seed=0):
+    """Request bodies: mostly light expressions and scientific functions"""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < heavy:
+            requests.append({'expr': f"3 ** {rng.randint(3_000_000, 4_000_000)}", 'precision': 'exact'})
+        elif kind < 0.7:
+            requests.append({'expr': f"{rng.uniform(-1e3, 1e3):.4f} * ({rng.randint(1, 99)} + sin({rng.randint(0, 720)}))"})
+        elif kind < 0.9:
+            requests.append({'func': rng.choice(['sin', 'cos', 'ln', '√', 'n!']), 'operand': rng.randint(1, 150)})
+        else:
+            requests.append({'expr': f"1/{rng.randint(1, 99)} + 0.1", 'precision': 'decimal'})
+    return requests
+
+
+def encode(body):
+    data = json.dumps(body).encode()
+    return (b"POST /eval HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(data)) + data
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def connection(port, requests, pipeline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    sent = asyncio.Queue(pipeline)
+
+    async def send():
+        for request in requests:
+            await sent.put(time.perf_counter())
+            writer.write(request)
+            await writer.drain()
+
+    sender = asyncio.ensure_future(send())
+    for _ in requests:
+        status, body = await read_response(reader)
+        latencies.append(time.perf_counter() - sent.get_nowait())
+        if status != 200:
+            errors.append(body)
+    await sender
+    writer.close()
+
+
+async def load(port, requests, connections, pipeline):
+    latencies, errors = [], []
+    shards = [requests[i::connections] for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(port, shard, pipeline, latencies, errors)
+                           for shard in shards if shard))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def request_once(port, body):
+    """(status, JSON payload) of one request on a new connection"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(encode(body))
+    await writer.drain()
+    status, data = await read_response(reader)
+    writer.close()
+    return status, json.loads(data)
+
+
+async def check_digits(port):
+    """Too many digits is a 400; a high-digit request does not stall the loop"""
+    expr = "sin(1) + ln(2)"
+    status, payload = await request_once(
+        port, {'expr': expr, 'precision': 'decimal', 'digits': calc_server.MAX_DIGITS + 1})
+    if status != 400:
+        raise AssertionError(f"digits above MAX_DIGITS answered {status}: {payload}")
+
+    digits = max(calc_server.MAX_DIGITS // 2, calc_worker.HEAVY_DIGITS + 1)
+    heavy = asyncio.ensure_future(
+        request_once(port, {'expr': expr, 'precision': 'decimal', 'digits': digits}))
+    await asyncio.sleep(0.1)
+    start = time.perf_counter()
+    status, payload = await request_once(port, PROBE)
+    seconds = time.perf_counter() - start
+    if status != 200 or seconds > PROBE_SECONDS:
+        raise AssertionError(f"light request took {seconds:.2f} s beside {digits} digits")
+    status, payload = await heavy
+    if status != 200 or payload['code'] != 0:
+        raise AssertionError(f"{digits}-digit request failed: {status} {payload}")
+
+
+def start_server(workers):
+    """calc_server.py on a free port; returns (process, port)"""
+    command = [sys.executable, os.path.join(ROOT, 'calc_server.py'), '--port', '0']
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Serving on "):
+        process.kill()
+        raise RuntimeError(f"server did not start: {line!r}")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the calculation service")
+    parser.add_argument('-n', '--requests', type=int, default=20000)
+    parser.add_argument('-c', '--connections', type=int, default=16)
+    parser.add_argument('-p', '--pipeline', type=int, default=1,
+                        help="requests in flight per connection")
+    parser.add_argument('--heavy', type=float, default=0.0,
+                        help="fraction of heavy (process pool) requests")
+    parser.add_argument('--port', type=int, help="use a running server on this port")
+    parser.add_argument('-j', '--workers', type=int, help="server worker processes")
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+    if port is None:
+        process, port = start_server(args.workers)
+    try:
+        asyncio.run(check_digits(port))
+        requests = [encode(body) for body in workload(args.requests, args.heavy)]
+        elapsed, latencies, errors = asyncio.run(
+            load(port, requests, args.connections, args.pipeline))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    ordered = sorted(latencies)
+    print(f"{len(ordered)} requests, {args.connections} connections, pipeline {args.pipeline}, "
+          f"heavy {args.heavy:.1%}")
+    print(f"{len(ordered) / elapsed:,.0f} requests/s over {elapsed:.2f} s, {len(errors)} errors")
+    print("latency ms: " + "  ".join(
+        f"{name} {percentile(ordered, fraction) * 1e3:.2f}"
+        for name, fraction in (('p50', 0.5), ('p99', 0.99), ('p99.9', 0.999), ('max', 1.0))))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
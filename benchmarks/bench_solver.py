@@ -0,0 +1,113 @@
+"""
+Benchmark: equation solver roots per second
+
+Solves standard test equations (many periodic roots in degrees, a log
+equation, tan(x) = x with its poles, a polynomial with five roots) with
+calc_solver and reports roots found, roots per second and the worst
+residual |f(root)|. For comparison the same grid is scanned point by point
+with the scalar engine and every sign change bisected, the way a plain
+Python solver would do it. First checks that roots far from the origin
+(distinct, but close relative to their magnitude) are all found.
+
+Usage:
+    python benchmarks/bench_solver.py [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_engine
+import calc_solver
+
+# equation, interval, degree mode, grid samples (tan(x) = x has a root
+# within 1/x of every pole, so it needs a finer grid)
+EQUATIONS = [
+    ("sin(x) = 0.3", -36000, 36000, True, calc_solver.DEFAULT_SAMPLES),
+    ("x² - ln(x) = 5", 0.001, 10, False, calc_solver.DEFAULT_SAMPLES),
+    ("tan(x) = x", -200, 200, False, 200_000),
+    ("cos(x) = x/1000", -1000, 1000, False, calc_solver.DEFAULT_SAMPLES),
+    ("x^5 - 5*x^3 + 4*x", -3, 3, False, calc_solver.DEFAULT_SAMPLES),
+]
+BISECTIONS = 60
+
+# equation, interval, degree mode, roots it has there
+FAR_ROOTS = [
+    ("sin(x)", 1e12, 1e12 + 1000, True, 6),
+    ("(x-1e12)*(x-1e12-5)", 1e12 - 10, 1e12 + 10, False, 2),
+    ("(x-1e15)*(x-1e15-3)", 1e15 - 10, 1e15 + 10, False, 2),
+]
+
+
+def scalar_solve(equation, low, high, is_degree, samples):
+    """Grid scan and bisection with the scalar engine"""
+    compiled, unknown = calc_solver.parse_equation(equation)
+
+    def f(x):
+        try:
+            return calc_engine.evaluate(compiled, is_degree, **{unknown: x})
+        except calc_engine.CalculationError:
+            return None
+
+    step = (high - low) / (samples - 1)
+    roots = []
+    previous_x, previous_y = low, f(low)
+    for i in range(1, samples):
+        x = low + i * step
+        y = f(x)
+        if previous_y is not None and y is not None and previous_y * y < 0:
+            a, fa, b = previous_x, previous_y, x
+            for _ in range(BISECTIONS):
+                middle = (a + b) / 2
+                fm = f(middle)
+                if fm is None:
+                    break
+                if (fm < 0) == (fa < 0):
+                    a, fa = middle, fm
+                else:
+                    b = middle
+            root = (a + b) / 2
+            # Skip poles, as calc_solver does
+            residual = f(root)
+            if residual is not None and abs(residual) <= min(abs(previous_y), abs(y)):
+                roots.append(root)
+        previous_x, previous_y = x, y
+    return roots
+
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def check_far_roots():
+    for equation, low, high, is_degree, count in FAR_ROOTS:
+        roots = calc_solver.solve(equation, low, high, is_degree)
+        if len(roots) != count:
+            raise AssertionError(f"{equation} on [{low:.15g}, {high:.15g}]: {roots}, expected {count} roots")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    check_far_roots()
+    print(f"{'equation':22}{'roots':>7}{'ms':>9}{'roots/s':>11}{'residual':>11}"
+          f"{'scalar ms':>11}{'speedup':>9}")
+    for equation, low, high, is_degree, samples in EQUATIONS:
+        compiled, unknown = calc_solver.parse_equation(equation)
+        roots, seconds = timed(lambda: calc_solver.solve(equation, low, high, is_degree, samples),
+                               repeats)
+        residual = max((abs(calc_engine.evaluate(compiled, is_degree, **{unknown: root}))
+                        for root in roots), default=0.0)
+        scalar_roots, scalar_seconds = timed(lambda: scalar_solve(equation, low, high, is_degree, samples), 1)
+        if len(scalar_roots) > len(roots):
+            raise AssertionError(f"{equation}: the scalar scan found more roots")
+        print(f"{equation:22}{len(roots):7d}{seconds * 1e3:9.2f}{len(roots) / seconds:11,.0f}"
+              f"{residual:11.1e}{scalar_seconds * 1e3:11.1f}{scalar_seconds / seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
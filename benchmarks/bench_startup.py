@@ -0,0 +1,104 @@
+"""
+Benchmark: calculator startup time
+
+Launches the calculator in a fresh interpreter under `python -X importtime`
+several times and reports:
+- time to first interactive frame (process spawn -> window mapped and idle)
+- the slowest imports by cumulative time, in -X importtime style
+
+Without a display the child cannot create a window; it then reports the time
+to import the calculator module only.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALCULATOR = os.path.join(ROOT, 'calculator V - 3.2.py')
+
+# Runs inside the child interpreter
+CHILD = r'''
+import importlib.util, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+spec = importlib.util.spec_from_file_location('calculator', {calculator!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+report = {{'import_ms': (imported - start) * 1000,
+           'plotting_loaded': 'matplotlib' in sys.modules}}
+try:
+    import tkinter as tk
+    root = tk.Tk()
+except Exception:
+    report['display'] = False
+else:
+    report['display'] = True
+    module.ScientificCalculator(root)
+    root.update()
+    root.wait_visibility()
+    root.update_idletasks()
+    report['ui_ms'] = (time.perf_counter() - imported) * 1000
+    root.destroy()
+print(json.dumps(report), flush=True)
+'''
+
+
+def parse_importtime(stderr):
+    """Return {module: cumulative_us} from -X importtime output"""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        imports[name.strip()] = int(cumulative_us)
+    return imports
+
+
+def run_once():
+    code = CHILD.format(root=ROOT, calculator=CALCULATOR)
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             capture_output=True, text=True, cwd=ROOT)
+    elapsed = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    report['total_ms'] = elapsed
+    report['imports'] = parse_importtime(process.stderr)
+    return report
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    reports = [run_once() for _ in range(runs)]
+
+    totals = [r['total_ms'] for r in reports]
+    imports = [r['import_ms'] for r in reports]
+    first = reports[0]
+    label = 'first interactive frame' if first['display'] else 'module import (no display)'
+    print(f"runs: {runs}")
+    print(f"spawn -> {label}: median {statistics.median(totals):.1f} ms, "
+          f"min {min(totals):.1f} ms")
+    print(f"calculator module import: median {statistics.median(imports):.1f} ms")
+    if first['display']:
+        ui = [r['ui_ms'] for r in reports]
+        print(f"window build + first frame: median {statistics.median(ui):.1f} ms")
+    print(f"plotting stack loaded at startup: {first['plotting_loaded']}")
+
+    print("\nslowest imports (cumulative, first run):")
+    print(f"{'cumulative us':>14} | module")
+    slowest = sorted(first['imports'].items(), key=lambda item: -item[1])[:15]
+    for name, cumulative in slowest:
+        print(f"{cumulative:>14} | {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: streaming statistics over large files
+
+Writes CSV files of (row, value) pairs to a temporary directory and
+summarizes them with calc_stats, reporting throughput (MB/s, rows/s) and,
+from a second (traced, slower) run, the peak memory allocated while
+reading; the peak should not grow with the file. Then compares the
+variance of values with a large offset (1e9 + noise) against the textbook
+one-pass formula (Σx² - (Σx)²/n) / (n - 1), which cancels away most of its
+significant digits there.
+
+Usage:
+    python benchmarks/bench_stats.py [rows]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import calc_stats
+
+
+def write_csv(path, rows, offset=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        f.write("row,value\n")
+        for start in range(0, rows, 100_000):
+            x = np.arange(start, min(start + 100_000, rows))
+            y = offset + 3 * x + rng.normal(0, 5, x.size)
+            f.write('\n'.join(f"{a},{b:.6f}" for a, b in zip(x.tolist(), y.tolist())))
+            f.write('\n')
+
+
+def naive_variance(path):
+    """One pass of sums and sums of squares"""
+    count, total, squares = 0, 0.0, 0.0
+    with open(path) as f:
+        next(f)
+        for line in f:
+            value = float(line.split(',')[1])
+            count += 1
+            total += value
+            squares += value * value
+    return (squares - total * total / count) / (count - 1)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'rows':>10}{'MB':>8}{'seconds':>9}{'MB/s':>8}{'rows/s':>12}{'peak MiB':>10}")
+        for size in (rows // 4, rows):
+            path = os.path.join(directory, f"data-{size}.csv")
+            write_csv(path, size)
+            megabytes = os.path.getsize(path) / 1e6
+            start = time.perf_counter()
+            summary = calc_stats.summarize_file(path, column=2, x_column=1)
+            seconds = time.perf_counter() - start
+            tracemalloc.start()
+            calc_stats.summarize_file(path, column=2, x_column=1)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if summary.stats.count != size:
+                raise AssertionError(f"{summary.stats.count} values read, {size} written")
+            print(f"{size:10d}{megabytes:8.1f}{seconds:9.2f}{megabytes / seconds:8.1f}"
+                  f"{size / seconds:12,.0f}{peak / 2**20:10.1f}")
+
+        # Variance of values near 1e9 (noise sd 5 around the trend)
+        size = min(rows, 200_000)
+        path = os.path.join(directory, "offset.csv")
+        write_csv(path, size, offset=1e9)
+        exact = np.var(np.loadtxt(path, delimiter=',', skiprows=1, usecols=1), ddof=1)
+        streaming = calc_stats.summarize_file(path, column=2).stats.variance
+        naive = naive_variance(path)
+        print()
+        print(f"variance of {size} values near 1e9: exact {exact:.10g}")
+        print(f"  streaming (Welford/Chan) relative error {abs(streaming - exact) / exact:.1e}")
+        print(f"  naive Σx² formula        relative error {abs(naive - exact) / exact:.1e}"
+              + ("" if math.isfinite(naive) else " (not finite)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Benchmark suite: evaluation, dispatch, history, plotting and startup
+
+Runs headless (see headless.py: real Tk when a display is available, a mocked
+widget layer otherwise) and measures
+- per-operation latency distributions (p50/p99) of the GUI's calculate and
+  handle_scientific paths, of keypad presses with live preview, of pasting
+  an expression (parse and the one display refresh), and of the engine's
+  evaluate
+- batch throughput of the command-line evaluator and the vectorized functions
+- add_to_history / update_history_display cost against history capacity
+- plot redraw, marker blit and function switch time
+- startup (module import) time, via bench_startup
+
+Results are written as JSON. Given a previous result file with --compare,
+every metric that got slower by more than --threshold is flagged and the
+exit status is 1, so the suite can gate a change.
+
+Usage:
+    python benchmarks/bench_suite.py [-o results.json] [--quick]
+                                     [--compare baseline.json] [--threshold 0.25]
+                                     [--backend tk|mock]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# History and settings go to a scratch home, not the user's; it is removed
+# when the run ends
+_SCRATCH_HOME = tempfile.TemporaryDirectory(prefix='calc-bench-')
+os.environ['HOME'] = _SCRATCH_HOME.name
+
+import bench_startup
+import headless
+
+SCIENTIFIC_OPERANDS = {
+    'sin': (0, 720), 'cos': (0, 720), 'tan': (0, 80), '√': (0, 1e6),
+    '∛': (0, 1e6), 'ln': (1, 1e6), 'log': (1, 1e6), 'x²': (-1e3, 1e3),
+    '|x|': (-1e3, 1e3), 'n!': (0, 170), '%': (-1e3, 1e3), '+/-': (-1e3, 1e3),
+}
+OPERATORS = ['+', '-', '×', '÷', 'mod', 'x^y']
+HISTORY_CAPACITIES = [100, 1000, 10000]
+PASTE_OPERANDS = [10, 100, 1000]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def distribution(samples_ns, unit='us'):
+    """p50/p99/mean summary of nanosecond samples"""
+    scale = {'us': 1e-3, 'ms': 1e-6}[unit]
+    return {
+        'unit': unit,
+        'better': 'lower',
+        'n': len(samples_ns),
+        'p50': percentile(samples_ns, 0.50) * scale,
+        'p99': percentile(samples_ns, 0.99) * scale,
+        'mean': statistics.fmean(samples_ns) * scale,
+    }
+
+
+def throughput(count, seconds, unit):
+    return {'unit': unit, 'better': 'higher', 'value': count / seconds}
+
+
+def timed(function, *args):
+    start = time.perf_counter_ns()
+    function(*args)
+    return time.perf_counter_ns() - start
+
+
+def enter(app, text):
+    """Type a number (or expression) on the keypad"""
+    app.handle_button('C')
+    for char in text:
+        app.handle_button(char)
+
+
+# Benchmarks
+
+def bench_calculate(calculator, iterations, rng):
+    app = calculator.app
+    results = {}
+    for operator in OPERATORS:
+        samples = []
+        for _ in range(iterations):
+            enter(app, f"{rng.uniform(1, 99):.3f}")
+            if operator in ('mod', 'x^y'):
+                app.handle_scientific(operator)
+            else:
+                app.handle_button(operator)
+            for char in f"{rng.uniform(1, 9):.2f}":
+                app.handle_button(char)
+            samples.append(timed(app.handle_button, '='))
+            calculator.run_pending()
+        results[f'latency.calculate.{operator}'] = distribution(samples)
+    return results
+
+
+def bench_keystroke(calculator, iterations, rng):
+    """Keypad presses with live preview, inside a growing expression"""
+    app = calculator.app
+    samples = []
+    app.handle_button('C')
+    for i in range(iterations):
+        if i % 50 == 0:
+            app.handle_button('C')
+        for char in f"{rng.randint(1, 99)}{rng.choice('+-×÷')}":
+            samples.append(timed(app.handle_button, char))
+    app.handle_button('C')
+    return {'latency.keystroke': distribution(samples)}
+
+
+def bench_paste(calculator, iterations, rng):
+    """Pasted expressions of growing length, up to the refreshed display"""
+    app = calculator.app
+    results = {}
+    for operands in PASTE_OPERANDS:
+        samples = []
+        for _ in range(max(iterations // operands, 5)):
+            text = ' + '.join(str(rng.randint(1, 999)) for _ in range(operands))
+            app.handle_button('C')
+            calculator.run_pending()
+            start = time.perf_counter_ns()
+            app.type_text(text)
+            calculator.run_pending()
+            samples.append(time.perf_counter_ns() - start)
+        results[f'latency.paste.{operands}'] = distribution(samples)
+    app.handle_button('C')
+    return results
+
+
+def bench_scientific(calculator, iterations, rng):
+    app = calculator.app
+    results = {}
+    for func, (low, high) in SCIENTIFIC_OPERANDS.items():
+        integral = func == 'n!'
+        cold, warm = [], []
+        for _ in range(iterations):
+            value = rng.randint(int(low), int(high)) if integral else rng.uniform(low, high)
+            operand = str(value) if integral else f"{value:.6f}"
+            enter(app, operand)
+            cold.append(timed(app.handle_scientific, func))
+            enter(app, operand)
+            warm.append(timed(app.handle_scientific, func))
+            calculator.run_pending()
+        results[f'latency.scientific.{func}'] = distribution(cold)
+        results[f'latency.scientific_cached.{func}'] = distribution(warm)
+    return results
+
+
+def bench_engine(iterations, rng):
+    import calc_engine
+    results = {}
+    for expr in ['2 + 3 * x', 'sin(x) ** 2 + cos(x) ** 2', '√(x² + 1) / ln(x + 2)']:
+        compiled = calc_engine.compile(expr)
+        samples = []
+        for _ in range(iterations):
+            x = rng.uniform(0, 100)
+            start = time.perf_counter_ns()
+            calc_engine.evaluate(compiled, x=x)
+            samples.append(time.perf_counter_ns() - start)
+        results[f'latency.engine.{expr}'] = distribution(samples)
+
+        samples = [timed(calc_engine.compile, expr) for _ in range(iterations)]
+        results[f'latency.compile.{expr}'] = distribution(samples)
+    return results
+
+
+def bench_throughput(rows, rng):
+    import io
+    import numpy as np
+    import calc_cli
+    import calc_vector
+
+    lines = []
+    for _ in range(rows):
+        kind = rng.random()
+        if kind < 0.6:
+            lines.append(f"{rng.uniform(-1e3, 1e3):.4f} * {rng.uniform(-1e3, 1e3):.4f} + 1")
+        elif kind < 0.9:
+            lines.append(f"sin({rng.randint(0, 720)}) + log({rng.randint(1, 10**6)})")
+        else:
+            lines.append(f"{rng.randint(1, 300)}!")
+    source = io.StringIO('\n'.join(lines))
+    start = time.perf_counter()
+    count = sum(1 for chunk in calc_cli.evaluate_stream(calc_cli.read_expressions(source), workers=1)
+                for _ in chunk)
+    results = {'throughput.cli': throughput(count, time.perf_counter() - start, 'rows/s')}
+
+    values = np.random.default_rng(0).uniform(-720, 720, 1_000_000)
+    for func in ('sin', '√', 'ln', 'n!'):
+        start = time.perf_counter()
+        calc_vector.evaluate_array(func, values, is_degree=True)
+        results[f'throughput.vector.{func}'] = throughput(
+            values.size, time.perf_counter() - start, 'elements/s')
+    return results
+
+
+def bench_history(calculator, iterations):
+    import calc_history
+    app = calculator.app
+    results = {}
+    for capacity in HISTORY_CAPACITIES:
+        # A full buffer and panel, so every add also evicts
+        app.history = calc_history.HistoryBuffer(capacity)
+        for i in range(capacity):
+            app.history.add(f"{i} + 1 = {i + 1}")
+        app.update_history_display()
+
+        samples = []
+        for i in range(iterations):
+            entry = f"{i} * 2 = {i * 2}"
+            samples.append(timed(app.add_to_history, entry, '*', (float(i), 2.0), i * 2))
+        results[f'history.add.{capacity}'] = distribution(samples)
+
+        samples = [timed(app.update_history_display)
+                   for _ in range(max(iterations // 20, 5))]
+        results[f'history.redisplay.{capacity}'] = distribution(samples, 'ms')
+    return results
+
+
+def bench_plot(calculator, iterations, rng):
+    app = calculator.app
+    import calc_sampling
+    results = {}
+    app.toggle_graph()
+
+    # Curve sampling (cold cache) for every plottable function
+    samples = []
+    for func in calc_sampling.CURVES:
+        calc_sampling.clear_cache()
+        samples.append(timed(calc_sampling.sample_curve, func, True))
+    results['plot.sample_curve'] = distribution(samples, 'ms')
+
+    enter(app, '30')
+    app.handle_scientific('sin')
+    plot = app.active_plot
+    plot.canvas.draw()
+
+    samples = [timed(plot.canvas.draw) for _ in range(max(iterations // 10, 5))]
+    results['plot.full_redraw'] = distribution(samples, 'ms')
+
+    samples = []
+    for _ in range(iterations):
+        angle = rng.uniform(-360, 360)
+        samples.append(timed(plot.mark, angle, 0.0))
+    results['plot.mark_blit'] = distribution(samples, 'ms')
+
+    samples = []
+    for func in list(calc_sampling.CURVES) * max(iterations // 50, 1):
+        samples.append(timed(plot.plot, func))
+        calculator.run_pending()
+    results['plot.switch_function'] = distribution(samples, 'ms')
+    app.toggle_graph()
+    return results
+
+
+def bench_startup_time(runs):
+    reports = [bench_startup.run_once() for _ in range(runs)]
+    return {
+        'startup.import': {'unit': 'ms', 'better': 'lower', 'n': runs,
+                           'p50': statistics.median(r['import_ms'] for r in reports)},
+        'startup.process': {'unit': 'ms', 'better': 'lower', 'n': runs,
+                            'p50': statistics.median(r['total_ms'] for r in reports)},
+    }
+
+
+# Reporting
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def headline(metric):
+    """The number compared between runs"""
+    return metric['p50'] if 'p50' in metric else metric['value']
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, old, new, change)] for metrics slower by more than threshold"""
+    regressions = []
+    for name, metric in results.items():
+        old_metric = baseline.get(name)
+        if old_metric is None:
+            continue
+        old, new = headline(old_metric), headline(metric)
+        if old <= 0 or new <= 0:
+            continue
+        # change > 0 means slower
+        change = new / old - 1 if metric['better'] == 'lower' else old / new - 1
+        if change > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def print_results(results):
+    for name, metric in results.items():
+        if 'p50' in metric and 'p99' in metric:
+            print(f"{name:48} p50 {metric['p50']:10.2f} p99 {metric['p99']:10.2f} {metric['unit']}")
+        elif 'p50' in metric:
+            print(f"{name:48} p50 {metric['p50']:10.2f} {metric['unit']}")
+        else:
+            print(f"{name:48} {metric['value']:14,.0f} {metric['unit']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the calculator benchmark suite")
+    parser.add_argument('-o', '--output', default='benchmark-results.json',
+                        help="JSON file to write (default: %(default)s)")
+    parser.add_argument('--quick', action='store_true', help="fewer iterations")
+    parser.add_argument('--compare', metavar='BASELINE', help="previous results JSON")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="flag metrics slower by more than this fraction (default: 0.25)")
+    parser.add_argument('--backend', choices=('tk', 'mock'),
+                        help="widget layer (default: Tk if a display is available)")
+    args = parser.parse_args(argv)
+
+    iterations = 100 if args.quick else 1000
+    rng = random.Random(0)
+
+    calculator = headless.load_calculator(args.backend)
+    results = {}
+    try:
+        results.update(bench_calculate(calculator, iterations, rng))
+        results.update(bench_keystroke(calculator, iterations, rng))
+        results.update(bench_paste(calculator, iterations, rng))
+        results.update(bench_scientific(calculator, iterations, rng))
+        results.update(bench_engine(iterations * 10, rng))
+        results.update(bench_history(calculator, iterations))
+        results.update(bench_plot(calculator, iterations, rng))
+    finally:
+        calculator.close()
+    results.update(bench_throughput(2000 if args.quick else 20000, rng))
+    results.update(bench_startup_time(2 if args.quick else 5))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': calculator.backend,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_results(results)
+    print(f"\nwrote {args.output} ({calculator.backend} backend)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nslower than {args.compare} by more than {args.threshold:.0%}:")
+            for name, old, new, change in regressions:
+                print(f"  {name:46} {old:12.2f} -> {new:12.2f}  (+{change:.0%})")
+            return 1
+        print(f"\nno metric slower than {args.compare} by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        _SCRATCH_HOME.cleanup()
@@ -0,0 +1,71 @@
+"""
+Benchmark: user-defined function calls
+
+Defines f(x) = sin(x)^2 + ln(x) and g(x) = f(x) * r + 1 in a scratch
+workspace and times
+- a scalar call of the compiled function against parsing and evaluating
+  the same body text on every call
+- one call over a NumPy array (calc_vector, whole-array operations) against
+  calling the scalar function element by element
+
+Usage:
+    python benchmarks/bench_variables.py [calls] [array size]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import calc_engine
+import calc_variables
+import calc_vector
+
+DEFINITIONS = ["r = 3", "f(x) = sin(x)^2 + ln(x)", "g(x) = f(x) * r + 1"]
+REPARSED = {'f': "sin(x)^2 + ln(x)", 'g': "(sin(x)^2 + ln(x)) * r + 1"}
+
+
+def per_call(function, args, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function(*args)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+
+    workspace = calc_variables.Workspace(path=None)
+    for text in DEFINITIONS:
+        workspace.define(text)
+    xs = np.linspace(0.5, 500.0, size)
+
+    print(f"{'function':>8}{'compiled us':>13}{'re-parse us':>13}{'speedup':>9}")
+    for name, body in REPARSED.items():
+        spec = calc_engine.FUNCTIONS[name]
+        compiled = per_call(spec.call, (3.0, True), calls)
+        reparsed = per_call(lambda: calc_engine.evaluate(body, True, x=3.0, **workspace.variables),
+                            (), calls)
+        print(f"{name:>8}{compiled * 1e6:13.2f}{reparsed * 1e6:13.2f}{reparsed / compiled:8.1f}x")
+
+    print()
+    print(f"{'function':>8}{'array ms':>11}{'scalar loop ms':>16}{'speedup':>9}   ({size} values)")
+    for name in REPARSED:
+        spec = calc_engine.FUNCTIONS[name]
+        start = time.perf_counter()
+        values, errors = calc_vector.evaluate_array(name, xs)
+        array = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = [spec.call(x, True) for x in xs.tolist()]
+        loop = time.perf_counter() - start
+        if not np.allclose(values, expected):
+            raise AssertionError(f"{name}: array and scalar results differ")
+        print(f"{name:>8}{array * 1e3:11.2f}{loop * 1e3:16.2f}{loop / array:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: vectorized batch evaluation vs. the scalar engine path
+
+Runs every scientific function over the same array with calc_vector and with
+a Python loop over calc_engine.apply_function + format_result (the scalar
+path the GUI takes), and prints the speedup. Degree sin, cos and tan follow
+calc_trig's exact reduction and double-double conversion, several times the
+work of np.sin on radians, so their speedup sits below that of the
+single-ufunc functions; sin and cos should still reach 50x.
+
+First checks degree sin, cos and tan element-wise against calc_trig on
+angles of mixed magnitude (a few huge ones take the int64 reduction for the
+whole array): sin and cos must match exactly, tan to within two ulps (np.tan
+and math.tan differ by one, which -1/t can double near 90°).
+
+Usage:
+    python benchmarks/bench_vector.py [size]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import calc_engine
+import calc_trig
+import calc_vector
+
+FUNCTIONS = ['sin', 'cos', 'tan', '√', '∛', 'ln', 'log', 'x²', '|x|', 'n!', '%', '+/-']
+DEGREE_FUNCTIONS = [('sin', calc_trig.sin_degrees, 0), ('cos', calc_trig.cos_degrees, 0),
+                    ('tan', calc_trig.tan_degrees, 2)]
+
+
+def scalar_loop(func, values, is_degree):
+    results = []
+    for num in values:
+        try:
+            result = calc_engine.apply_function(func, num, is_degree)
+            results.append(calc_engine.format_result(result))
+        except (calc_engine.CalculationError, OverflowError):
+            results.append(float('nan'))
+    return results
+
+
+def check_degrees(rng, size=10_000):
+    """Vector degree trig equals calc_trig on small angles mixed with huge ones"""
+    values = rng.uniform(-100, 100, size)
+    values[::1000] = rng.uniform(-1e16, 1e16, values[::1000].size)
+    for func, scalar, ulps in DEGREE_FUNCTIONS:
+        result = calc_vector.evaluate_array(func, values, True)
+        for x, got, undefined in zip(values.tolist(), result.values.tolist(),
+                                     result.errors.tolist()):
+            try:
+                expected = scalar(x)
+            except calc_trig.UndefinedTangent:
+                if not undefined:
+                    raise AssertionError(f"{func}({x!r}) is undefined, got {got!r}")
+                continue
+            if abs(got - expected) > ulps * abs(np.spacing(expected)):
+                raise AssertionError(f"{func}({x!r}): {got!r}, calc_trig {expected!r}")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    data = rng.uniform(-720, 720, size)
+    # Keep factorial inputs small integers so the scalar path stays tractable
+    factorial_data = rng.integers(-5, 150, size).astype(np.float64)
+    check_degrees(np.random.default_rng(1))
+    print(f"{'function':>8} {'scalar (s)':>12} {'vector (s)':>12} {'speedup':>9}")
+    for func in FUNCTIONS:
+        values = factorial_data if func == 'n!' else data
+        as_list = values.tolist()
+
+        start = time.perf_counter()
+        scalar_loop(func, as_list, True)
+        scalar_time = time.perf_counter() - start
+
+        vector_time = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            result = calc_vector.evaluate_array(func, values, True)
+            calc_vector.format_array(result.values)
+            vector_time = min(vector_time, time.perf_counter() - start)
+
+        print(f"{func:>8} {scalar_time:12.4f} {vector_time:12.4f} "
+              f"{scalar_time / vector_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Headless calculator loader for benchmarks
+
+Builds a ScientificCalculator without a visible window:
+- with a display (or under xvfb-run) real Tk is used and the window withdrawn
+- without one, a minimal stand-in for the tkinter widgets is installed, and
+  matplotlib renders to an Agg canvas, so only the calculator's own Python
+  work is measured
+
+Usage:
+    calculator = headless.load_calculator()
+    calculator.app.handle_button('7')
+    calculator.run_pending()       # deliver root.after callbacks
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALCULATOR = os.path.join(ROOT, 'calculator V - 3.2.py')
+
+
+class _Variable:
+    def __init__(self, master=None, value=None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class _Widget:
+    """Accepts and ignores any widget call"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _ignore
+
+
+def _ignore(*args, **kwargs):
+    return None
+
+
+class _Text(_Widget):
+    """Line-based stand-in for Text/ScrolledText (insert, delete, get)"""
+
+    def __init__(self, *args, **kwargs):
+        self.lines = []
+
+    def insert(self, index, text):
+        new = text.split('\n')[:-1] if text.endswith('\n') else text.split('\n')
+        if str(index) in ('1.0', '1'):
+            self.lines[0:0] = new
+        else:
+            self.lines.extend(new)
+
+    def delete(self, first, last=None):
+        if str(first) in ('1.0', '1') and last == 'end':
+            self.lines.clear()
+        elif self.lines:
+            # 'end-2l', 'end-1l': the last line
+            self.lines.pop()
+
+    def get(self, first, last=None):
+        return '\n'.join(self.lines) + '\n'
+
+
+class _Root(_Widget):
+    """Tk root whose after() callbacks are queued for run_pending()"""
+
+    def __init__(self):
+        self.pending = {}
+        self.scheduled = 0
+        self.clipboard = ''
+
+    def after(self, ms, function=None, *args):
+        self.scheduled += 1
+        if function is not None:
+            self.pending[f'after#{self.scheduled}'] = (function, args)
+        return f'after#{self.scheduled}'
+
+    def after_cancel(self, id):
+        self.pending.pop(id, None)
+
+    def clipboard_get(self):
+        return self.clipboard
+
+
+def _install_mock_tk():
+    tk = types.ModuleType('tkinter')
+    tk.StringVar = tk.IntVar = tk.BooleanVar = tk.DoubleVar = _Variable
+    for name in ('Frame', 'Label', 'Entry', 'Button', 'Canvas', 'Scrollbar',
+                 'Listbox', 'Toplevel', 'Menu', 'Menubutton', 'Checkbutton', 'Spinbox'):
+        setattr(tk, name, _Widget)
+    tk.Text = _Text
+    tk.Tk = _Root
+    tk.END = 'end'
+    tk.TclError = RuntimeError
+    scrolledtext = types.ModuleType('tkinter.scrolledtext')
+    scrolledtext.ScrolledText = _Text
+    ttk = types.ModuleType('tkinter.ttk')
+    ttk.__getattr__ = lambda name: _Widget
+    messagebox = types.ModuleType('tkinter.messagebox')
+    messagebox.__getattr__ = lambda name: _ignore
+    # Dialogs return nothing, as if cancelled
+    filedialog = types.ModuleType('tkinter.filedialog')
+    filedialog.__getattr__ = lambda name: _ignore
+    tk.scrolledtext, tk.ttk, tk.messagebox, tk.filedialog = scrolledtext, ttk, messagebox, filedialog
+    sys.modules.update({'tkinter': tk, 'tkinter.scrolledtext': scrolledtext,
+                        'tkinter.ttk': ttk, 'tkinter.messagebox': messagebox,
+                        'tkinter.filedialog': filedialog})
+
+    # Agg rendering in place of the Tk canvas
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    class FigureCanvasTkAgg(FigureCanvasAgg):
+        def __init__(self, figure, master=None):
+            super().__init__(figure)
+            self._widget = _Root()
+
+        def get_tk_widget(self):
+            return self._widget
+
+        def blit(self, bbox=None):
+            pass
+
+        def draw_idle(self):
+            self.draw()
+
+    backend = types.ModuleType('matplotlib.backends.backend_tkagg')
+    backend.FigureCanvasTkAgg = FigureCanvasTkAgg
+    sys.modules['matplotlib.backends.backend_tkagg'] = backend
+
+
+def display_available():
+    """Whether a real Tk root can be created"""
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        return False
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+    except Exception:
+        return False
+    return True
+
+
+class HeadlessCalculator:
+    """A ScientificCalculator instance plus its module and root"""
+
+    def __init__(self, module, root, backend):
+        self.module = module
+        self.root = root
+        self.backend = backend
+        self.app = module.ScientificCalculator(root)
+
+    def run_pending(self):
+        """Run the after() callbacks queued so far (mock) or process Tk events"""
+        if self.backend == 'tk':
+            self.root.update()
+            return
+        # Callbacks that re-schedule themselves (refresh loops) run next time
+        pending, self.root.pending = self.root.pending, {}
+        for function, args in pending.values():
+            function(*args)
+
+    def close(self):
+        self.app.scheduler.shutdown()
+        if self.app.history_store is not None:
+            self.app.history_store.close()
+        if self.backend == 'tk':
+            self.root.destroy()
+
+
+def load_calculator(backend=None):
+    """Import the calculator and build its UI ('tk', 'mock' or auto)"""
+    if backend is None:
+        backend = 'tk' if display_available() else 'mock'
+    if backend == 'mock':
+        _install_mock_tk()
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    spec = importlib.util.spec_from_file_location('calculator', CALCULATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    import tkinter
+    root = tkinter.Tk()
+    if backend == 'tk':
+        root.withdraw()
+    return HeadlessCalculator(module, root, backend)
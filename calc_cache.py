@@ -0,0 +1,113 @@
+"""
+Result Cache
+Bounded LRU memoization in front of the scientific function dispatch.
+
+Results are cached already formatted (the value the display shows), keyed on
+(function, operand, mode). The mode is only part of the key for the trig
+functions, so e.g. √ results are shared between DEG and RAD.
+
+Hit, miss and eviction counters can be read with stats() or written to a JSON
+file with dump() to size the cache for a workload.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import calc_engine
+
+DEFAULT_SIZE = 4096
+
+
+class LRUCache:
+    """Least-recently-used mapping with hit/miss/eviction counters"""
+
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        if maxsize < 0:
+            raise ValueError("Cache size must not be negative")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or default"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries if full"""
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        """Change the capacity, evicting entries if it shrinks"""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return the counters as a dict"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def dump(self, path):
+        """Write the counters to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.stats(), f, indent=2)
+
+
+_MISSING = object()
+
+
+class ScientificCache(LRUCache):
+    """LRU cache of formatted scientific function results"""
+
+    def compute(self, func, num, is_degree=True):
+        """Return the formatted result of func(num), computing it on a miss
+
+        CalculationError is raised as usual and errors are not cached. Huge
+        factorials come back as scientific-notation strings.
+        """
+        spec = calc_engine.FUNCTIONS.get(func)
+        if spec is None:
+            raise calc_engine.CalculationError("Invalid operation")
+        key = (func, num, is_degree if spec.mode_dependent else None)
+        result = self.get(key, _MISSING)
+        if result is _MISSING:
+            result = spec.display(num, is_degree)
+            self.put(key, result)
+        return result
@@ -0,0 +1,150 @@
+"""
+Command-Line Batch Mode
+Headless, streaming evaluation of expression files.
+
+Reads one expression per line from files or stdin and writes one result per
+line (or CSV row) with the calculator's semantics: DEG/RAD handling, the
+GUI's error messages and round(result, 10) formatting. Input is consumed
+lazily in chunks, so memory use stays constant for arbitrarily large files.
+Throughput is reported on stderr when the run finishes. With several input
+files, line numbers count per file and are written as "file:line".
+
+Usage:
+    python calc_cli.py expressions.txt
+    cat expressions.txt | python calc_cli.py --rad --csv > results.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import functools
+import itertools
+import sys
+import time
+
+import calc_engine
+import calc_parallel
+
+DEFAULT_CHUNK_SIZE = 10000
+COMPILE_CACHE_SIZE = 4096
+
+# Error message -> numeric code (0 = success, 99 = other)
+ERROR_CODES = {
+    "Division by zero": 1,
+    "Modulo by zero": 2,
+    "Square root of negative number": 3,
+    "Logarithm of non-positive number": 4,
+    "Factorial requires non-negative integer": 5,
+    "Invalid operation": 6,
+    "Invalid calculation": 7,
+    "Invalid expression": 8,
+    "Tangent undefined": 9,
+}
+OTHER_ERROR = 99
+
+# Repeated expressions are compiled once
+_compile = functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)(calc_engine.compile)
+
+
+def evaluate_line(expr, is_degree=True):
+    """Evaluate one expression; return (result text, error code, error message)"""
+    try:
+        value = calc_engine.evaluate(_compile(expr), is_degree)
+        return calc_engine.display_string(value), 0, ""
+    except calc_engine.CalculationError as e:
+        message = str(e)
+    except (ArithmeticError, ValueError, TypeError):
+        message = "Invalid calculation"
+    return "Error", ERROR_CODES.get(message, OTHER_ERROR), message
+
+
+def read_expressions(lines, source=None):
+    """Yield (line number, expression), skipping blank lines and # comments
+
+    Numbers count from 1 within lines; with a source (a file name) they are
+    given as "source:number" instead.
+    """
+    for number, line in enumerate(lines, 1):
+        expr = line.strip()
+        if expr and not expr.startswith('#'):
+            yield (f"{source}:{number}" if source else number), expr
+
+
+def evaluate_chunk(chunk, is_degree=True):
+    """Evaluate a list of (line number, expression) into output rows"""
+    return [(number, expr) + evaluate_line(expr, is_degree) for number, expr in chunk]
+
+
+def evaluate_stream(expressions, is_degree=True, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """Yield lists of (line number, expression, result, code, message) per chunk
+
+    With workers > 1 the chunks are evaluated in parallel processes; the
+    output order is unchanged.
+    """
+    chunks = calc_parallel.chunked(expressions, chunk_size)
+    return calc_parallel.map_ordered(evaluate_chunk, chunks, workers, is_degree)
+
+
+def write_plain(chunks, out):
+    rows = 0
+    for chunk in chunks:
+        out.writelines(
+            f"{result}\n" if not code else f"Error: {message}\n"
+            for number, expr, result, code, message in chunk
+        )
+        rows += len(chunk)
+    return rows
+
+
+def write_csv(chunks, out):
+    writer = csv.writer(out)
+    writer.writerow(['line', 'expression', 'result', 'error_code', 'error'])
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate calculator expressions line by line")
+    parser.add_argument('files', nargs='*', help="expression files (default: stdin)")
+    parser.add_argument('--rad', action='store_true', help="radian mode (default: degrees)")
+    parser.add_argument('--csv', action='store_true', help="write CSV rows instead of plain results")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="expressions evaluated per chunk")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes (0 = one per CPU core)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    with contextlib.ExitStack() as stack:
+        if args.files:
+            files = [stack.enter_context(open(path, encoding='utf-8')) for path in args.files]
+            # Several files are told apart by prefixing their line numbers
+            expressions = itertools.chain.from_iterable(
+                read_expressions(file, file.name if len(files) > 1 else None)
+                for file in files)
+        else:
+            expressions = read_expressions(sys.stdin)
+        if args.output:
+            out = stack.enter_context(open(args.output, 'w', newline='', encoding='utf-8'))
+        else:
+            out = sys.stdout
+
+        start = time.perf_counter()
+        chunks = evaluate_stream(expressions, not args.rad, args.chunk_size,
+                                 args.workers or None)
+        rows = (write_csv if args.csv else write_plain)(chunks, out)
+        elapsed = time.perf_counter() - start
+
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"{rows} rows in {elapsed:.2f} s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
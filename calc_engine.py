@@ -0,0 +1,403 @@
+"""
+Expression Engine
+Tk-free evaluation core for the Scientific Calculator.
+
+Expressions are tokenized and parsed once into a small tree, which is then
+compiled into nested Python closures. Evaluating a compiled expression only
+runs the arithmetic, so the same formula can be evaluated thousands of times
+per second without a display or any string handling.
+
+Usage:
+    expr = compile("2 + 3 * sin(x)")
+    evaluate(expr, x=30)                 # degree mode (default)
+    evaluate(expr, is_degree=False, x=1)
+"""
+
+import math
+import operator
+import re
+
+import calc_factorial
+import calc_registry
+import calc_trig
+
+
+class CalculationError(Exception):
+    """Calculation error whose message is shown to the user after 'Error: '"""
+
+
+def format_result(result):
+    """Format a result the way the display shows it"""
+    if result == int(result):
+        return int(result)
+    return round(result, 10)
+
+
+_LOG10_2 = math.log10(2)
+
+
+def display_string(result):
+    """Text the display shows for a result (huge integers in scientific notation)"""
+    result = format_result(result)
+    if (isinstance(result, int)
+            and result.bit_length() * _LOG10_2 > calc_factorial.EXACT_DISPLAY_DIGITS):
+        return _scientific_int(result)
+    return str(result)
+
+
+def _scientific_int(value):
+    # log10 from the top 64 bits; exact enough for 10 significant digits
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    shift = value.bit_length() - 64
+    log10 = math.log10(value >> shift) + shift * _LOG10_2
+    exponent = math.floor(log10)
+    mantissa = round(10 ** (log10 - exponent), calc_factorial.SIGNIFICANT_DIGITS - 1)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+    return f"{sign}{mantissa:.{calc_factorial.SIGNIFICANT_DIGITS - 1}f}e+{exponent}"
+
+
+# Built-in functions and operators, registered in REGISTRY below.
+# Functions take (num, is_degree); validators raise the GUI's error messages.
+# Degree trig is reduced exactly in degrees by calc_trig.
+
+def _sin(num, is_degree):
+    return calc_trig.sin_degrees(num) if is_degree else math.sin(num)
+
+
+def _cos(num, is_degree):
+    return calc_trig.cos_degrees(num) if is_degree else math.cos(num)
+
+
+def _tan(num, is_degree):
+    if not is_degree:
+        return math.tan(num)
+    try:
+        return calc_trig.tan_degrees(num)
+    except calc_trig.UndefinedTangent:
+        raise CalculationError("Tangent undefined")
+
+
+def _check_sqrt(num):
+    if num < 0:
+        raise CalculationError("Square root of negative number")
+
+
+def _check_cbrt(num):
+    if num < 0:
+        # num ** (1/3) is complex for negative numbers
+        raise CalculationError("Invalid operation")
+
+
+def _check_log(num):
+    if num <= 0:
+        raise CalculationError("Logarithm of non-positive number")
+
+
+def factorial_argument(num):
+    """Validate a factorial operand and return it as an int"""
+    if num < 0 or num != int(num):
+        raise CalculationError("Factorial requires non-negative integer")
+    return int(num)
+
+
+def _check_divisor(num1, num2):
+    if num2 == 0:
+        raise CalculationError("Division by zero")
+
+
+def _check_modulus(num1, num2):
+    if num2 == 0:
+        raise CalculationError("Modulo by zero")
+
+
+def _power(num1, num2):
+    result = num1 ** num2
+    if type(result) is complex:
+        # A negative number to a fractional power: (-8) ** (1/3)
+        raise CalculationError("Invalid calculation")
+    return result
+
+
+REGISTRY = calc_registry.FunctionRegistry(default_formatter=format_result)
+
+REGISTRY.register('sin', _sin, mode_dependent=True, description="Sine")
+REGISTRY.register('cos', _cos, mode_dependent=True, description="Cosine")
+REGISTRY.register('tan', _tan, mode_dependent=True, description="Tangent")
+REGISTRY.register('√', lambda num, is_degree: math.sqrt(num), validator=_check_sqrt,
+                  aliases=('sqrt',), description="Square root")
+REGISTRY.register('∛', lambda num, is_degree: num ** (1/3), validator=_check_cbrt,
+                  aliases=('cbrt',), description="Cube root")
+REGISTRY.register('ln', lambda num, is_degree: math.log(num), validator=_check_log,
+                  description="Natural logarithm")
+REGISTRY.register('log', lambda num, is_degree: math.log10(num), validator=_check_log,
+                  description="Base-10 logarithm")
+REGISTRY.register('x²', lambda num, is_degree: num ** 2, aliases=('sqr',),
+                  description="Square")
+REGISTRY.register('|x|', lambda num, is_degree: abs(num), aliases=('abs',),
+                  description="Absolute value")
+REGISTRY.register('n!', lambda num, is_degree: calc_factorial.factorial(int(num)),
+                  validator=factorial_argument,
+                  display_function=lambda num: calc_factorial.display_factorial(int(num)),
+                  aliases=('fact',), description="Factorial")
+REGISTRY.register('%', lambda num, is_degree: num / 100, aliases=('percent',),
+                  description="Percent")
+REGISTRY.register('+/-', lambda num, is_degree: -num, aliases=('neg',),
+                  description="Change sign")
+
+REGISTRY.register('+', operator.add, arity=2, description="Add")
+REGISTRY.register('-', operator.sub, arity=2, description="Subtract")
+REGISTRY.register('*', operator.mul, arity=2, description="Multiply")
+REGISTRY.register('/', operator.truediv, arity=2, validator=_check_divisor,
+                  description="Divide")
+REGISTRY.register('%', operator.mod, arity=2, validator=_check_modulus,
+                  description="Modulo")
+REGISTRY.register('**', _power, arity=2, description="Power")
+
+# Label / name -> FunctionSpec; specs are callable like plain functions
+FUNCTIONS = REGISTRY.functions
+OPERATORS = REGISTRY.operators
+
+# Display symbols and aliases accepted in expressions
+OPERATOR_ALIASES = {'×': '*', '÷': '/', '−': '-', '^': '**', 'mod': '%'}
+
+CONSTANTS = {'π': math.pi, 'pi': math.pi}
+
+
+def apply_function(func, num, is_degree=True):
+    """Apply a scientific function by button label or name"""
+    try:
+        call = REGISTRY.function_calls[func]
+    except KeyError:
+        raise CalculationError("Invalid operation")
+    return call(num, is_degree)
+
+
+def apply_operator(operator, num1, num2):
+    """Apply a binary operator by symbol"""
+    try:
+        call = REGISTRY.operator_calls[OPERATOR_ALIASES.get(operator, operator)]
+    except KeyError:
+        raise CalculationError("Invalid calculation")
+    return call(num1, num2)
+
+
+# Tokenizer
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<symbol>\*\*|[-+*/%^()×÷−√∛π!²,])
+    )""", re.VERBOSE)
+
+
+def tokenize(expr):
+    """Split an expression into (kind, text) tokens"""
+    tokens = []
+    pos = 0
+    end = len(expr.rstrip())
+    while pos < end:
+        match = _TOKEN_RE.match(expr, pos)
+        if not match:
+            raise CalculationError("Invalid expression")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text in OPERATOR_ALIASES:
+            kind = 'symbol'
+        tokens.append((kind, OPERATOR_ALIASES.get(text, text)))
+        pos = match.end()
+    tokens.append(('end', ''))
+    return tokens
+
+
+# Pratt parser producing tuple nodes:
+#   ('num', value, text) ('var', name) ('call', func, arg) ('binary', op, left, right)
+# Number nodes keep their source text (None once folded) for exact evaluation.
+
+# Binding powers are shared with calc_expression's incremental parser
+BINARY_POWER = {'+': 10, '-': 10, '*': 20, '/': 20, '%': 20, '**': 30}
+RIGHT_ASSOCIATIVE = {'**'}
+PREFIX_POWER = 25
+_POSTFIX = {'!': 'n!', '²': 'x²'}
+_POSTFIX_POWER = 40
+_PREFIX_FUNCTIONS = {'-': '+/-', '√': '√', '∛': '∛'}
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, text):
+        if self.next()[1] != text:
+            raise CalculationError("Invalid expression")
+
+    def parse(self):
+        node = self.expression(0)
+        if self.peek()[0] != 'end':
+            raise CalculationError("Invalid expression")
+        return node
+
+    def expression(self, min_power):
+        left = self.prefix()
+        while True:
+            kind, text = self.peek()
+            if kind != 'symbol':
+                break
+            if text in _POSTFIX:
+                if _POSTFIX_POWER <= min_power:
+                    break
+                self.next()
+                left = ('call', _POSTFIX[text], left)
+                continue
+            power = BINARY_POWER.get(text)
+            if power is None or power <= min_power:
+                break
+            self.next()
+            right_power = power - 1 if text in RIGHT_ASSOCIATIVE else power
+            left = ('binary', text, left, self.expression(right_power))
+        return left
+
+    def prefix(self):
+        kind, text = self.next()
+        if kind == 'number':
+            return ('num', float(text), text)
+        if kind == 'name':
+            if text in CONSTANTS:
+                return ('num', CONSTANTS[text], text)
+            if text in FUNCTIONS and self.peek()[1] == '(':
+                self.next()
+                arg = self.expression(0)
+                self.expect(')')
+                return ('call', text, arg)
+            return ('var', text)
+        if text == 'π':
+            return ('num', CONSTANTS['π'], 'π')
+        if text == '(':
+            node = self.expression(0)
+            self.expect(')')
+            return node
+        if text == '+':
+            return self.expression(PREFIX_POWER)
+        if text in _PREFIX_FUNCTIONS:
+            return ('call', _PREFIX_FUNCTIONS[text], self.expression(PREFIX_POWER))
+        raise CalculationError("Invalid expression")
+
+
+def parse(expr):
+    """Parse an expression string into a tuple tree"""
+    return _Parser(tokenize(expr)).parse()
+
+
+# Compiler: tuple tree -> closure(variables, is_degree)
+
+def _fold(node):
+    """Pre-compute constant sub-trees that do not depend on the mode
+
+    Steps calc_worker.is_heavy classes as heavy (1000000!, huge exact
+    powers) are left to evaluation rather than run inside compile().
+    """
+    import calc_worker
+
+    kind = node[0]
+    if kind == 'call':
+        arg = _fold(node[2])
+        spec = FUNCTIONS[node[1]]
+        if (arg[0] == 'num' and not spec.mode_dependent
+                and not calc_worker.is_heavy(node[1], (arg[1],))):
+            try:
+                return ('num', spec(arg[1], True), None)
+            except Exception:
+                pass
+        return ('call', node[1], arg)
+    if kind == 'binary':
+        left, right = _fold(node[2]), _fold(node[3])
+        if (left[0] == 'num' and right[0] == 'num'
+                and not calc_worker.is_heavy(node[1], (left[1], right[1]))):
+            try:
+                return ('num', OPERATORS[node[1]](left[1], right[1]), None)
+            except Exception:
+                pass
+        return ('binary', node[1], left, right)
+    return node
+
+
+def _compile_node(node):
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return lambda variables, is_degree: value
+    if kind == 'var':
+        name = node[1]
+
+        def load(variables, is_degree):
+            try:
+                return variables[name]
+            except KeyError:
+                raise CalculationError(f"Unknown variable '{name}'")
+        return load
+    if kind == 'call':
+        function = FUNCTIONS[node[1]].call
+        arg = _compile_node(node[2])
+        return lambda variables, is_degree: function(arg(variables, is_degree), is_degree)
+    apply = OPERATORS[node[1]].call
+    left = _compile_node(node[2])
+    right = _compile_node(node[3])
+    return lambda variables, is_degree: apply(left(variables, is_degree),
+                                              right(variables, is_degree))
+
+
+def _variables(node):
+    if node[0] == 'var':
+        return {node[1]}
+    if node[0] == 'num':
+        return set()
+    names = set()
+    for child in node[2:]:
+        names |= _variables(child)
+    return names
+
+
+class CompiledExpression:
+    """An expression parsed and compiled once, ready for repeated evaluation"""
+
+    __slots__ = ('source', 'tree', 'variables', 'code')
+
+    def __init__(self, source, tree):
+        self.source = source
+        self.tree = tree
+        self.variables = frozenset(_variables(tree))
+        self.code = _compile_node(tree)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
+def compile(expr):
+    """Compile an expression string into a CompiledExpression"""
+    if isinstance(expr, CompiledExpression):
+        return expr
+    return CompiledExpression(expr, _fold(parse(expr)))
+
+
+def evaluate(compiled, is_degree=True, **variables):
+    """Evaluate a compiled expression (or expression string) to a number"""
+    if not isinstance(compiled, CompiledExpression):
+        compiled = compile(compiled)
+    try:
+        return compiled.code(variables, is_degree)
+    except CalculationError:
+        raise
+    except (ArithmeticError, ValueError, TypeError):
+        raise CalculationError("Invalid calculation")
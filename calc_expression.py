@@ -0,0 +1,570 @@
+"""
+Expression Buffer
+Incremental parsing and evaluation of the expression being typed.
+
+ExpressionBuffer takes the calculator's keystrokes (digits, operators,
+parentheses, π and variables, function results), or typed and pasted text
+through feed(), and keeps a parse of everything typed so
+far: an operator-precedence (shunting-yard) state of operand and operator
+stacks, using the engine's binding powers, so 2 + 3 × 4 is 14 and -2 ** 2 is
+-4. Operators are reduced as soon as precedence allows, which makes every
+keystroke amortized O(1), and the live preview only has to finish the few
+operators still pending (one per precedence level and open parenthesis)
+rather than re-parse the expression.
+
+States are immutable (the stacks are linked tuples), one per keystroke, so
+backspace simply steps back to the previous state.
+
+Steps that calc_worker considers heavy (huge exact powers and factorials)
+are not run while typing; the expression is then marked deferred and
+evaluate_keys() replays it in the worker process.
+
+Usage:
+    buffer = ExpressionBuffer()
+    for key in '2+3*4':
+        buffer.digit(key) if key.isdigit() else buffer.operator(key)
+    buffer.preview()      # '14'
+    buffer.evaluate()     # ('14', [('*', (3.0, 4.0), 12.0), ('+', (2.0, 12.0), 14.0)])
+"""
+
+import math
+import re
+from collections import namedtuple
+
+import calc_engine
+import calc_worker
+
+
+class ExpressionError(calc_engine.CalculationError):
+    """Calculation error of one step of an expression (op and operands kept)"""
+
+    def __init__(self, message, op=None, operands=()):
+        super().__init__(message, op, operands)
+        self.message = message
+        self.op = op
+        self.operands = operands
+
+    def __str__(self):
+        return self.message
+
+
+class Arithmetic:
+    """Number parsing and operations of one angle and precision mode
+
+    variables maps names (calc_variables' workspace) to values that are read
+    like π.
+    """
+
+    def __init__(self, is_degree=True, mode='float', precision=None, variables=None):
+        self.is_degree = is_degree
+        self.mode = mode
+        self.precision = precision
+        self.variables = variables if variables is not None else {}
+        self._precise = None
+        if mode != 'float':
+            import calc_precision
+            self._precise = calc_precision
+            if precision is None:
+                self.precision = calc_precision.DEFAULT_PRECISION
+
+    def number(self, text):
+        """Value of a literal, π, a variable or a displayed result"""
+        if text in self.variables:
+            value = self.variables[text]
+            if self._precise is None:
+                return value
+            text = repr(value)
+        if self._precise is not None:
+            return self._precise.to_number(text, self.mode, self.precision)
+        if text in calc_engine.CONSTANTS:
+            return calc_engine.CONSTANTS[text]
+        if '/' in text:
+            # An exact-mode "p/q" result
+            import calc_precision
+            return calc_precision.to_number(text, 'float')
+        return float(text)
+
+    def result(self, text):
+        """Value of a displayed result (in exact mode, decimal text is rounded)"""
+        if self._precise is not None:
+            return self._precise.result_number(text, self.mode, self.precision)
+        return self.number(text)
+
+    # ArithmeticError includes decimal.DecimalException (context errors the
+    # precise modes do not translate themselves)
+
+    def operator(self, op, num1, num2):
+        try:
+            if self._precise is not None:
+                return self._precise.apply_operator(op, num1, num2, self.mode, self.precision)
+            return calc_engine.apply_operator(op, num1, num2)
+        except (ArithmeticError, ValueError, TypeError):
+            raise calc_engine.CalculationError("Invalid calculation")
+
+    def function(self, func, num):
+        try:
+            if self._precise is not None:
+                return self._precise.apply_function(func, num, self.is_degree, self.mode,
+                                                    self.precision)
+            return calc_engine.apply_function(func, num, self.is_degree)
+        except (ArithmeticError, ValueError, TypeError):
+            raise calc_engine.CalculationError("Invalid operation")
+
+    def format(self, value):
+        """Display text of a value"""
+        try:
+            if self._precise is not None:
+                return self._precise.format_number(value, self.precision)
+            return calc_engine.display_string(value)
+        except (ArithmeticError, ValueError, TypeError):
+            raise calc_engine.CalculationError("Invalid calculation")
+
+
+# Operand values besides numbers: a step left for the worker, or a failed step
+DEFERRED = object()
+Failure = namedtuple('Failure', ['message', 'op', 'operands'])
+
+# value, text index where the operand starts, and display text (None: format value)
+_Operand = namedtuple('_Operand', ['value', 'start', 'entry'])
+# kind is 'binary', 'prefix' or 'open'; symbol is the operator, the prefix
+# function or the function of an opening parenthesis (None for plain ones)
+_Pending = namedtuple('_Pending', ['kind', 'symbol', 'power', 'start'])
+# values, ops and steps are linked stacks: (head, tail) tuples, None if empty.
+# number is the literal being typed, not yet on the value stack; expect is set
+# when the next key must start an operand; answer marks a shown '=' result.
+_State = namedtuple('_State', ['text', 'values', 'ops', 'steps', 'number', 'number_start',
+                               'expect', 'answer'])
+
+_EMPTY = _State('', None, None, None, None, 0, True, False)
+
+# Text accepted by feed(): numbers (thousands separators allowed), operators
+# and their display symbols, parentheses, and names (π, variables, function
+# calls; 'mod' is the operator)
+_FEED_TOKEN = re.compile(r"""
+    (?P<space>[\s]+)
+  | (?P<number>(?:\d[\d,_]*\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>π|[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<operator>\*\*|[-+*/%^×÷−])
+  | (?P<open>\()
+  | (?P<close>\))
+""", re.VERBOSE)
+_CALL_PAREN = re.compile(r"\s*\(")
+
+
+def _storable(value):
+    """Float of a step value for the history store"""
+    try:
+        return float(value)
+    except (OverflowError, TypeError, ValueError):
+        return math.inf
+
+
+class ExpressionBuffer:
+    """The expression being typed, parsed incrementally keystroke by keystroke
+
+    Keystroke methods return False (and change nothing) for keys that do not
+    fit, e.g. ')' without an open parenthesis.
+    """
+
+    def __init__(self, arithmetic=None, heavy_check=True):
+        self.arithmetic = arithmetic if arithmetic is not None else Arithmetic()
+        self.heavy_check = heavy_check
+        self._keys = []
+        self._states = [_EMPTY]
+
+    @property
+    def state(self):
+        return self._states[-1]
+
+    @property
+    def keys(self):
+        """Keystrokes so far, as (method, *args) tuples for replaying"""
+        return list(self._keys)
+
+    @property
+    def text(self):
+        """The expression as typed"""
+        return self.state.text
+
+    @property
+    def finished_text(self):
+        """The expression as evaluated: a dangling operator dropped and open
+        parentheses closed"""
+        state = self.state
+        text, ops, expect = state.text, state.ops, state.expect
+        while expect and ops is not None:
+            if ops[0].kind == 'binary':
+                expect = False
+            text = text[:ops[0].start]
+            ops = ops[1]
+        while ops is not None:
+            if ops[0].kind == 'open':
+                text += ')'
+            ops = ops[1]
+        return text.strip()
+
+    @property
+    def answered(self):
+        """Whether the buffer holds a result just shown by '='"""
+        return self.state.answer
+
+    def is_empty(self):
+        return not self._keys
+
+    def _commit(self, key, state):
+        self._keys.append(key)
+        self._states.append(state)
+        return True
+
+    # Keystrokes
+
+    def digit(self, char):
+        state = self.state
+        if state.number is not None:
+            number = char if state.number == '0' else state.number + char
+            return self._commit(('digit', char), state._replace(
+                number=number, text=state.text[:state.number_start] + number))
+        state = self._start_operand(state)
+        return self._commit(('digit', char), state._replace(
+            number=char, number_start=len(state.text), text=state.text + char, expect=False))
+
+    def point(self):
+        state = self.state
+        if state.number is not None:
+            if '.' in state.number:
+                return False
+            return self._commit(('point',), state._replace(
+                number=state.number + '.', text=state.text + '.'))
+        state = self._start_operand(state)
+        return self._commit(('point',), state._replace(
+            number='0.', number_start=len(state.text), text=state.text + '0.', expect=False))
+
+    def number(self, literal):
+        """A whole number literal at once (typed on after a number in progress)"""
+        state = self.state
+        if state.number is not None:
+            start = state.number_start
+            number = literal if state.number == '0' and literal[0] != '.' else state.number + literal
+        else:
+            state = self._start_operand(state)
+            start, number = len(state.text), literal
+        try:
+            self.arithmetic.number(number)
+        except (ArithmeticError, ValueError):
+            return False
+        return self._commit(('number', literal), state._replace(
+            number=number, number_start=start, text=state.text[:start] + number, expect=False))
+
+    def feed(self, text):
+        """Type a string of numbers, operators, parentheses and π
+
+        Every number is one key (so a long pasted number is a single step).
+        Stops at the first character or key that does not fit; returns the
+        number of characters consumed.
+        """
+        pos = 0
+        while pos < len(text):
+            match = _FEED_TOKEN.match(text, pos)
+            if match is None:
+                break
+            kind, token = match.lastgroup, match.group()
+            if kind == 'number':
+                accepted = self.number(token.replace(',', '').replace('_', ''))
+            elif kind == 'operator':
+                accepted = self.operator(token)
+            elif kind == 'open':
+                accepted = self.open()
+            elif kind == 'close':
+                accepted = self.close()
+            elif kind == 'name':
+                accepted, match = self._feed_name(token, text, match)
+            else:
+                accepted = True
+            if not accepted:
+                break
+            pos = match.end()
+        return pos
+
+    def _feed_name(self, name, text, match):
+        """feed() of a name; returns (accepted, match to continue after)"""
+        if name in ('π', 'pi'):
+            return self.constant('π'), match
+        if name == 'mod':
+            return self.operator('%'), match
+        paren = _CALL_PAREN.match(text, match.end())
+        if paren is not None and name in calc_engine.FUNCTIONS:
+            return self.open(name), paren
+        if name in self.arithmetic.variables:
+            return self.constant(name), match
+        return False, match
+
+    def operator(self, symbol):
+        op = calc_engine.OPERATOR_ALIASES.get(symbol, symbol)
+        power = calc_engine.BINARY_POWER.get(op)
+        if power is None:
+            return False
+        state = self._materialize(self.state)
+        if state.expect:
+            top = state.ops[0] if state.ops is not None else None
+            if op == '-':
+                # Unary minus
+                pending = _Pending('prefix', '+/-', calc_engine.PREFIX_POWER, len(state.text))
+                return self._commit(('operator', symbol), state._replace(
+                    ops=(pending, state.ops), text=state.text + '-'))
+            if top is not None and top.kind == 'binary':
+                # A second operator in a row replaces the first
+                state = state._replace(ops=state.ops[1], text=state.text[:top.start],
+                                       expect=False)
+            elif top is None and state.values is None:
+                # Nothing typed yet: 0 is the left operand
+                state = state._replace(values=(_Operand(self.arithmetic.number('0'), 0, '0'), None),
+                                       text='0', expect=False)
+            else:
+                return False
+        values, ops, steps = self._reduce(state.values, state.ops, state.steps,
+                                          power, op in calc_engine.RIGHT_ASSOCIATIVE)
+        pending = _Pending('binary', op, power, len(state.text))
+        return self._commit(('operator', symbol), state._replace(
+            values=values, ops=(pending, ops), steps=steps, text=f"{state.text} {op} ",
+            expect=True, answer=False))
+
+    def open(self, func=None):
+        """'(' or, with a function name, 'func(' applied when closed"""
+        state = self._start_operand(self._materialize(self.state))
+        pending = _Pending('open', func, 0, len(state.text))
+        return self._commit(('open', func), state._replace(
+            ops=(pending, state.ops), text=state.text + (func or '') + '(', expect=True))
+
+    def close(self):
+        state = self._materialize(self.state)
+        if state.expect:
+            return False
+        ops = state.ops
+        while ops is not None and ops[0].kind != 'open':
+            ops = ops[1]
+        if ops is None:
+            return False
+        values, ops, steps = self._reduce(state.values, state.ops, state.steps, -1, False)
+        values, ops, steps = self._close(values, ops, steps)
+        return self._commit(('close',), state._replace(
+            values=values, ops=ops, steps=steps, text=state.text + ')'))
+
+    def constant(self, name='π'):
+        state = self._start_operand(self._materialize(self.state))
+        operand = _Operand(self.arithmetic.number(name), len(state.text), None)
+        return self._commit(('constant', name), state._replace(
+            values=(operand, state.values), text=state.text + name, expect=False))
+
+    def apply(self, func, result):
+        """Replace the current operand by func(operand) = result (display text)"""
+        state = self._materialize(self.state)
+        if state.expect:
+            operand_text, start, values = '0', len(state.text), state.values
+        else:
+            operand = state.values[0]
+            operand_text, start, values = state.text[operand.start:], operand.start, state.values[1]
+        if operand_text.startswith('(') and operand_text.endswith(')'):
+            label = func + operand_text
+        else:
+            label = f"{func}({operand_text})"
+        operand = _Operand(self.arithmetic.result(result), start, result)
+        return self._commit(('apply', func, result), state._replace(
+            values=(operand, values), text=state.text[:start] + label,
+            expect=False, answer=False))
+
+    def answer(self, result):
+        """Start over from a result: operators continue it, digits replace it"""
+        self.clear()
+        operand = _Operand(self.arithmetic.result(result), 0, result)
+        return self._commit(('answer', result), _EMPTY._replace(
+            values=(operand, None), text=result, expect=False, answer=True))
+
+    def backspace(self):
+        """Undo the last keystroke"""
+        if not self._keys:
+            return False
+        self._keys.pop()
+        self._states.pop()
+        return True
+
+    def clear(self):
+        self._keys = []
+        self._states = [_EMPTY]
+
+    def set_arithmetic(self, arithmetic):
+        """Switch angle/precision mode and re-evaluate what has been typed"""
+        keys = self._keys
+        self.arithmetic = arithmetic
+        self.clear()
+        for key in keys:
+            getattr(self, key[0])(*key[1:])
+
+    # Parser internals
+
+    def _materialize(self, state):
+        """Move the literal being typed onto the value stack"""
+        if state.number is None:
+            return state
+        operand = _Operand(self.arithmetic.number(state.number), state.number_start, state.number)
+        return state._replace(values=(operand, state.values), number=None)
+
+    def _start_operand(self, state):
+        """State ready for a new operand: a new calculation after '=', or
+        implicit multiplication after a complete operand (2π, 2(3 + 1))"""
+        if state.answer:
+            return _EMPTY
+        if state.expect:
+            return state
+        state = self._materialize(state)
+        power = calc_engine.BINARY_POWER['*']
+        values, ops, steps = self._reduce(state.values, state.ops, state.steps, power, False)
+        pending = _Pending('binary', '*', power, len(state.text))
+        return state._replace(values=values, ops=(pending, ops), steps=steps, expect=True)
+
+    def _reduce(self, values, ops, steps, power, right_associative):
+        """Apply pending operators that bind at least as tightly as power;
+        returns the new (values, ops, steps) stacks"""
+        while ops is not None:
+            top = ops[0]
+            if top.kind == 'open' or top.power < power or (top.power == power and right_associative):
+                break
+            ops = ops[1]
+            if top.kind == 'prefix':
+                operand = values[0]
+                value, _ = self._apply(top.symbol, (operand.value,), None)
+                values = (_Operand(value, top.start, None), values[1])
+            else:
+                right, (left, values) = values[0], values[1]
+                value, steps = self._apply(top.symbol, (left.value, right.value), steps)
+                values = (_Operand(value, left.start, None), values)
+        return values, ops, steps
+
+    def _close(self, values, ops, steps):
+        """Pop the open parenthesis on top of ops, applying its function"""
+        opening, operand = ops[0], values[0]
+        value = operand.value
+        if opening.symbol is not None:
+            value, steps = self._apply(opening.symbol, (value,), steps)
+        return (_Operand(value, opening.start, None), values[1]), ops[1], steps
+
+    def _apply(self, op, operands, steps):
+        """Compute one step; returns (value, steps with the step recorded)"""
+        for value in operands:
+            if isinstance(value, Failure) or value is DEFERRED:
+                return value, steps
+        arithmetic = self.arithmetic
+        # Steps compute full numbers (not display text), even in float mode
+        if self.heavy_check and calc_worker.is_heavy(op, operands, is_degree=arithmetic.is_degree):
+            return DEFERRED, steps
+        try:
+            if len(operands) == 2:
+                value = arithmetic.operator(op, *operands)
+            else:
+                value = arithmetic.function(op, operands[0])
+        except calc_engine.CalculationError as e:
+            return Failure(str(e), op, operands), steps
+        return value, ((op, operands, value), steps)
+
+    def _finish(self):
+        """(value, steps) of the expression with dangling operators dropped
+        and open parentheses closed; value is None if nothing is typed"""
+        state = self.state
+        values, ops, steps, expect = state.values, state.ops, state.steps, state.expect
+        if state.number is not None:
+            values = (_Operand(self.arithmetic.number(state.number), 0, None), values)
+        while expect and ops is not None:
+            if ops[0].kind == 'binary':
+                expect = False
+            ops = ops[1]
+        if expect:
+            return None, None
+        while True:
+            values, ops, steps = self._reduce(values, ops, steps, -1, False)
+            if ops is None:
+                return values[0].value, steps
+            values, ops, steps = self._close(values, ops, steps)
+
+    # Results
+
+    @property
+    def entry(self):
+        """What the main display shows: the number being typed or the last operand"""
+        state = self.state
+        if state.number is not None:
+            return state.number
+        if state.expect:
+            return '0'
+        operand = state.values[0]
+        if operand.entry is not None:
+            return operand.entry
+        return self._format(operand.value) or 'Error'
+
+    def operand(self):
+        """Value of the current operand (0 if none), for function buttons"""
+        state = self._materialize(self.state)
+        if state.expect:
+            return self.arithmetic.number('0')
+        value = state.values[0].value
+        if isinstance(value, Failure):
+            raise calc_engine.CalculationError(value.message)
+        if value is DEFERRED:
+            raise calc_engine.CalculationError("Invalid operation")
+        return value
+
+    def _format(self, value):
+        if value is None or isinstance(value, Failure):
+            return None
+        if value is DEFERRED:
+            return '…'
+        try:
+            return self.arithmetic.format(value)
+        except calc_engine.CalculationError:
+            return None
+
+    def preview(self):
+        """Display text of the expression's value so far, or None"""
+        return self._format(self._finish()[0])
+
+    def needs_worker(self):
+        """Whether evaluating needs the worker process (a heavy step)"""
+        return self._finish()[0] is DEFERRED
+
+    def evaluate(self):
+        """Return (display text, steps) of the whole expression
+
+        steps lists every binary operation and function call as
+        (op, operands, result) with float values, oldest first.
+        Raises ExpressionError for a failed step and CalculationError for
+        an empty or deferred expression.
+        """
+        value, steps = self._finish()
+        if value is None:
+            raise calc_engine.CalculationError("Invalid expression")
+        if isinstance(value, Failure):
+            raise ExpressionError(value.message, value.op,
+                                  tuple(_storable(num) for num in value.operands))
+        if value is DEFERRED:
+            raise calc_engine.CalculationError("Needs the worker process")
+        text = self.arithmetic.format(value)
+        recorded = []
+        while steps is not None:
+            (op, operands, result), steps = steps
+            recorded.append((op, tuple(_storable(num) for num in operands), _storable(result)))
+        recorded.reverse()
+        return text, recorded
+
+
+def evaluate_keys(keys, is_degree, mode, precision, variables=None, definitions=()):
+    """ExpressionBuffer.evaluate() of replayed keystrokes with every step
+    computed (picklable, for the worker process)
+
+    definitions are the user functions the keys may call, as
+    calc_variables.Workspace.definitions() text.
+    """
+    if definitions:
+        import calc_variables
+        calc_variables.install(definitions, variables)
+    buffer = ExpressionBuffer(Arithmetic(is_degree, mode, precision, variables), heavy_check=False)
+    for key in keys:
+        getattr(buffer, key[0])(*key[1:])
+    return buffer.evaluate()
@@ -0,0 +1,142 @@
+"""
+Factorial Engine
+Exact and approximate factorials for the calculator's n! function.
+
+- n < TABLE_SIZE: looked up in a precomputed table
+- n < SWING_THRESHOLD: math.factorial
+- larger n: Luschny's prime-swing algorithm, which beats math.factorial for
+  big n because most of its work is squaring
+
+For display, results with more than EXACT_DISPLAY_DIGITS digits are shown in
+scientific notation computed from a high-precision Stirling series, which
+takes constant time: the exact integer is never built or converted to a
+string, so pressing n! on a huge number cannot freeze the GUI or hit Python's
+int-to-str digit limit.
+"""
+
+import math
+from decimal import Decimal, localcontext
+
+TABLE_SIZE = 256
+SWING_THRESHOLD = 20000
+EXACT_DISPLAY_DIGITS = 1000
+SIGNIFICANT_DIGITS = 10
+
+_TABLE = [1]
+for _n in range(1, TABLE_SIZE):
+    _TABLE.append(_TABLE[-1] * _n)
+del _n
+
+
+def _primes(limit):
+    """Primes up to limit (sieve of Eratosthenes)"""
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0:2] = b'\x00\x00'
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = bytes(len(range(i*i, limit + 1, i)))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+def _product(factors):
+    """Balanced product tree (keeps the big multiplications even-sized)"""
+    while len(factors) > 1:
+        paired = [factors[i] * factors[i + 1] for i in range(0, len(factors) - 1, 2)]
+        if len(factors) % 2:
+            paired.append(factors[-1])
+        factors = paired
+    return factors[0] if factors else 1
+
+
+def _swing(n, primes):
+    """Swinging factorial n! / (n//2)!^2 from its prime factorization"""
+    factors = []
+    for p in primes:
+        if p > n:
+            break
+        q, power = n, 1
+        while True:
+            q //= p
+            if q == 0:
+                break
+            if q & 1:
+                power *= p
+        if power > 1:
+            factors.append(power)
+    return _product(factors)
+
+
+def _prime_swing_factorial(n, primes):
+    if n < TABLE_SIZE:
+        return _TABLE[n]
+    return _prime_swing_factorial(n // 2, primes) ** 2 * _swing(n, primes)
+
+
+def factorial(n):
+    """Exact n! for a non-negative int"""
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    if n < TABLE_SIZE:
+        return _TABLE[n]
+    if n < SWING_THRESHOLD:
+        return math.factorial(n)
+    return _prime_swing_factorial(n, _primes(n))
+
+
+# Approximations
+
+# Bernoulli terms B(2k) / (2k (2k-1)) of the Stirling series
+_STIRLING_TERMS = [
+    (1, 12), (-1, 360), (1, 1260), (-1, 1680), (1, 1188), (-691, 360360),
+]
+
+
+def log10_factorial(n, precision=50):
+    """log10(n!) as a Decimal, accurate to about precision significant digits"""
+    if n < TABLE_SIZE:
+        with localcontext() as ctx:
+            ctx.prec = precision
+            return Decimal(_TABLE[n]).log10()
+    with localcontext() as ctx:
+        ctx.prec = precision
+        big_n = Decimal(n)
+        ln = big_n * big_n.ln() - big_n + (2 * Decimal(math.pi) * big_n).ln() / 2
+        power = big_n
+        for numerator, denominator in _STIRLING_TERMS:
+            ln += Decimal(numerator) / (denominator * power)
+            power *= big_n * big_n
+        return ln / Decimal(10).ln()
+
+
+def lgamma_factorial(n):
+    """Fast float approximation of ln(n!) via math.lgamma"""
+    return math.lgamma(n + 1)
+
+
+def digit_count(n):
+    """Number of decimal digits of n!"""
+    if n < TABLE_SIZE:
+        return len(str(_TABLE[n]))
+    return int(log10_factorial(n)) + 1
+
+
+def scientific_factorial(n, digits=SIGNIFICANT_DIGITS):
+    """Return n! as a 'd.ddd…e+X' string without computing it exactly"""
+    # Extra precision covers the integer part of the logarithm
+    log10 = log10_factorial(n, precision=digits + len(str(n)) + 10)
+    exponent = int(log10)
+    with localcontext() as ctx:
+        ctx.prec = digits + 5
+        mantissa = Decimal(10) ** (log10 - exponent)
+    mantissa = round(mantissa, digits - 1)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+    return f"{mantissa:.{digits - 1}f}e+{exponent}"
+
+
+def display_factorial(n):
+    """n! as the display shows it: exact int, or scientific notation if huge"""
+    if n < TABLE_SIZE or digit_count(n) <= EXACT_DISPLAY_DIGITS:
+        return factorial(n)
+    return scientific_factorial(n)
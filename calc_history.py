@@ -0,0 +1,237 @@
+"""
+Calculation History
+Bounded history storage for the Scientific Calculator.
+
+HistoryBuffer is a ring buffer (newest entry first). Adding an entry costs
+the same no matter how large the capacity is, and reports which entry fell
+off the end, so the GUI can patch its text widget one line at a time instead
+of rebuilding it.
+
+HistoryStore persists every calculation to a memory-mapped file of
+fixed-size binary records, so the audit trail survives across sessions and
+can be queried by operation, time range and result.
+"""
+
+import math
+import mmap
+import os
+import struct
+import time
+from collections import deque, namedtuple
+
+import calc_engine
+
+DEFAULT_CAPACITY = 10000
+
+
+class HistoryBuffer:
+    """Fixed-capacity history, newest entry at index 0"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+
+    def add(self, entry):
+        """Add an entry; return the entry evicted to make room, or None"""
+        evicted = None
+        if len(self._entries) == self.capacity:
+            evicted = self._entries[-1]
+        self._entries.appendleft(entry)
+        return evicted
+
+    def extend_older(self, entries):
+        """Add older entries at the end while there is room; return how many"""
+        room = self.capacity - len(self._entries)
+        entries = entries[:room]
+        self._entries.extend(entries)
+        return len(entries)
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+
+# Persistent history store
+#
+# File layout: a 16-byte header (magic, record count) followed by fixed-size
+# little-endian records:
+#   timestamp (f8) | operation code (u1) | error flag (u1) | padding (6)
+#   | operand 1 (f8) | operand 2 (f8) | result (f8)
+# Records are appended in timestamp order, so time-range queries are a
+# binary search and never need a separate index file.
+
+HISTORY_FILE = os.path.join(os.path.expanduser('~'), '.scientific_calculator_history.bin')
+
+_MAGIC = b'SCHIST01'
+_HEADER = struct.Struct('<8sQ')
+_RECORD = struct.Struct('<dBB6xddd')
+_INITIAL_RECORDS = 1024
+
+# Operation codes (0 is unknown); binary operators and functions are kept in
+# separate tables because '%' is both modulo and percent
+OPERATOR_CODES = {'+': 1, '-': 2, '*': 3, '/': 4, '%': 5, '**': 6}
+FUNCTION_CODES = {
+    'sin': 16, 'cos': 17, 'tan': 18, '√': 19, '∛': 20, 'ln': 21, 'log': 22,
+    'x²': 23, '|x|': 24, 'n!': 25, '%': 26, '+/-': 27,
+}
+_CODE_LABELS = {code: op for op, code in OPERATOR_CODES.items()}
+_CODE_LABELS.update({code: func for func, code in FUNCTION_CODES.items()})
+
+HistoryRecord = namedtuple(
+    'HistoryRecord', ['timestamp', 'op', 'error', 'num1', 'num2', 'result']
+)
+
+
+def operation_code(op, arity):
+    """Return the stored code for an operator (arity 2) or function (arity 1)"""
+    table = OPERATOR_CODES if arity == 2 else FUNCTION_CODES
+    return table.get(op, 0)
+
+
+def _fraction_value(text):
+    """Float value of a "p/q" result from exact mode (inf if it isn't one)"""
+    try:
+        numerator, denominator = str(text).split('/')
+        return int(numerator) / int(denominator)
+    except (OverflowError, ValueError):
+        return math.inf
+
+
+def format_record(record):
+    """Format a stored record the way the History panel shows entries"""
+    if record.error:
+        result = "Error"
+    else:
+        try:
+            result = calc_engine.format_result(record.result)
+        except (OverflowError, ValueError):
+            result = record.result
+    if not math.isnan(record.num2):
+        return f"{record.num1} {record.op} {record.num2} = {result}"
+    return f"{record.op}({record.num1}) = {result}"
+
+
+class HistoryStore:
+    """Append-only, memory-mapped calculation history file"""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, 0))
+                f.truncate(_HEADER.size + _INITIAL_RECORDS * _RECORD.size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Not a calculator history file: {path}")
+        self._capacity = (len(self._map) - _HEADER.size) // _RECORD.size
+        self._last_timestamp = self.record(self._count - 1).timestamp if self._count else 0.0
+
+    def __len__(self):
+        return self._count
+
+    def _grow(self):
+        """Double the file size and remap it"""
+        self._capacity *= 2
+        self._map.close()
+        self._file.truncate(_HEADER.size + self._capacity * _RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def append(self, op, operands, result, error=False, timestamp=None):
+        """Append one calculation record"""
+        if self._count == self._capacity:
+            self._grow()
+        # Keep timestamps sorted even if the wall clock steps backwards
+        timestamp = max(time.time() if timestamp is None else timestamp,
+                        self._last_timestamp)
+        num1 = float(operands[0]) if operands else math.nan
+        num2 = float(operands[1]) if len(operands) > 1 else math.nan
+        try:
+            result = float(result)
+        except (OverflowError, TypeError, ValueError):
+            result = _fraction_value(result) if result is not None else math.nan
+        _RECORD.pack_into(self._map, _HEADER.size + self._count * _RECORD.size,
+                          timestamp, operation_code(op, len(operands)),
+                          1 if error else 0, num1, num2, result)
+        self._count += 1
+        self._last_timestamp = timestamp
+        _HEADER.pack_into(self._map, 0, _MAGIC, self._count)
+
+    def record(self, index):
+        """Return record number index (oldest is 0)"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history record out of range")
+        timestamp, code, error, num1, num2, result = _RECORD.unpack_from(
+            self._map, _HEADER.size + index * _RECORD.size)
+        return HistoryRecord(timestamp, _CODE_LABELS.get(code, '?'), bool(error),
+                             num1, num2, result)
+
+    def page(self, offset, count):
+        """Return up to count records, newest first, skipping the offset newest"""
+        stop = self._count - offset
+        start = max(stop - count, 0)
+        return [self.record(i) for i in range(stop - 1, start - 1, -1)]
+
+    def as_array(self):
+        """Zero-copy NumPy structured view of all records
+
+        The file cannot grow while a view is alive, so do not keep it around.
+        """
+        import numpy as np
+        dtype = np.dtype([('timestamp', '<f8'), ('code', 'u1'), ('error', 'u1'),
+                          ('pad', 'V6'), ('num1', '<f8'), ('num2', '<f8'),
+                          ('result', '<f8')])
+        return np.frombuffer(self._map, dtype=dtype, count=self._count,
+                             offset=_HEADER.size)
+
+    def query(self, op=None, arity=1, since=None, until=None,
+              min_result=None, max_result=None, errors=None):
+        """Return matching records (oldest first) as a NumPy structured array
+
+        Time bounds are located by binary search over the sorted timestamps;
+        the remaining filters are vectorized over that slice.
+        """
+        import numpy as np
+        records = self.as_array()
+        start = 0 if since is None else np.searchsorted(records['timestamp'], since, 'left')
+        stop = len(records) if until is None else np.searchsorted(records['timestamp'], until, 'right')
+        records = records[start:stop]
+
+        mask = np.ones(len(records), dtype=bool)
+        if op is not None:
+            mask &= records['code'] == operation_code(op, arity)
+        if min_result is not None:
+            mask &= records['result'] > min_result
+        if max_result is not None:
+            mask &= records['result'] < max_result
+        if errors is not None:
+            mask &= records['error'] == (1 if errors else 0)
+        return records[mask].copy()
+
+    def clear(self):
+        """Remove all records"""
+        self._count = 0
+        self._last_timestamp = 0.0
+        _HEADER.pack_into(self._map, 0, _MAGIC, 0)
+
+    def close(self):
+        """Flush and close the file"""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
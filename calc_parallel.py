@@ -0,0 +1,66 @@
+"""
+Parallel Batch Evaluation
+Shards expression batches across a multiprocessing pool.
+
+Work is cut into chunks, and each chunk is evaluated in a worker process with
+the same semantics as the CLI (calc_cli.evaluate_line). Results are yielded
+strictly in input order, even when cheap and expensive chunks finish out of
+order. Only a bounded number of chunks are in flight at once, so arbitrarily
+long inputs are streamed in constant memory.
+
+Usage:
+    results = evaluate_parallel(expressions, workers=8)
+"""
+
+import itertools
+import multiprocessing
+import os
+from collections import deque
+
+import calc_cli
+
+DEFAULT_CHUNK_SIZE = 2000
+# Chunks queued per worker, keeps every core busy without unbounded buffering
+IN_FLIGHT_PER_WORKER = 4
+
+
+def chunked(items, chunk_size):
+    """Yield lists of up to chunk_size items"""
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_ordered(function, chunks, workers=None, *args):
+    """Yield function(chunk, *args) for every chunk, in order, using a pool"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield function(chunk, *args)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        limit = workers * IN_FLIGHT_PER_WORKER
+        for chunk in chunks:
+            pending.append(pool.apply_async(function, (chunk,) + args))
+            # Hand back finished chunks in order before queueing more
+            while len(pending) >= limit or (pending and pending[0].ready()):
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def _evaluate_chunk(chunk, is_degree):
+    return [calc_cli.evaluate_line(expr, is_degree) for expr in chunk]
+
+
+def evaluate_parallel(expressions, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      is_degree=True):
+    """Yield (result text, error code, error message) per expression, in order"""
+    chunks = chunked(expressions, chunk_size)
+    for results in map_ordered(_evaluate_chunk, chunks, workers, is_degree):
+        yield from results
@@ -0,0 +1,342 @@
+"""
+Graph Panel Plotting
+Reusable matplotlib figures for the calculator's graph panel.
+
+The figure, axes, curve and Tk canvas are built once per DEG/RAD mode and
+show any plottable button function or expression in x. Curve data comes from
+calc_sampling (adaptively sampled and cached), so switching functions only
+swaps the line's data. Marking a new point only moves the scatter marker and
+updates the legend text, and is redrawn with blitting: the static background
+(curve, grid, labels) is cached after each full draw and only the marker and
+legend are painted over it.
+
+The graph can be panned (drag) and zoomed (mouse wheel, about the cursor);
+double-click returns to the function's default range. While the view moves,
+full redraws are throttled to one per FRAME_MS, and the curve is re-sampled
+for the visible window at screen resolution in a worker thread, so deep
+zooms show real detail rather than an interpolated global array.
+
+An integral's area is shaded and a derivative's tangent line drawn from the
+curve samples already on screen, without evaluating the function again.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+import calc_sampling
+
+# At most one full redraw per FRAME_MS while panning/zooming (30 fps)
+FRAME_MS = 33
+ZOOM_STEP = 1.25
+# Re-sampled windows extend this many visible widths past each side, so
+# panning a little does not need new samples
+RESAMPLE_MARGIN = 1
+# Zooming in by this factor since the last sampling triggers a resample
+DETAIL_FACTOR = 2
+
+
+def can_plot(func):
+    """Whether a scientific button has a curve"""
+    return func in calc_sampling.CURVES
+
+
+class FunctionPlot:
+    """Function curve figure embedded in a Tk container, reused between presses"""
+
+    def __init__(self, master, is_degree):
+        self.is_degree = is_degree
+        self.function = None
+        self.x_range = None
+        # Set when definitions changed, so the curve on screen is outdated
+        self.stale = False
+        # (x_min, x_max, visible width) the line's data was sampled for
+        self.sampled = None
+        self._drag = None
+        self._frame_pending = False
+        self._last_frame = 0.0
+        self._executor = None
+        self._resample_job = None
+        self._resample_wanted = False
+
+        # Figure objects are not registered with pyplot, so nothing piles up
+        self.figure = Figure(figsize=(5, 4), facecolor='#2d2d44')
+        self.ax = self.figure.add_subplot()
+        ax = self.ax
+        ax.set_facecolor('#16213e')
+
+        # Curve data is swapped in by plot()
+        self.line, = ax.plot([], [], color='#5e60ce', linewidth=2, label='f(x)')
+
+        # Calculated point, moved with set_offsets on every press
+        self.marker = ax.scatter([0], [0], color='#ff6b6b', s=100, zorder=5,
+                                 label='f(x)', animated=True)
+
+        # Integral area and tangent line of the current curve (not in the legend)
+        self.area = None
+        self.tangent_line = None
+
+        # Styling
+        ax.set_xlabel('x', color='#ffffff', fontsize=10)
+        ax.set_ylabel('f(x)', color='#ffffff', fontsize=10)
+        ax.set_title('Function Curve', color='#ffffff', fontsize=12, fontweight='bold')
+        ax.grid(True, alpha=0.3, color='#a8a8ff')
+        ax.axhline(0, color='#ffffff', linewidth=0.5, alpha=0.5)
+        ax.axvline(0, color='#ffffff', linewidth=0.5, alpha=0.5)
+        ax.tick_params(colors='#ffffff', labelsize=8)
+        # Fixed location: 'best' would be re-searched on every blit
+        self.legend = ax.legend(loc='upper right', facecolor='#2d2d44',
+                                edgecolor='#5e60ce', labelcolor='#ffffff',
+                                fontsize=8)
+        self.legend.set_animated(True)
+        self.curve_label, self.marker_label = self.legend.get_texts()
+
+        # Adjust spines
+        for spine in ax.spines.values():
+            spine.set_color('#5e60ce')
+
+        self.figure.tight_layout()
+
+        # Embed in tkinter
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.canvas.mpl_connect('button_press_event', self._on_press)
+        self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+        self.canvas.mpl_connect('button_release_event', self._on_release)
+
+    def _on_draw(self, event):
+        """Cache the static background after every full redraw"""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.marker)
+        self.ax.draw_artist(self.legend)
+
+    def plot(self, func, x_range=None):
+        """Show the curve of a button function or expression over x_range
+
+        Without x_range, a function already on screen keeps its pan/zoom
+        (and is only resampled if invalidate() was called).
+        """
+        refresh = func == self.function and self.stale
+        if func == self.function and x_range is None:
+            if not refresh:
+                return
+            x_range = self.x_range
+        samples = calc_sampling.sample_curve(func, self.is_degree, x_range)
+        if func == self.function and samples.x_range == self.x_range and not refresh:
+            return
+        if func != self.function or refresh:
+            self.clear_overlays()
+        self.stale = False
+        self.function = func
+        self.x_range = samples.x_range
+        self.sampled = (*samples.x_range, samples.x_range[1] - samples.x_range[0])
+        # Samples being computed for the previous view are dropped
+        self._resample_job = None
+        self._resample_wanted = False
+
+        name = calc_sampling.curve_name(func)
+        self.line.set_data(samples.x, samples.y)
+        self.ax.set_xlim(*samples.x_range)
+        self.ax.set_ylim(*samples.y_limits)
+        if calc_sampling.mode_dependent(func):
+            xlabel = 'Angle (degrees)' if self.is_degree else 'Angle (radians)'
+        else:
+            xlabel = 'x'
+        self.ax.set_xlabel(xlabel, color='#ffffff', fontsize=10)
+        self.ax.set_ylabel(name, color='#ffffff', fontsize=10)
+        self.ax.set_title(f'y = {name}', color='#ffffff', fontsize=12, fontweight='bold')
+        self.curve_label.set_text(name)
+
+        # The background changed; the next draw re-caches it
+        self.background = None
+        self.canvas.draw_idle()
+
+    def mark(self, x, y, label=None):
+        """Move the marker to (x, y) on the current curve and redraw"""
+        x_min, x_max = self.ax.get_xlim()
+        if not x_min <= x <= x_max:
+            self.plot(self.function, calc_sampling.range_containing(
+                self.function, self.is_degree, self.x_range, x))
+
+        self.marker.set_offsets([[x, y]])
+        if label is not None:
+            self.marker_label.set_text(label)
+        elif self.function in calc_sampling.CURVES:
+            # 'sin(x)' -> 'sin(30.00)', '√x' -> '√2.00'
+            point = calc_sampling.curve_name(self.function).replace('x', f'{x:.2f}')
+            self.marker_label.set_text(f'{point} = {y:.4f}')
+        else:
+            self.marker_label.set_text(f'f({x:.2f}) = {y:.4f}')
+
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
+
+    # Integral area and tangent line
+
+    def shade(self, func, low, high):
+        """Shade the area between a curve and the x axis from low to high"""
+        self.plot(func)
+        x_min, x_max = self.x_range
+        if low < x_min or high > x_max:
+            pad = (high - low) * 0.1
+            self.plot(func, (min(x_min, low - pad), max(x_max, high + pad)))
+
+        # The curve's own samples, with the ends interpolated
+        x, y = self.line.get_data()
+        inside = (x > low) & (x < high)
+        area_x = np.concatenate(([low], x[inside], [high]))
+        area_y = np.concatenate(([np.interp(low, x, y)], y[inside], [np.interp(high, x, y)]))
+        if self.area is not None:
+            self.area.remove()
+        self.area = self.ax.fill_between(area_x, area_y, where=np.isfinite(area_y),
+                                         color='#5e60ce', alpha=0.35, linewidth=0)
+        self.background = None
+        self.canvas.draw_idle()
+
+    def tangent(self, func, x, y, slope, label=None):
+        """Draw a curve's tangent line at (x, y) and mark the point"""
+        self.plot(func)
+        if self.tangent_line is not None:
+            self.tangent_line.remove()
+        self.tangent_line = self.ax.axline((x, y), slope=slope, color='#ffd166',
+                                           linewidth=1.5, linestyle='--')
+        # The line is part of the background; mark() redraws it all
+        self.background = None
+        self.mark(x, y, label)
+
+    def invalidate(self):
+        """Mark the curve on screen outdated (a definition it uses changed)"""
+        self.stale = True
+
+    def clear_overlays(self):
+        """Remove the shaded area and tangent line"""
+        if self.area is not None:
+            self.area.remove()
+            self.area = None
+        if self.tangent_line is not None:
+            self.tangent_line.remove()
+            self.tangent_line = None
+
+    # Pan and zoom
+
+    def _on_scroll(self, event):
+        """Zoom in (wheel up) or out about the cursor"""
+        if event.inaxes is not self.ax or self.function is None:
+            return
+        scale = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        (x_min, x_max), (y_min, y_max) = self.ax.get_xlim(), self.ax.get_ylim()
+        x, y = event.xdata, event.ydata
+        self._set_view((x - (x - x_min) * scale, x + (x_max - x) * scale),
+                       (y - (y - y_min) * scale, y + (y_max - y) * scale))
+
+    def _on_press(self, event):
+        if event.inaxes is not self.ax or event.button != 1 or self.function is None:
+            return
+        if event.dblclick:
+            self._drag = None
+            self.plot(self.function, calc_sampling.default_range(self.function, self.is_degree))
+            return
+        # Pixel positions, since data coordinates move with the view
+        self._drag = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim())
+
+    def _on_motion(self, event):
+        """Pan by the distance dragged"""
+        if self._drag is None or event.x is None:
+            return
+        x0, y0, (x_min, x_max), (y_min, y_max) = self._drag
+        bbox = self.ax.bbox
+        dx = (event.x - x0) * (x_max - x_min) / bbox.width
+        dy = (event.y - y0) * (y_max - y_min) / bbox.height
+        self._set_view((x_min - dx, x_max - dx), (y_min - dy, y_max - dy))
+
+    def _on_release(self, event):
+        self._drag = None
+
+    def _set_view(self, x_range, y_range):
+        self.ax.set_xlim(*x_range)
+        self.ax.set_ylim(*y_range)
+        self.x_range = tuple(x_range)
+        if self._needs_resample():
+            self._request_resample()
+        self._schedule_frame()
+
+    def _needs_resample(self):
+        sampled_min, sampled_max, sampled_width = self.sampled
+        x_min, x_max = self.x_range
+        return (x_min < sampled_min or x_max > sampled_max
+                or (x_max - x_min) * DETAIL_FACTOR < sampled_width
+                or (x_max - x_min) > sampled_width * DETAIL_FACTOR)
+
+    def _request_resample(self):
+        # One job at a time; a request made meanwhile runs when it finishes
+        self._resample_wanted = True
+        if self._resample_job is None:
+            self._start_resample()
+
+    def _start_resample(self):
+        self._resample_wanted = False
+        (x_min, x_max), y_limits = self.ax.get_xlim(), self.ax.get_ylim()
+        width = x_max - x_min
+        window = (x_min - RESAMPLE_MARGIN * width, x_max + RESAMPLE_MARGIN * width)
+        pixels = (self.ax.bbox.width * (1 + 2 * RESAMPLE_MARGIN), self.ax.bbox.height)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        future = self._executor.submit(calc_sampling.sample_window, self.function,
+                                       self.is_degree, window, y_limits, pixels)
+        job = (future, self.function, width)
+        self._resample_job = job
+        self.widget.after(FRAME_MS, self._poll_resample, job)
+
+    def _poll_resample(self, job):
+        if job is not self._resample_job:
+            return
+        future, function, width = job
+        if not future.done():
+            self.widget.after(FRAME_MS, self._poll_resample, job)
+            return
+
+        self._resample_job = None
+        try:
+            samples = future.result()
+        except Exception:
+            samples = None
+        if samples is not None and function == self.function:
+            self.line.set_data(samples.x, samples.y)
+            self.sampled = (*samples.x_range, width)
+            self._schedule_frame()
+        if self._resample_wanted:
+            self._resample_wanted = False
+            if self._needs_resample():
+                self._start_resample()
+
+    def _schedule_frame(self):
+        """Throttled full redraw (axes, ticks and curve move together)"""
+        if self._frame_pending:
+            return
+        self._frame_pending = True
+        wait = FRAME_MS - (time.perf_counter() - self._last_frame) * 1000
+        self.widget.after(max(int(wait), 0), self._draw_frame)
+
+    def _draw_frame(self):
+        self._frame_pending = False
+        self._last_frame = time.perf_counter()
+        self.canvas.draw_idle()
+
+    def show(self):
+        self.widget.pack(fill='both', expand=True, padx=10, pady=10)
+
+    def hide(self):
+        self.widget.pack_forget()
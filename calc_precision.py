@@ -0,0 +1,437 @@
+"""
+Precision Modes
+Arbitrary-precision evaluation for the calculator.
+
+Three modes:
+- 'float':   the normal engine (binary floats, round(result, 10) display)
+- 'decimal': decimal.Decimal arithmetic with a configurable number of
+             significant digits; 0.1 + 0.2 is exactly 0.3
+- 'exact':   fractions.Fraction, so +, -, ×, ÷, integer powers, x², n!,
+             perfect square/cube roots and trig at special angles stay exact;
+             anything irrational falls back to Decimal at the given precision
+
+When the requested decimal precision fits in a double (FLOAT_DIGITS or
+fewer), the fast float engine is used and its result rounded instead.
+User functions evaluate their body in the mode; other functions without a
+precise implementation (plugins) are refused outside float mode rather than
+quietly computed in floats.
+The same domain checks and error messages as the float engine apply.
+"""
+
+import functools
+import math
+from decimal import Decimal, DecimalException, InvalidOperation, localcontext
+from fractions import Fraction
+
+import calc_engine
+import calc_factorial
+
+MODES = ('float', 'decimal', 'exact')
+DEFAULT_PRECISION = 50
+# Significant digits a double reproduces reliably
+FLOAT_DIGITS = 15
+
+_LOG10_2 = math.log10(2)
+
+
+def to_number(text, mode, precision=DEFAULT_PRECISION):
+    """Convert display/literal text to the mode's number type
+
+    Besides numbers and π this accepts the "p/q" text exact mode displays.
+    """
+    if text in calc_engine.CONSTANTS:
+        return _pi_value(mode, precision)
+    if '/' in text:
+        value = Fraction(text)
+        if mode == 'exact':
+            return value
+        if mode == 'float':
+            return float(value)
+        with localcontext() as ctx:
+            ctx.prec = precision
+            return _decimal(value)
+    if mode == 'float':
+        return float(text)
+    if mode == 'decimal':
+        return Decimal(text)
+    return Fraction(text)
+
+
+def result_number(text, mode, precision=DEFAULT_PRECISION):
+    """Convert a displayed result back to the mode's number type
+
+    Exact mode shows rounded values (irrational results, fractions too long
+    to show) as decimals; those stay Decimal rather than becoming a huge
+    fraction of their digits.
+    """
+    if mode == 'exact' and '/' not in text and any(c in text for c in '.eE'):
+        with localcontext() as ctx:
+            ctx.prec = precision
+            return +Decimal(text)
+    return to_number(text, mode, precision)
+
+
+def _pi_value(mode, precision=DEFAULT_PRECISION):
+    # π is irrational, so exact mode also gets a Decimal
+    return calc_engine.CONSTANTS['π'] if mode == 'float' else pi(precision)
+
+
+def _decimal(num):
+    """Convert any mode's number to Decimal under the current context"""
+    if isinstance(num, Fraction):
+        return Decimal(num.numerator) / Decimal(num.denominator)
+    if isinstance(num, float):
+        return Decimal(repr(num))
+    return +Decimal(num)
+
+
+def _is_integral(num):
+    return num == int(num)
+
+
+# Decimal transcendental functions (recipes from the decimal module docs)
+
+@functools.lru_cache(maxsize=16)
+def pi(precision):
+    """π to precision significant digits"""
+    with localcontext() as ctx:
+        ctx.prec = precision + 2
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return +s
+
+
+def _reduce_radians(x, precision):
+    """x mod 2π, computed with enough extra digits for large x"""
+    extra = max(x.adjusted(), 0) + 5
+    with localcontext() as ctx:
+        ctx.prec = precision + extra
+        two_pi = 2 * pi(precision + extra)
+        return x % two_pi
+
+
+def _sin_series(x):
+    i, lasts, s, fact, num, sign = 1, 0, x, 1, x, 1
+    while s != lasts:
+        lasts = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    return s
+
+
+def _cos_series(x):
+    i, lasts, s, fact, num, sign = 0, 0, 1, 1, 1, 1
+    while s != lasts:
+        lasts = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    return s
+
+
+# Trig values that are rational at special angles (degrees mod 360)
+_RATIONAL_TRIG = {
+    'sin': {0: 0, 30: Fraction(1, 2), 90: 1, 150: Fraction(1, 2), 180: 0,
+            210: Fraction(-1, 2), 270: -1, 330: Fraction(-1, 2)},
+    'cos': {0: 1, 60: Fraction(1, 2), 90: 0, 120: Fraction(-1, 2), 180: -1,
+            240: Fraction(-1, 2), 270: 0, 300: Fraction(1, 2)},
+    'tan': {0: 0, 45: 1, 135: -1, 180: 0, 225: 1, 315: -1},
+}
+
+
+def _trig(name, num, is_degree, precision):
+    if is_degree:
+        # Reduce exactly in degrees before converting
+        angle = _modulo(num, 360)
+        if _is_integral(angle):
+            exact = _RATIONAL_TRIG[name].get(int(angle))
+            if exact is not None:
+                exact = Fraction(exact)
+                return exact if isinstance(num, Fraction) else _decimal(exact)
+            if name == 'tan' and int(angle) in (90, 270):
+                raise calc_engine.CalculationError("Tangent undefined")
+    with localcontext() as ctx:
+        ctx.prec = precision + 5
+        x = _decimal(angle if is_degree else num)
+        if is_degree:
+            x = x * pi(precision + 5) / 180
+        else:
+            x = _reduce_radians(x, precision + 5)
+        if name == 'sin':
+            result = _sin_series(x)
+        elif name == 'cos':
+            result = _cos_series(x)
+        else:
+            result = _sin_series(x) / _cos_series(x)
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return +result
+
+
+def _integer_root(value, degree):
+    """Exact integer root of a non-negative int, or None"""
+    if value < 2:
+        return value
+    root = round(value ** (1 / degree)) if value.bit_length() < 1000 else _newton_root(value, degree)
+    for candidate in (root - 1, root, root + 1):
+        if candidate ** degree == value:
+            return candidate
+    return None
+
+
+def _newton_root(value, degree):
+    x = 1 << -(-value.bit_length() // degree)
+    while True:
+        y = ((degree - 1) * x + value // x ** (degree - 1)) // degree
+        if y >= x:
+            return x
+        x = y
+
+
+def _exact_root(num, degree):
+    """Exact root of a non-negative Fraction, or None"""
+    numerator = _integer_root(num.numerator, degree)
+    denominator = _integer_root(num.denominator, degree)
+    if numerator is None or denominator is None:
+        return None
+    return Fraction(numerator, denominator)
+
+
+# Precise function implementations: (num, is_degree, precision) -> number
+# Fraction results are exact; Decimal results carry precision digits.
+
+def _sqrt(num, is_degree, precision):
+    if isinstance(num, Fraction):
+        exact = _exact_root(num, 2)
+        if exact is not None:
+            return exact
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return _decimal(num).sqrt()
+
+
+def _cbrt(num, is_degree, precision):
+    if isinstance(num, Fraction):
+        exact = _exact_root(num, 3)
+        if exact is not None:
+            return exact
+    if num == 0:
+        return num
+    with localcontext() as ctx:
+        ctx.prec = precision + 5
+        result = (_decimal(num).ln() / 3).exp()
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return +result
+
+
+def _ln(num, is_degree, precision):
+    if num == 1:
+        return Fraction(0) if isinstance(num, Fraction) else Decimal(0)
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return _decimal(num).ln()
+
+
+def _log(num, is_degree, precision):
+    if isinstance(num, Fraction) and num.denominator == 1 and num > 0:
+        # An exact power of ten has an exact logarithm; its exponent is the
+        # estimate from the bit length or one more (no str(), which is
+        # limited to 4300 digits)
+        estimate = int((num.numerator.bit_length() - 1) * _LOG10_2)
+        for exponent in (estimate, estimate + 1):
+            if 10 ** exponent == num.numerator:
+                return Fraction(exponent)
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return _decimal(num).log10()
+
+
+def _factorial(num, is_degree, precision):
+    exact = calc_factorial.factorial(int(num))
+    return Fraction(exact) if isinstance(num, Fraction) else Decimal(exact)
+
+
+PRECISE_FUNCTIONS = {
+    'sin': lambda num, is_degree, precision: _trig('sin', num, is_degree, precision),
+    'cos': lambda num, is_degree, precision: _trig('cos', num, is_degree, precision),
+    'tan': lambda num, is_degree, precision: _trig('tan', num, is_degree, precision),
+    '√': _sqrt,
+    '∛': _cbrt,
+    'ln': _ln,
+    'log': _log,
+    'x²': lambda num, is_degree, precision: num * num,
+    '|x|': lambda num, is_degree, precision: abs(num),
+    'n!': _factorial,
+    '%': lambda num, is_degree, precision: num / 100,
+    '+/-': lambda num, is_degree, precision: -num,
+}
+
+
+def _modulo(num1, num2):
+    # Floored modulo like float %, also for Decimal (whose % truncates)
+    return num1 - num2 * math.floor(num1 / num2)
+
+
+def _power(num1, num2, precision):
+    if isinstance(num1, Fraction) and isinstance(num2, Fraction):
+        if num2.denominator == 1:
+            if num1 == 0 and num2 < 0:
+                raise calc_engine.CalculationError("Invalid calculation")
+            return num1 ** int(num2)
+        root = _exact_root(num1, num2.denominator) if num1 >= 0 else None
+        if root is not None:
+            return root ** num2.numerator
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return _decimal(num1) ** _decimal(num2)
+
+
+_PRECISE_OPERATORS = {
+    '+': lambda num1, num2, precision: num1 + num2,
+    '-': lambda num1, num2, precision: num1 - num2,
+    '*': lambda num1, num2, precision: num1 * num2,
+    '/': lambda num1, num2, precision: num1 / num2,
+    '%': lambda num1, num2, precision: _modulo(num1, num2),
+    '**': _power,
+}
+
+
+def _coerce(num1, num2):
+    """Mixed Fraction/Decimal operands are both taken as Decimal"""
+    if isinstance(num1, Fraction) != isinstance(num2, Fraction):
+        return _decimal(num1), _decimal(num2)
+    return num1, num2
+
+
+def apply_function(func, num, is_degree=True, mode='decimal', precision=DEFAULT_PRECISION):
+    """Apply a scientific function in the given precision mode"""
+    if mode == 'float' or (mode == 'decimal' and precision <= FLOAT_DIGITS):
+        return _from_float(calc_engine.apply_function(func, float(num), is_degree), mode, precision)
+    spec = calc_engine.FUNCTIONS.get(func)
+    if spec is None:
+        raise calc_engine.CalculationError("Invalid operation")
+    if spec.validator is not None:
+        spec.validator(num)
+    function = PRECISE_FUNCTIONS.get(spec.label)
+    if function is None:
+        # User functions evaluate their body in this mode; functions that
+        # only compute floats (e.g. plugins) would lose the precision
+        precise = getattr(spec.function, 'precise', None)
+        if precise is None:
+            raise calc_engine.CalculationError("Function needs FLOAT mode")
+        return precise(num, is_degree, mode, precision)
+    with localcontext() as ctx:
+        ctx.prec = precision
+        try:
+            return function(num, is_degree, precision)
+        except (InvalidOperation, ZeroDivisionError, OverflowError, ValueError):
+            raise calc_engine.CalculationError("Invalid operation")
+
+
+def apply_operator(operator, num1, num2, mode='decimal', precision=DEFAULT_PRECISION):
+    """Apply a binary operator in the given precision mode"""
+    if mode == 'float' or (mode == 'decimal' and precision <= FLOAT_DIGITS):
+        return _from_float(calc_engine.apply_operator(operator, float(num1), float(num2)),
+                           mode, precision)
+    operator = calc_engine.OPERATOR_ALIASES.get(operator, operator)
+    spec = calc_engine.OPERATORS.get(operator)
+    if spec is None:
+        raise calc_engine.CalculationError("Invalid calculation")
+    if spec.validator is not None:
+        spec.validator(num1, num2)
+    with localcontext() as ctx:
+        ctx.prec = precision
+        num1, num2 = _coerce(num1, num2)
+        try:
+            return _PRECISE_OPERATORS[operator](num1, num2, precision)
+        except (InvalidOperation, ZeroDivisionError, OverflowError, ValueError):
+            raise calc_engine.CalculationError("Invalid calculation")
+
+
+def _from_float(value, mode, precision):
+    if mode == 'float':
+        return value
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return +Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+
+
+def evaluate_tree(node, variables, is_degree, mode, precision):
+    """Value of a parse tree node in the given precision mode"""
+    kind = node[0]
+    if kind == 'num':
+        value, text = node[1], node[2]
+        if text == 'π' or text == 'pi':
+            return _pi_value(mode, precision)
+        return to_number(text, mode, precision) if text is not None else _from_float(value, mode, precision)
+    if kind == 'var':
+        try:
+            value = variables[node[1]]
+        except KeyError:
+            raise calc_engine.CalculationError(f"Unknown variable '{node[1]}'")
+        return to_number(str(value), mode, precision) if isinstance(value, (int, float, str)) else value
+    if kind == 'call':
+        arg = evaluate_tree(node[2], variables, is_degree, mode, precision)
+        return apply_function(node[1], arg, is_degree, mode, precision)
+    left = evaluate_tree(node[2], variables, is_degree, mode, precision)
+    right = evaluate_tree(node[3], variables, is_degree, mode, precision)
+    return apply_operator(node[1], left, right, mode, precision)
+
+
+def evaluate(expr, mode='decimal', precision=DEFAULT_PRECISION, is_degree=True, **variables):
+    """Evaluate an expression string in the given precision mode"""
+    if mode == 'float' or (mode == 'decimal' and precision <= FLOAT_DIGITS):
+        return _from_float(calc_engine.evaluate(expr, is_degree, **variables), mode, precision)
+    return evaluate_tree(calc_engine.parse(expr), variables, is_degree, mode, precision)
+
+
+def format_number(value, precision=DEFAULT_PRECISION):
+    """Display text for a result of any mode"""
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            return calc_engine.display_string(value.numerator)
+        if value.denominator.bit_length() * _LOG10_2 <= calc_factorial.EXACT_DISPLAY_DIGITS:
+            if value.numerator.bit_length() * _LOG10_2 <= calc_factorial.EXACT_DISPLAY_DIGITS:
+                return f"{value.numerator}/{value.denominator}"
+        # Too long to show as a fraction
+        with localcontext() as ctx:
+            ctx.prec = precision
+            value = _decimal(value)
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            raise calc_engine.CalculationError("Invalid calculation")
+        with localcontext() as ctx:
+            ctx.prec = max(precision, len(value.as_tuple().digits))
+            try:
+                value = value.normalize()
+            except DecimalException:
+                # Overflow: beyond the context's exponent range (300000!)
+                raise calc_engine.CalculationError("Invalid calculation")
+        if -precision <= value.adjusted() < precision:
+            return format(value, 'f')
+        return str(value)
+    return calc_engine.display_string(value)
+
+
+def evaluate_operation(operator, num1, num2, mode, precision):
+    """Display text of a binary operation (picklable for worker processes)"""
+    return format_number(apply_operator(operator, num1, num2, mode, precision), precision)
+
+
+def evaluate_function(func, num, is_degree, mode, precision):
+    """Display text of a scientific function (picklable for worker processes)"""
+    return format_number(apply_function(func, num, is_degree, mode, precision), precision)
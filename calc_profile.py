@@ -0,0 +1,304 @@
+"""
+Profiling and Timing Instrumentation
+Hot-path timers and session profilers for the calculator.
+
+Instrumentation wraps chosen handler methods of an object with a timer that
+feeds a per-handler HandlerStats (call count, total time, and the durations
+of the most recent calls for p50/p99/max and a log2 histogram). Timings are
+inclusive: calculate() called from
+handle_button() counts towards both. The wrappers are only installed while
+instrumentation is enabled - disabled, the original bound methods are back
+in place, so the cost is exactly zero.
+
+Two session profilers can be run on top:
+- CProfileSession: deterministic cProfile of everything the UI thread runs,
+  exported as a .prof file (pstats, snakeviz)
+- SamplingProfiler: a thread that samples the UI thread's stack every few
+  milliseconds, far cheaper than cProfile, exported as collapsed stacks
+  (flamegraph.pl, speedscope)
+
+Usage:
+    timings = Instrumentation(app, ['calculate', 'handle_scientific'])
+    timings.enable()
+    ...
+    print(format_report(timings.summary()))
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Percentiles, max and histogram cover this many most recent calls
+RECENT_CALLS = 4096
+
+# Stack sampling interval of SamplingProfiler
+SAMPLE_INTERVAL = 0.005
+
+# Innermost Python frames of a UI thread waiting for events
+_IDLE_FUNCTIONS = {'mainloop', 'wait', 'sleep'}
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class HandlerStats:
+    """Call count and total time of one handler, plus its recent durations
+
+    Recording is an append and two additions; percentiles and the
+    histogram are worked out only when read.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.recent = deque(maxlen=RECENT_CALLS)
+
+    def reset(self):
+        """Zero the counters (in place: timing wrappers hold self.recent)"""
+        self.count = 0
+        self.total_ns = 0
+        self.recent.clear()
+
+    def record(self, ns):
+        """Add one call that took ns nanoseconds"""
+        self.count += 1
+        self.total_ns += ns
+        self.recent.append(ns)
+
+    def percentile(self, fraction):
+        """Percentile of the recent durations in nanoseconds"""
+        return _percentile(sorted(self.recent), fraction)
+
+    def histogram(self):
+        """{power of two: calls} of the recent durations, e.g. 1024 -> [1.0, 2.0) us"""
+        counts = Counter(map(int.bit_length, self.recent))
+        return {1 << (bits - 1) if bits else 0: counts[bits] for bits in sorted(counts)}
+
+    def summary(self):
+        """Counters in microseconds, as a dict"""
+        ordered = sorted(self.recent)
+        return {
+            'count': self.count,
+            'total_ms': self.total_ns / 1e6,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'p50_us': _percentile(ordered, 0.50) / 1e3,
+            'p99_us': _percentile(ordered, 0.99) / 1e3,
+            'max_us': (ordered[-1] if ordered else 0) / 1e3,
+            'histogram_ns': self.histogram(),
+        }
+
+
+class Instrumentation:
+    """Timers around named methods of an object, installed on enable()
+
+    Dispatch tables (dicts holding the same bound methods, like the
+    calculator's button_actions) are passed as tables and patched too, so
+    calls routed through them are timed as well.
+    """
+
+    def __init__(self, target, names, tables=()):
+        self.target = target
+        self.names = list(names)
+        self.tables = list(tables)
+        self.stats = {name: HandlerStats() for name in self.names}
+        self.enabled = False
+        self._originals = {}
+
+    def enable(self):
+        """Install the timing wrappers"""
+        if self.enabled:
+            return
+        for name in self.names:
+            original = getattr(self.target, name)
+            wrapper = self._timed(original, self.stats[name])
+            self._originals[name] = (original, wrapper)
+            setattr(self.target, name, wrapper)
+            self._replace(original, wrapper)
+        self.enabled = True
+
+    def disable(self):
+        """Put the original methods back"""
+        if not self.enabled:
+            return
+        for name, (original, wrapper) in self._originals.items():
+            # The wrapper is an instance attribute shadowing the class method
+            delattr(self.target, name)
+            self._replace(wrapper, original)
+        self._originals.clear()
+        self.enabled = False
+
+    def reset(self):
+        """Zero all counters"""
+        for stats in self.stats.values():
+            stats.reset()
+
+    def _replace(self, old, new):
+        for table in self.tables:
+            for key, value in table.items():
+                if value == old:
+                    table[key] = new
+
+    @staticmethod
+    def _timed(function, stats):
+        clock = time.perf_counter_ns
+        # record() inlined: this runs on every call of a hot handler
+        recent = stats.recent.append
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                ns = clock() - start
+                stats.count += 1
+                stats.total_ns += ns
+                recent(ns)
+        return timed
+
+    def summary(self):
+        """{handler: counters} for every handler called at least once"""
+        return {name: stats.summary() for name, stats in self.stats.items() if stats.count}
+
+
+class CProfileSession:
+    """Deterministic profile (cProfile) of the calling thread"""
+
+    kind = 'cProfile'
+    extension = '.prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self.running = False
+
+    def start(self):
+        self._profile.enable()
+        self.running = True
+
+    def stop(self):
+        self._profile.disable()
+        self.running = False
+
+    def report(self, limit=15):
+        """Top functions by cumulative time, as text"""
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, path):
+        """Write pstats data (open with pstats or snakeviz)"""
+        self._profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """Samples another thread's Python stack from a background thread"""
+
+    kind = 'sampling'
+    extension = '.folded'
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0
+        self.running = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.running = True
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.running = False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            if frame.f_code.co_name in _IDLE_FUNCTIONS:
+                self.idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def report(self, limit=15):
+        """Functions most often on top of the stack while busy, as text"""
+        busy = self.samples - self.idle
+        lines = [f"{self.samples} samples, {busy} busy ({self.interval * 1e3:g} ms interval)"]
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        for leaf, count in leaves.most_common(limit):
+            lines.append(f"{count / max(busy, 1):7.1%}  {leaf}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write collapsed stacks, one 'frame;frame;... count' per line"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+PROFILERS = {'cprofile': CProfileSession, 'sampling': SamplingProfiler}
+
+
+def format_report(timings, caches=None):
+    """Text table of handler timings (Instrumentation.summary()) and caches"""
+    lines = [f"{'handler':24}{'calls':>7}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'total ms':>10}"]
+    for name, stats in sorted(timings.items(), key=lambda item: -item[1]['total_ms']):
+        lines.append(f"{name:24}{stats['count']:7d}{stats['p50_us']:10.1f}{stats['p99_us']:10.1f}"
+                     f"{stats['max_us']:10.1f}{stats['total_ms']:10.1f}")
+    if not timings:
+        lines.append("(no calls timed yet)")
+    for name, stats in (caches or {}).items():
+        lines.append("")
+        lines.append(f"{name} cache: {stats['size']}/{stats['maxsize']} entries, "
+                     f"{stats['hits']} hits, {stats['misses']} misses, "
+                     f"{stats['evictions']} evictions, hit rate {stats['hit_rate']:.1%}")
+    return '\n'.join(lines)
+
+
+def export(path, timings, caches=None, profiler=None):
+    """Write timings and cache stats as JSON; a profile goes next to it
+
+    Returns the list of files written.
+    """
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'timings': timings,
+        'caches': caches or {},
+    }
+    written = [path]
+    if profiler is not None:
+        profile_path = os.path.splitext(path)[0] + profiler.extension
+        profiler.dump(profile_path)
+        report['profile'] = {'kind': profiler.kind, 'file': profile_path}
+        written.append(profile_path)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return written
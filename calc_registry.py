@@ -0,0 +1,135 @@
+"""
+Function Registry
+Dict-based dispatch table for the calculator's functions and operators.
+
+Every button label (and expression name) maps to a FunctionSpec holding the
+callable, its arity, an optional domain validator and the result formatter,
+so dispatching a press is a single dict lookup instead of an if/elif chain.
+The registry can be inspected with describe() and extended at runtime, e.g.
+by plugin modules that define register(registry).
+"""
+
+import importlib
+
+
+class FunctionSpec:
+    """One registered function or operator"""
+
+    __slots__ = ('label', 'function', 'arity', 'validator', 'formatter',
+                 'display_function', 'mode_dependent', 'aliases', 'description',
+                 'call')
+
+    def __init__(self, label, function, arity=1, validator=None, formatter=None,
+                 display_function=None, mode_dependent=False, aliases=(),
+                 description=""):
+        self.label = label
+        self.function = function
+        self.arity = arity
+        self.validator = validator
+        self.formatter = formatter
+        self.display_function = display_function
+        self.mode_dependent = mode_dependent
+        self.aliases = tuple(aliases)
+        self.description = description
+        # Validate-and-compute callable used for dispatch: functions take
+        # (num, is_degree), operators (num1, num2)
+        self.call = function if validator is None else self._validated(function, validator, arity)
+
+    @staticmethod
+    def _validated(function, validator, arity):
+        if arity == 1:
+            def call(num, is_degree):
+                validator(num)
+                return function(num, is_degree)
+        else:
+            def call(num1, num2):
+                validator(num1, num2)
+                return function(num1, num2)
+        return call
+
+    def __call__(self, *args):
+        return self.call(*args)
+
+    def display(self, num, is_degree=True):
+        """Compute a function result formatted for the display"""
+        if self.validator is not None:
+            self.validator(num)
+        if self.display_function is not None:
+            return self.display_function(num)
+        return self.formatter(self.function(num, is_degree))
+
+    def __repr__(self):
+        return f"FunctionSpec({self.label!r}, arity={self.arity})"
+
+
+class FunctionRegistry:
+    """Label -> FunctionSpec tables for unary functions and binary operators"""
+
+    def __init__(self, default_formatter=None):
+        self.default_formatter = default_formatter
+        self.functions = {}
+        self.operators = {}
+        # Label -> spec.call, the hot dispatch tables
+        self.function_calls = {}
+        self.operator_calls = {}
+
+    def register(self, label, function, arity=1, validator=None, formatter=None,
+                 display_function=None, mode_dependent=False, aliases=(),
+                 description=""):
+        """Register a function (arity 1) or operator (arity 2) and return its spec"""
+        if arity not in (1, 2):
+            raise ValueError("Only unary functions and binary operators are supported")
+        spec = FunctionSpec(label, function, arity, validator,
+                            formatter or self.default_formatter, display_function,
+                            mode_dependent, aliases, description)
+        table, calls = self._tables(arity)
+        for name in (label,) + spec.aliases:
+            table[name] = spec
+            calls[name] = spec.call
+        return spec
+
+    def _tables(self, arity):
+        if arity == 1:
+            return self.functions, self.function_calls
+        return self.operators, self.operator_calls
+
+    def unregister(self, label, arity=1):
+        """Remove a function or operator and all its aliases"""
+        table, calls = self._tables(arity)
+        spec = table[label]
+        for name in (spec.label,) + spec.aliases:
+            table.pop(name, None)
+            calls.pop(name, None)
+
+    def get(self, label, arity=1):
+        """Return the spec for a label, or None"""
+        table = self.functions if arity == 1 else self.operators
+        return table.get(label)
+
+    def specs(self):
+        """Unique registered specs (aliases collapsed)"""
+        seen = []
+        for spec in list(self.functions.values()) + list(self.operators.values()):
+            if not any(spec is other for other in seen):
+                seen.append(spec)
+        return seen
+
+    def describe(self):
+        """Introspection: one dict per registered function or operator"""
+        return [
+            {
+                'label': spec.label,
+                'arity': spec.arity,
+                'aliases': list(spec.aliases),
+                'mode_dependent': spec.mode_dependent,
+                'validated': spec.validator is not None,
+                'description': spec.description,
+            }
+            for spec in self.specs()
+        ]
+
+    def load_plugin(self, module_name):
+        """Import a plugin module and let it register(registry) its functions"""
+        module = importlib.import_module(module_name)
+        module.register(self)
+        return module
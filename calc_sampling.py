@@ -0,0 +1,265 @@
+"""
+Adaptive Curve Sampling
+Curve data for the graph panel, sampled where it matters and cached.
+
+adaptive_sample() starts from a coarse uniform grid and repeatedly bisects
+only the intervals whose midpoint is off the straight line between their
+endpoints, so point density follows curvature: flat stretches keep a few
+points while bends, domain edges (ln, √) and poles get many. Poles such as
+tan at ±90° are split with NaN so no vertical line is drawn across them.
+
+sample_curve() samples a button function or an expression in x and caches
+the result per (function, mode, range), so switching functions or marking
+new points reuses the arrays. sample_window() samples an arbitrary visible
+window (pan/zoom) at screen resolution instead.
+
+Usage:
+    samples = sample_curve('tan', is_degree=True)
+    samples = sample_curve('x**2 - 3*x', is_degree=False, x_range=(-5, 5))
+"""
+
+import math
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import calc_cache
+import calc_engine
+import calc_vector
+
+# Uniform starting grid, bisection rounds, and allowed deviation from a
+# straight line as a fraction of the curve's vertical span
+INITIAL_INTERVALS = 64
+MAX_DEPTH = 10
+TOLERANCE = 1e-3
+# Neighbours with opposite signs this many spans apart are split as a pole
+POLE_SPANS = 4
+# Values further than this many interquartile ranges from the median do not
+# stretch the automatic y limits
+OUTLIER_IQRS = 10
+
+# Screen-resolution sampling: starting grid spacing and allowed deviation
+# from a straight line, in pixels
+PIXELS_PER_INTERVAL = 8
+PIXEL_TOLERANCE = 0.5
+
+CURVE_CACHE_SIZE = 64
+
+# Ranges around x are at least this wide relative to |x|, so that their
+# samples stay distinct floats far from the origin
+MIN_RELATIVE_WIDTH = 1e-9
+
+Samples = namedtuple('Samples', ['x', 'y', 'x_range', 'y_limits'])
+
+# Plottable button functions: label -> (name, degree range, radian range,
+# fixed y limits or None)
+Curve = namedtuple('Curve', ['name', 'degree_range', 'radian_range', 'y_limits'])
+
+_TRIG_DEGREES = (-360.0, 360.0)
+_TRIG_RADIANS = (-2 * math.pi, 2 * math.pi)
+
+CURVES = {
+    'sin': Curve('sin(x)', _TRIG_DEGREES, _TRIG_RADIANS, (-1.2, 1.2)),
+    'cos': Curve('cos(x)', _TRIG_DEGREES, _TRIG_RADIANS, (-1.2, 1.2)),
+    'tan': Curve('tan(x)', _TRIG_DEGREES, _TRIG_RADIANS, (-10.0, 10.0)),
+    '√': Curve('√x', (0.0, 10.0), (0.0, 10.0), None),
+    '∛': Curve('∛x', (0.0, 10.0), (0.0, 10.0), None),
+    'ln': Curve('ln(x)', (0.0, 10.0), (0.0, 10.0), None),
+    'log': Curve('log(x)', (0.0, 10.0), (0.0, 10.0), None),
+    'x²': Curve('x²', (-10.0, 10.0), (-10.0, 10.0), None),
+    '|x|': Curve('|x|', (-10.0, 10.0), (-10.0, 10.0), None),
+}
+
+EXPRESSION_RANGE = (-10.0, 10.0)
+
+_cache = calc_cache.LRUCache(CURVE_CACHE_SIZE)
+
+
+def adaptive_sample(function, x_min, x_max, y_limits=None, initial=INITIAL_INTERVALS,
+                    depth=MAX_DEPTH, tolerance=TOLERANCE):
+    """Sample function (array -> array) on [x_min, x_max]
+
+    Returns (x, y, y_limits). Unless given, y_limits is a padded range of
+    the values on the starting grid with outliers (near poles) left out.
+    Undefined points are NaN.
+    """
+    x = np.linspace(x_min, x_max, initial + 1)
+    y = function(x)
+    if y_limits is None:
+        y_limits = _limits(y)
+    span = y_limits[1] - y_limits[0]
+    threshold = tolerance * span
+
+    # Only intervals created by the last round of splits are re-checked
+    active = np.arange(initial)
+    for _ in range(depth):
+        if active.size == 0:
+            break
+        left, right = y[active], y[active + 1]
+        # Halves first: the sum of bounds near the float limit overflows
+        mid = x[active] / 2 + x[active + 1] / 2
+        y_mid = function(mid)
+        with np.errstate(invalid='ignore'):
+            bent = np.abs(y_mid - (left + right) / 2) > threshold
+            # Bends wholly above or below the visible range are not refined
+            low, high = y_limits
+            hidden = (((left > high) & (right > high) & (y_mid > high))
+                      | ((left < low) & (right < low) & (y_mid < low)))
+        finite_left, finite_right = np.isfinite(left), np.isfinite(right)
+        # Domain edges and holes are narrowed down as well
+        edge = (finite_left != finite_right) | (finite_left & finite_right & ~np.isfinite(y_mid))
+        split = (bent & ~hidden) | edge
+        index = active[split]
+        x = np.insert(x, index + 1, mid[split])
+        y = np.insert(y, index + 1, y_mid[split])
+        # Left halves land at index + (number of earlier splits)
+        left_half = index + np.arange(index.size)
+        active = np.empty(2 * index.size, dtype=np.intp)
+        active[0::2] = left_half
+        active[1::2] = left_half + 1
+
+    return x, _break_poles(y, span), y_limits
+
+
+def _limits(y):
+    """Padded range of the finite values, ignoring far outliers"""
+    finite = y[np.isfinite(y)]
+    if finite.size == 0:
+        return (-1.0, 1.0)
+    q1, median, q3 = np.percentile(finite, [25, 50, 75])
+    reach = OUTLIER_IQRS * max(q3 - q1, 1e-12)
+    finite = finite[np.abs(finite - median) <= reach]
+    low, high = finite.min(), finite.max()
+    if high - low < 1e-12:
+        return (low - 1.0, high + 1.0)
+    pad = (high - low) * 0.1
+    return (float(low - pad), float(high + pad))
+
+
+def _break_poles(y, span):
+    """NaN out the larger side of sign-flipping jumps much taller than span"""
+    with np.errstate(invalid='ignore'):
+        jump = (np.sign(y[:-1]) != np.sign(y[1:])) & (np.abs(np.diff(y)) > POLE_SPANS * span)
+    if not jump.any():
+        return y
+    y = y.copy()
+    index = np.flatnonzero(jump)
+    # Blank the point nearer the pole so the line stops short of it
+    larger = np.where(np.abs(y[index]) > np.abs(y[index + 1]), index, index + 1)
+    y[larger] = np.nan
+    return y
+
+
+def curve_name(func):
+    """Legend/axis name of a button function or expression"""
+    curve = CURVES.get(func)
+    return curve.name if curve is not None else str(func)
+
+
+def _curve_function(func, is_degree):
+    """Vectorized x -> y for a button label or an expression string"""
+    if func in CURVES:
+        return lambda values: calc_vector.evaluate_array(func, values, is_degree).values
+    return calc_vector.expression_function(
+        *calc_vector.compile_function(func, message="Plot needs a single variable"), is_degree)
+
+
+def mode_dependent(func):
+    """Whether a curve changes between DEG and RAD"""
+    if func in CURVES:
+        return calc_engine.FUNCTIONS[func].mode_dependent
+    return _calls_mode_dependent(calc_engine.compile(func).tree)
+
+
+def _calls_mode_dependent(node):
+    kind = node[0]
+    if kind == 'call':
+        return calc_engine.FUNCTIONS[node[1]].mode_dependent or _calls_mode_dependent(node[2])
+    if kind == 'binary':
+        return _calls_mode_dependent(node[2]) or _calls_mode_dependent(node[3])
+    return False
+
+
+def default_range(func, is_degree):
+    """x range a curve is first shown over"""
+    curve = CURVES.get(func)
+    if curve is not None:
+        return curve.degree_range if is_degree else curve.radian_range
+    if is_degree and mode_dependent(func):
+        return _TRIG_DEGREES
+    return EXPRESSION_RANGE
+
+
+def range_containing(func, is_degree, x_range, x):
+    """An x range on the same grid as x_range that contains x
+
+    Periodic (trig) curves shift by whole widths, keeping the sampling
+    resolution; other curves double their width away from the origin side.
+    Staying on a grid lets revisited ranges hit the cache. Ranges narrower
+    than MIN_RELATIVE_WIDTH * |x| are replaced by one that wide (on a grid of
+    its own), and bounds stop at the largest finite float.
+    """
+    if math.isnan(x):
+        return x_range
+    largest = sys.float_info.max
+    x = min(max(x, -largest), largest)
+    x_min, x_max = x_range
+    min_width = MIN_RELATIVE_WIDTH * abs(x)
+    if not mode_dependent(func):
+        while not x_min <= x <= x_max:
+            if x > x_max:
+                x_max = min(x_min + 2 * (x_max - x_min), largest)
+            else:
+                x_min = max(x_max - 2 * (x_max - x_min), -largest)
+    elif x_max - x_min >= min_width:
+        width = x_max - x_min
+        shift = math.floor((x - x_min) / width) * width
+        x_min, x_max = x_min + shift, x_max + shift
+    if x_max - x_min < min_width:
+        # A power of two, so that the grid points are exact
+        width = math.ldexp(1.0, math.frexp(min_width)[1])
+        x_min = max(math.floor(x / width) * width, -largest)
+        x_max = min(x_min + width, largest)
+    return (x_min, x_max)
+
+
+def sample_curve(func, is_degree=True, x_range=None):
+    """Cached adaptive samples of a button function or expression in x"""
+    if x_range is None:
+        x_range = default_range(func, is_degree)
+    x_range = (float(x_range[0]), float(x_range[1]))
+    key = (func, is_degree if mode_dependent(func) else None, x_range)
+    samples = _cache.get(key)
+    if samples is None:
+        curve = CURVES.get(func)
+        x, y, y_limits = adaptive_sample(_curve_function(func, is_degree), *x_range,
+                                         y_limits=curve.y_limits if curve is not None else None)
+        samples = Samples(x, y, x_range, y_limits)
+        _cache.put(key, samples)
+    return samples
+
+
+def sample_window(func, is_degree, x_range, y_limits, pixels):
+    """Samples of a curve for a visible window of pixels = (width, height)
+
+    Point density is set by the screen: the curve is accurate to about half a
+    pixel however far the window is zoomed in. Not cached, since windows
+    from panning and zooming rarely repeat.
+    """
+    width, height = pixels
+    x, y, _ = adaptive_sample(_curve_function(func, is_degree), *x_range,
+                              y_limits=y_limits,
+                              initial=max(INITIAL_INTERVALS, int(width) // PIXELS_PER_INTERVAL),
+                              tolerance=PIXEL_TOLERANCE / max(height, 1))
+    return Samples(x, y, tuple(x_range), tuple(y_limits))
+
+
+def cache_stats():
+    """Hit/miss counters of the curve cache"""
+    return _cache.stats()
+
+
+def clear_cache():
+    """Drop all cached curves"""
+    _cache.clear()
@@ -0,0 +1,393 @@
+"""
+Local Calculation Service
+JSON over HTTP access to the calculator for other tools.
+
+Results have the GUI's semantics: the same domain checks and error messages,
+DEG/RAD mode, the precision modes and round(result, 10) formatting. Error
+codes are the command-line mode's (calc_cli.ERROR_CODES).
+
+Endpoints:
+    POST /eval   {"expr": "2 + sin(30)"}  or  {"func": "n!", "operand": "20"}
+                 -> {"result": "2.5", "code": 0, "error": null}
+    GET  /eval?expr=2%2Bsin(30)&mode=rad
+    POST /batch  {"expressions": ["1 + 1", ...]}  or  {"requests": [{...}, ...]}
+                 -> {"results": [{...}, ...]}
+
+Options, per request (in a batch, top-level options apply to every item
+that does not set its own):
+    "mode": "deg" (default) or "rad"
+    "precision": "float" (default), "decimal" or "exact"
+    "digits": significant digits of the decimal and exact modes (default 50,
+              at most MAX_DIGITS)
+
+Requests are evaluated on the event loop; a step calc_worker considers heavy
+(huge exact powers and factorials, and any step with more than
+calc_worker.HEAVY_DIGITS digits) sends the request to a process pool
+instead, so the loop keeps serving other connections. Connections are
+HTTP/1.1 keep-alive and may pipeline: requests are started as they arrive
+and answered in order.
+
+Usage:
+    python calc_server.py [--host 127.0.0.1] [--port 8765] [--workers N]
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import signal
+import sys
+import urllib.parse
+
+import calc_cli
+import calc_engine
+import calc_expression
+import calc_precision
+import calc_worker
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Request limits
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+MAX_BATCH = 10000
+MAX_DIGITS = 5000
+
+# Requests of one connection being evaluated before reading further ones
+PIPELINE_DEPTH = 64
+
+# Batch items evaluated between yields to the event loop
+BATCH_SLICE = 200
+
+ANGLE_MODES = {'deg': True, 'rad': False}
+
+_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class RequestError(Exception):
+    """A request the service cannot answer; args are (message, HTTP status)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message, status)
+        self.message = message
+        self.status = status
+
+
+class _Heavy(Exception):
+    """Raised when a step belongs in the process pool"""
+
+
+def _arithmetic(request):
+    """Arithmetic of a request's mode, precision and digits options"""
+    mode = request.get('mode', 'deg')
+    if mode not in ANGLE_MODES:
+        raise RequestError(f"mode must be one of {', '.join(ANGLE_MODES)}")
+    precision = request.get('precision', 'float')
+    if precision not in calc_precision.MODES:
+        raise RequestError(f"precision must be one of {', '.join(calc_precision.MODES)}")
+    digits = request.get('digits', calc_precision.DEFAULT_PRECISION)
+    try:
+        digits = int(digits)
+    except (TypeError, ValueError):
+        digits = 0
+    if digits < 1:
+        raise RequestError("digits must be a positive integer")
+    if digits > MAX_DIGITS:
+        raise RequestError(f"digits must be at most {MAX_DIGITS}")
+    return calc_expression.Arithmetic(ANGLE_MODES[mode], precision, digits)
+
+
+def _digits(arithmetic):
+    """Significant digits of an arithmetic's steps, None in float mode"""
+    return None if arithmetic.mode == 'float' else arithmetic.precision
+
+
+def _value(node, arithmetic, heavy_check):
+    """Value of a parse tree node, step by step like the GUI's expression"""
+    kind = node[0]
+    if kind == 'num':
+        return arithmetic.number('π' if node[2] == 'pi' else node[2])
+    if kind == 'var':
+        raise calc_engine.CalculationError(f"Unknown variable '{node[1]}'")
+    if kind == 'call':
+        op, operands = node[1], (_value(node[2], arithmetic, heavy_check),)
+    else:
+        op = node[1]
+        operands = (_value(node[2], arithmetic, heavy_check),
+                    _value(node[3], arithmetic, heavy_check))
+    # Steps compute full numbers, so a factorial is never the display shortcut
+    if heavy_check and calc_worker.is_heavy(op, operands, is_degree=arithmetic.is_degree,
+                                            digits=_digits(arithmetic)):
+        raise _Heavy
+    if len(operands) == 2:
+        return arithmetic.operator(op, *operands)
+    return arithmetic.function(op, operands[0])
+
+
+def _scientific(func, operand, arithmetic, heavy_check):
+    """Display text of a scientific function button, as handle_scientific shows it"""
+    if func not in calc_engine.FUNCTIONS:
+        raise calc_engine.CalculationError("Invalid operation")
+    num = arithmetic.number(str(operand))
+    if heavy_check and calc_worker.is_heavy(func, (num,), display=arithmetic.mode == 'float',
+                                            digits=_digits(arithmetic)):
+        raise _Heavy
+    if arithmetic.mode == 'float':
+        return str(calc_worker.evaluate_function(func, num, arithmetic.is_degree))
+    return calc_precision.evaluate_function(func, num, arithmetic.is_degree,
+                                            arithmetic.mode, arithmetic.precision)
+
+
+def evaluate(request, heavy_check=True):
+    """Answer one request dict with {'result', 'code', 'error'}
+
+    Raises RequestError for malformed requests, and _Heavy (with
+    heavy_check) when the request should go to the process pool.
+    """
+    arithmetic = _arithmetic(request)
+    expr, func = request.get('expr'), request.get('func')
+    if isinstance(expr, str):
+        compute = lambda: arithmetic.format(
+            _value(calc_engine.parse(expr), arithmetic, heavy_check))
+    elif isinstance(func, str) and 'operand' in request:
+        compute = lambda: _scientific(func, request['operand'], arithmetic, heavy_check)
+    else:
+        raise RequestError("expected \"expr\", or \"func\" and \"operand\"")
+    try:
+        return {'result': compute(), 'code': 0, 'error': None}
+    except calc_engine.CalculationError as e:
+        message = str(e)
+    except RecursionError:
+        message = "Invalid expression"
+    except (ArithmeticError, ValueError, TypeError):
+        message = "Invalid calculation"
+    return {'result': "Error", 'code': calc_cli.ERROR_CODES.get(message, calc_cli.OTHER_ERROR),
+            'error': message}
+
+
+def evaluate_heavy(request):
+    """evaluate() with every step computed (picklable, for the process pool)"""
+    return evaluate(request, heavy_check=False)
+
+
+def _batch_items(body):
+    """Request dicts of a /batch body, with the top-level options applied"""
+    if not isinstance(body, dict):
+        raise RequestError("expected a JSON object")
+    options = {key: body[key] for key in ('mode', 'precision', 'digits') if key in body}
+    if isinstance(body.get('expressions'), list):
+        items = [{'expr': expr} for expr in body['expressions']]
+    elif isinstance(body.get('requests'), list):
+        items = body['requests']
+    else:
+        raise RequestError("expected \"expressions\" or \"requests\" list")
+    if len(items) > MAX_BATCH:
+        raise RequestError(f"at most {MAX_BATCH} requests per batch", 413)
+    if not all(isinstance(item, dict) for item in items):
+        raise RequestError("every request must be a JSON object")
+    return [{**options, **item} for item in items]
+
+
+class CalculationService:
+    """The HTTP service: connection handling, routing and the process pool"""
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._pool = None
+
+    async def evaluate(self, request):
+        """Result of one request, from the pool if it is heavy"""
+        try:
+            return evaluate(request)
+        except _Heavy:
+            pass
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, evaluate_heavy, request)
+
+    async def batch(self, items):
+        """Results of a list of requests, in order"""
+        results = []
+        for start in range(0, len(items), BATCH_SLICE):
+            for request in items[start:start + BATCH_SLICE]:
+                try:
+                    results.append(evaluate(request))
+                except _Heavy:
+                    results.append(asyncio.ensure_future(self.evaluate(request)))
+            # Let other connections in between slices of a large batch
+            await asyncio.sleep(0)
+        return [await result if asyncio.isfuture(result) else result for result in results]
+
+    async def respond(self, method, path, query, body):
+        """(status, payload) for one HTTP request"""
+        try:
+            if path == '/eval':
+                if method == 'GET':
+                    request = {key: values[-1] for key, values in query.items()}
+                elif method == 'POST':
+                    request = _json(body)
+                    if not isinstance(request, dict):
+                        raise RequestError("expected a JSON object")
+                else:
+                    raise RequestError("use GET or POST", 405)
+                return 200, await self.evaluate(request)
+            if path == '/batch':
+                if method != 'POST':
+                    raise RequestError("use POST", 405)
+                return 200, {'results': await self.batch(_batch_items(_json(body)))}
+            raise RequestError(f"no endpoint {path}", 404)
+        except RequestError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serve one keep-alive connection; pipelined requests run concurrently"""
+        responses = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.ensure_future(_send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except RequestError as e:
+                    await responses.put((_completed((e.status, {'error': e.message})), False))
+                    break
+                if request is None:
+                    break
+                method, path, query, body, keep_alive = request
+                await responses.put((asyncio.ensure_future(
+                    self.respond(method, path, query, body)), keep_alive))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, started=None):
+        """Run until cancelled; started(sockets) is called once listening"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        # SIGTERM stops serving like Ctrl+C, so the pool is shut down below
+        # rather than leaving its worker processes behind
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+        if started is not None:
+            started(server.sockets)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _json(body):
+    try:
+        return json.loads(body or b'null')
+    except (UnicodeDecodeError, ValueError):
+        raise RequestError("body is not valid JSON")
+
+
+def _completed(value):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+async def _read_request(reader):
+    """(method, path, query, body, keep alive) of the next request, None at EOF"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError("malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise RequestError("too many headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError("bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError("body too large", 413)
+    body = await reader.readexactly(length) if length > 0 else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    url = urllib.parse.urlsplit(target)
+    return method.upper(), url.path, urllib.parse.parse_qs(url.query), body, keep_alive
+
+
+async def _send_responses(responses, writer):
+    """Write the responses of a connection in request order"""
+    connected = True
+    while True:
+        item = await responses.get()
+        if item is None:
+            return
+        pending, keep_alive = item
+        status, payload = await pending
+        # After a disconnect the queue is still drained, so the reader never blocks
+        if not connected:
+            continue
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+            + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            connected = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve calculator results as JSON over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help="port (default: %(default)s, 0 = any free port)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="processes for heavy calculations (default: one per CPU core)")
+    args = parser.parse_args(argv)
+
+    def started(sockets):
+        host, port = sockets[0].getsockname()[:2]
+        print(f"Serving on http://{host}:{port}", flush=True)
+
+    service = CalculationService(args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port, started))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
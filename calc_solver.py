@@ -0,0 +1,175 @@
+"""
+Equation Solver
+All roots of an equation in one variable over an interval.
+
+An equation "sin(x) = 0.3" (or an expression, = 0) is evaluated on a NumPy
+grid over the interval in one vectorized pass (calc_vector, so DEG/RAD and
+the domain checks are the calculator's). Every sign change brackets a root,
+and all brackets are then refined together: each iteration evaluates the
+whole array of estimates at once, taking a Newton step from the bracket's
+secant slope where it stays inside the bracket (the Illinois variant of
+regula falsi) and bisecting otherwise, so a bracket is never lost. Brackets
+that close in on a pole (tan(x) at 90°) rather than a root are dropped.
+Roots that touch zero without crossing it (x² = 0) show up as local minima
+of |f| on the grid and are polished with Newton steps. Two roots (or a
+root and a pole) closer together than the grid spacing can be missed; pass
+more samples for such equations.
+
+Usage:
+    solve("sin(x) = 0.3", -360, 360)             # degrees: [-342.54, -197.46, 17.46, 162.54]
+    solve("x² - ln(x) = 5", 0, 10, is_degree=False)
+    solve("x * r = 1", 0, 1, variables={'r': 4})
+"""
+
+import numpy as np
+
+import calc_engine
+import calc_vector
+
+# Grid points of the bracketing pass
+DEFAULT_SAMPLES = 4096
+# Width at which a bracket counts as converged, relative to the root (or to
+# the interval, if that is smaller); at least ULPS float spacings
+X_TOLERANCE = 1e-13
+ULPS = 4
+MAX_ITERATIONS = 100
+# |f| at a touching root, relative to the function's scale on the grid
+TOUCH_TOLERANCE = 1e-9
+# Growth of |f| over a bracket's ends that marks a pole rather than a root
+POLE_GROWTH = 1e4
+
+
+def parse_equation(text, variables=()):
+    """Compiled left - right of "left = right" (or of an expression) and its variable
+
+    variables are names with known values, so they are not the unknown.
+    """
+    left, equals, right = text.partition('=')
+    if '=' in right or not left.strip() or (equals and not right.strip()):
+        raise calc_engine.CalculationError("Invalid equation")
+    return calc_vector.compile_function(f"({left}) - ({right})" if equals else left, variables,
+                                        "Equation needs a single unknown")
+
+
+def solve(equation, low, high, is_degree=True, samples=DEFAULT_SAMPLES, variables=None):
+    """Sorted roots of an equation (text or parse_equation() result) in [low, high]
+
+    variables maps other names in the equation to their values.
+    """
+    variables = variables or {}
+    if isinstance(equation, str):
+        equation = parse_equation(equation, variables)
+    if not low < high:
+        raise calc_engine.CalculationError("Empty interval")
+    f = calc_vector.expression_function(*equation, is_degree, variables)
+    xs = np.linspace(low, high, max(int(samples), 3))
+    ys = f(xs)
+    finite = np.isfinite(ys)
+
+    roots = [xs[(ys == 0) & finite]]
+    # Sign changes between neighbouring finite points
+    crossing = np.flatnonzero(finite[:-1] & finite[1:] & (np.sign(ys[:-1]) * np.sign(ys[1:]) < 0))
+    span = high - low
+    if crossing.size:
+        roots.append(_refine(f, xs[crossing], xs[crossing + 1], ys[crossing], ys[crossing + 1],
+                             span))
+    roots.append(_touching(f, xs, ys, finite, span))
+    return _distinct(np.concatenate(roots), span)
+
+
+def _resolution(scale, span):
+    """Converged width of roots of magnitude scale in an interval of width span"""
+    return np.maximum(X_TOLERANCE * np.minimum(scale, span), ULPS * np.spacing(scale))
+
+
+def _refine(f, a, b, fa, fb, span):
+    """Roots of all brackets [a, b] (fa, fb of opposite sign) at once"""
+    limit = np.minimum(np.abs(fa), np.abs(fb))
+    bound = POLE_GROWTH * np.maximum(np.abs(fa), np.abs(fb))
+    side = np.zeros(a.shape, dtype=np.int8)
+    for _ in range(MAX_ITERATIONS):
+        width = np.abs(b - a)
+        active = width > _resolution(np.maximum(np.abs(a), np.abs(b)), span) + 1e-300
+        if not active.any():
+            break
+        # Newton step on the secant through the bracket ends
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            x = a - fa * (b - a) / (fb - fa)
+        inside = np.isfinite(x) & (x > np.minimum(a, b)) & (x < np.maximum(a, b))
+        x = np.where(inside, x, (a + b) / 2)
+        fx = np.where(active, f(np.where(active, x, a)), 0.0)
+        # Outside the domain: bisect towards the end that is still defined
+        bad = ~np.isfinite(fx)
+        if bad.any():
+            x = np.where(bad, (a + b) / 2, x)
+            fx = np.where(bad, f(x), fx)
+            fx = np.where(np.isfinite(fx), fx, np.nan)
+        same_as_a = np.sign(fx) == np.sign(fa)
+        keep = active & np.isfinite(fx)
+        new_a = keep & same_as_a
+        new_b = keep & ~same_as_a
+        # Illinois: halve the end that was kept twice in a row
+        fb = np.where(new_a & (side == 1), fb / 2, fb)
+        fa = np.where(new_b & (side == -1), fa / 2, fa)
+        a, fa = np.where(new_a, x, a), np.where(new_a, fx, fa)
+        b, fb = np.where(new_b, x, b), np.where(new_b, fx, fb)
+        side = np.where(new_a, 1, np.where(new_b, -1, side)).astype(np.int8)
+        # Collapse the bracket on an exact root, or on a pole, where |f| grows
+        # far past its value at either grid point
+        done = keep & ((fx == 0) | (np.abs(fx) > bound))
+        a, b = np.where(done, x, a), np.where(done, x, b)
+    roots = (a + b) / 2
+    # A pole also flips sign; its |f| grows instead of shrinking
+    residual = np.abs(f(roots))
+    return roots[np.isfinite(residual) & (residual <= limit)]
+
+
+def _touching(f, xs, ys, finite, span):
+    """Roots where |f| dips to zero without a sign change"""
+    magnitude = np.abs(ys)
+    scale = np.max(magnitude[finite]) if finite.any() else 0.0
+    if scale == 0:
+        return xs[:0]
+    inner = np.arange(1, len(xs) - 1)
+    before, here, after = ys[inner - 1], ys[inner], ys[inner + 1]
+    dip = (finite[inner - 1] & finite[inner] & finite[inner + 1]
+           & (magnitude[inner] < magnitude[inner - 1]) & (magnitude[inner] <= magnitude[inner + 1])
+           & (np.sign(before) == np.sign(here)) & (np.sign(here) == np.sign(after)))
+    # The parabola through the three points should reach (about) zero
+    with np.errstate(invalid='ignore', divide='ignore'):
+        curvature = (before + after) / 2 - here
+        vertex = here - (after - before) ** 2 / (16 * curvature)
+    dip &= np.abs(vertex) <= np.abs(here) / 2
+    candidates = inner[dip]
+    if not candidates.size:
+        return xs[:0]
+    low, high = xs[candidates - 1], xs[candidates + 1]
+    x = xs[candidates]
+    step = (xs[1] - xs[0]) * 1e-4
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        for _ in range(MAX_ITERATIONS):
+            fx = f(x)
+            slope = (f(x + step) - f(x - step)) / (2 * step)
+            x_next = np.clip(x - fx / slope, low, high)
+            x_next = np.where(np.isfinite(x_next), x_next, x)
+            step = np.maximum(np.abs(x_next - x), 1e-12 * np.maximum(np.abs(x), 1.0)) / 2
+            if np.all(np.abs(x_next - x) <= _resolution(np.maximum(np.abs(x), 1.0), span)):
+                x = x_next
+                break
+            x = x_next
+        residual = np.abs(f(x))
+    return x[np.isfinite(residual) & (residual <= TOUCH_TOLERANCE * scale)]
+
+
+def _distinct(roots, span):
+    """Sorted roots with near-duplicates (shared grid points) merged
+
+    Copies of a root differ by about its converged width, which is set by
+    the interval and the float spacing, not by the root's distance from 0.
+    """
+    roots = np.sort(roots[np.isfinite(roots)])
+    if roots.size < 2:
+        return roots.tolist()
+    tolerance = np.maximum(1e-9 * span, 2 * ULPS * np.spacing(np.abs(roots[1:])))
+    gap = np.diff(roots) > tolerance
+    return roots[np.concatenate(([True], gap))].tolist()
@@ -0,0 +1,367 @@
+"""
+Streaming Statistics
+One-pass summaries of a column of numbers, in constant memory.
+
+Values are read in chunks and folded into running aggregates, so a file of
+any size is summarized without keeping its values:
+- RunningStats: count, mean and sum of squared deviations (Welford's
+  update; whole chunks are merged with Chan's formula, so a chunk costs a
+  few NumPy reductions), min, max, and a compensated (Kahan-Neumaier) sum
+- Regression: the co-moments of (x, y) pairs, merged the same way, giving
+  the least-squares line and r; x is another column, or the row number
+- QuantileSketch: a log-bucketed histogram (as in DDSketch) whose quantiles
+  are within RELATIVE_ACCURACY of the true value, using a few hundred
+  buckets whatever the number of values
+
+Input is plain delimited text: numbers separated by spaces, tabs, commas or
+semicolons. Without a column every number is a value; with one, each line
+is a row and the column (1-based) is picked from it. Anything that is not a
+finite number (headers, blanks, nan) is skipped and counted.
+
+Usage:
+    summary = summarize_text("3 1 4 1 5 9 2 6")
+    summary = summarize_file("data.csv", column=3, x_column=1)
+    summary.lines()                  # history entries
+"""
+
+import math
+import os
+
+import numpy as np
+
+import calc_engine
+
+# Bytes of a file read per chunk
+CHUNK_BYTES = 1 << 20
+# Quantile sketch: relative accuracy, and the quantiles a summary reports
+RELATIVE_ACCURACY = 0.01
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Commas and semicolons become spaces, so str.split() finds the fields
+_SEPARATORS = str.maketrans(',;', '  ')
+
+
+class RunningStats:
+    """Count, mean, variance, min, max and sum of a stream of values"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._sum = 0.0
+        self._compensation = 0.0
+
+    def add(self, value):
+        """Add one value (Welford's update)"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self._add_to_sum(value)
+
+    def add_array(self, values):
+        """Add a chunk of values (a NumPy array)"""
+        if not values.size:
+            return
+        mean = _mean(values)
+        with np.errstate(over='ignore'):
+            # Infinite only if the variance itself is beyond the float range
+            self._merge(values.size, mean, float(np.square(values - mean).sum()))
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            # np.sum adds pairwise, so only the chunk totals need compensating
+            self._add_to_sum(float(values.sum()))
+
+    def merge(self, other):
+        """Fold in the statistics of another stream"""
+        if not other.count:
+            return
+        self._merge(other.count, other.mean, other.m2)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._add_to_sum(other._sum)
+        self._add_to_sum(other._compensation)
+
+    def _merge(self, count, mean, m2):
+        total = self.count + count
+        weight = count / total
+        delta = mean - self.mean
+        if math.isfinite(delta):
+            self.mean += delta * weight
+        else:
+            # Means of opposite sign near the float limit
+            self.mean = self.mean * (1 - weight) + mean * weight
+        # Ordered so an empty stream (count 0) adds 0, not 0 * inf
+        self.m2 += m2 + self.count * weight * delta * delta
+        self.count = total
+
+    def _add_to_sum(self, value):
+        # Neumaier's variant of Kahan summation: the low-order bits lost by
+        # each addition are kept in the compensation term
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - total) + value
+        else:
+            self._compensation += (value - total) + self._sum
+        self._sum = total
+
+    @property
+    def total(self):
+        if not math.isfinite(self._sum):
+            # An overflowed sum (its compensation is then NaN)
+            return self._sum
+        return self._sum + self._compensation
+
+    @property
+    def variance(self):
+        """Sample variance (n - 1), NaN below two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class Regression:
+    """Least-squares line y = slope * x + intercept of a stream of (x, y) pairs"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def add_arrays(self, x, y):
+        """Add a chunk of pairs (two NumPy arrays of the same length)"""
+        if not x.size:
+            return
+        mean_x, mean_y = _mean(x), _mean(y)
+        dx, dy = x - mean_x, y - mean_y
+        count = x.size
+        total = self.count + count
+        delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+        weight = self.count * count / total
+        with np.errstate(over='ignore', invalid='ignore'):
+            self.m2_x += float(np.dot(dx, dx)) + weight * delta_x * delta_x
+            self.m2_y += float(np.dot(dy, dy)) + weight * delta_y * delta_y
+            self.c_xy += float(np.dot(dx, dy)) + weight * delta_x * delta_y
+        self.mean_x += delta_x * (count / total)
+        self.mean_y += delta_y * (count / total)
+        self.count = total
+
+    @property
+    def slope(self):
+        return self.c_xy / self.m2_x if self.m2_x > 0 else math.nan
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def correlation(self):
+        """Pearson's r, NaN if x or y is constant"""
+        if self.m2_x > 0 and self.m2_y > 0:
+            return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+        return math.nan
+
+
+class QuantileSketch:
+    """Approximate quantiles with relative error at most `accuracy`
+
+    Values fall into buckets whose bounds grow geometrically by
+    gamma = (1 + accuracy) / (1 - accuracy), one set for positive and one
+    for negative values; a bucket is reported by its midpoint.
+    """
+
+    def __init__(self, accuracy=RELATIVE_ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zeros = 0
+        self.positive = {}
+        self.negative = {}
+
+    def add_array(self, values):
+        """Add a chunk of values (a NumPy array)"""
+        self.count += values.size
+        self.zeros += int(np.count_nonzero(values == 0))
+        self._add_buckets(self.positive, values[values > 0])
+        self._add_buckets(self.negative, -values[values < 0])
+
+    def _add_buckets(self, buckets, magnitudes):
+        if not magnitudes.size:
+            return
+        index = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        for key, count in zip(*np.unique(index, return_counts=True)):
+            buckets[int(key)] = buckets.get(int(key), 0) + int(count)
+
+    def _value(self, key):
+        # Midpoint of (gamma^(key-1), gamma^key]: within accuracy of any value
+        # in it. gamma^key itself can exceed the float range near 1e308.
+        return self.gamma ** (key - 1) * (2 * self.gamma / (self.gamma + 1))
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), NaN if empty"""
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+class Summary:
+    """Statistics of a column, built by summarize()"""
+
+    def __init__(self, source, quantiles=True, x_name='x'):
+        self.source = source
+        self.x_name = x_name
+        self.stats = RunningStats()
+        self.regression = Regression()
+        self.sketch = QuantileSketch() if quantiles else None
+        self.skipped = 0
+
+    def add(self, x, y):
+        """Add a chunk of values y with their regression x (NaN where a row has none)"""
+        self.stats.add_array(y)
+        paired = np.isfinite(x)
+        self.regression.add_arrays(x[paired], y[paired])
+        if self.sketch is not None:
+            self.sketch.add_array(y)
+
+    def quantiles(self):
+        """{q: approximate quantile}, clamped to the exact min and max"""
+        if self.sketch is None or not self.stats.count:
+            return {}
+        return {q: min(max(self.sketch.quantile(q), self.stats.minimum), self.stats.maximum)
+                for q in QUANTILES}
+
+    def lines(self):
+        """History entries, first to last"""
+        stats = self.stats
+        lines = [f"Stats of {self.source}: n = {stats.count}"
+                 + (f" ({self.skipped} skipped)" if self.skipped else "")]
+        if not stats.count:
+            return lines
+        lines += [
+            f"  Σ = {_number(stats.total)}",
+            f"  mean = {_number(stats.mean)}",
+            f"  min = {_number(stats.minimum)}, max = {_number(stats.maximum)}",
+        ]
+        if stats.count > 1:
+            lines.append(f"  stddev = {_number(stats.stddev)} (variance {_number(stats.variance)})")
+        quantiles = self.quantiles()
+        if quantiles:
+            lines.append("  " + ", ".join(f"q{q:g} ≈ {_number(value)}"
+                                         for q, value in quantiles.items()))
+        regression = self.regression
+        if not math.isnan(regression.slope):
+            intercept = regression.intercept
+            lines.append(f"  fit y = {_number(regression.slope)}·{self.x_name}"
+                         f" {'-' if intercept < 0 else '+'} {_number(abs(intercept))}"
+                         f" (r = {_number(regression.correlation)})")
+        return lines
+
+
+def _mean(values):
+    """Mean of a non-empty array, also where its sum overflows"""
+    with np.errstate(over='ignore'):
+        mean = float(values.mean())
+    if math.isfinite(mean):
+        return mean
+    # Values near the float limit: average them scaled down
+    scale = float(np.abs(values).max())
+    return float((values / scale).mean()) * scale
+
+
+def _number(value):
+    if not math.isfinite(value):
+        return str(value)
+    return calc_engine.display_string(value)
+
+
+def _values(tokens):
+    """Finite numbers among tokens (an array), and how many tokens were not"""
+    try:
+        values = np.array(tokens, dtype=np.float64)
+    except ValueError:
+        # A header or a stray word: convert one token at a time
+        values = []
+        for token in tokens:
+            try:
+                values.append(float(token))
+            except ValueError:
+                values.append(math.nan)
+        values = np.array(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    return values[finite], int(values.size - np.count_nonzero(finite)), finite
+
+
+def _column(rows, column):
+    """Field column (1-based) of every row, '' where a row is too short"""
+    index = column - 1
+    try:
+        return [row[index] for row in rows]
+    except IndexError:
+        return [row[index] if len(row) > index else '' for row in rows]
+
+
+def _chunk_arrays(lines, column, x_column, position):
+    """(x, y, skipped) of a chunk of lines; position counts the values so far"""
+    # str methods over the whole chunk, rather than a regex per line
+    text = ''.join(lines).translate(_SEPARATORS)
+    if column is None:
+        y, skipped, _ = _values(text.split())
+        return position + 1 + np.arange(y.size, dtype=np.float64), y, skipped
+
+    rows = [row for row in map(str.split, text.splitlines()) if row]
+    y, skipped, finite = _values(_column(rows, column))
+    if x_column is None:
+        return position + 1 + np.arange(y.size, dtype=np.float64), y, skipped
+    x_all, _, x_finite = _values(_column(rows, x_column))
+    # Rows whose x is missing still count towards the column statistics
+    x_full = np.full(len(rows), np.nan)
+    x_full[x_finite] = x_all
+    return x_full[finite], y, skipped
+
+
+def summarize(chunks, source, column=None, x_column=None, quantiles=True):
+    """Summary of chunks of text lines (see the module docstring for columns)"""
+    if (column is not None and column < 1) or (x_column is not None and x_column < 1):
+        raise calc_engine.CalculationError("Columns start at 1")
+    if x_column is not None and column is None:
+        raise calc_engine.CalculationError("x column needs a value column")
+    summary = Summary(source, quantiles, 'row' if x_column is None else 'x')
+    for lines in chunks:
+        x, y, skipped = _chunk_arrays(lines, column, x_column, summary.stats.count)
+        summary.skipped += skipped
+        summary.add(x, y)
+    return summary
+
+
+def summarize_text(text, column=None, x_column=None, quantiles=True):
+    """Summary of typed or pasted numbers"""
+    return summarize([text.splitlines(keepends=True)], "input", column, x_column, quantiles)
+
+
+def summarize_file(path, column=None, x_column=None, quantiles=True, chunk_bytes=CHUNK_BYTES):
+    """Summary of a text/CSV file, read CHUNK_BYTES at a time (picklable for workers)"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        chunks = iter(lambda: f.readlines(chunk_bytes), [])
+        return summarize(chunks, os.path.basename(path), column, x_column, quantiles)
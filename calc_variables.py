@@ -0,0 +1,313 @@
+"""
+Variables and User-Defined Functions
+Named values and one-parameter functions for expressions.
+
+A Workspace holds variables (r = 2, plus ans, the last result) and user
+functions defined as text, e.g. "f(x) = sin(x)^2 + ln(x)". A function body is
+parsed and compiled once into engine closures and registered in
+calc_engine.REGISTRY like a built-in, so expressions, the keypad, the
+precision modes and plotting call it without parsing it again. Over NumPy
+arrays the same parse tree runs through calc_vector, one whole-array
+operation per node.
+
+Calls between user functions are resolved when they run, so redefining a
+function updates every function that uses it; definitions that would call
+themselves are rejected. Variables and functions are saved to a JSON file
+and loaded again in the next session (ans comes from the history instead).
+
+Usage:
+    workspace = Workspace()
+    workspace.define("f(x) = sin(x)^2 + ln(x)")
+    workspace.define("r = 2")
+    calc_engine.evaluate("f(r) + 1", **workspace.variables)
+"""
+
+import json
+import math
+import os
+import re
+
+import calc_engine
+
+DEFINITIONS_FILE = os.path.join(os.path.expanduser('~'), '.scientific_calculator_definitions.json')
+
+# The last result, set by the calculator rather than defined
+ANSWER = 'ans'
+
+_DEFINITION_RE = re.compile(r"""
+    \s*(?P<name>[A-Za-z_][A-Za-z_0-9]*)
+    \s*(?:\(\s*(?P<parameter>[A-Za-z_][A-Za-z_0-9]*)\s*\))?
+    \s*=(?P<body>[^=].*|)$
+""", re.VERBOSE | re.DOTALL)
+
+
+class UserFunction:
+    """A compiled one-parameter function, called as function(num, is_degree)
+
+    Registered as the FunctionSpec's function, so a redefinition only swaps
+    the compiled body and every caller sees it.
+    """
+
+    def __init__(self, name, parameter, variables):
+        self.name = name
+        self.parameter = parameter
+        self.variables = variables
+        self.source = None
+        self.compiled = None
+        self.calls = frozenset()
+        self._code = None
+        self._free = False
+
+    def compile(self, parameter, body):
+        """Parse and compile a new body"""
+        compiled = calc_engine.compile(body)
+        self.parameter = parameter
+        self.source = f"{self.name}({parameter}) = {body.strip()}"
+        self.compiled = compiled
+        self.calls = frozenset(_calls(compiled.tree))
+        self._code = compiled.code
+        # Bodies using only their parameter skip copying the workspace
+        self._free = bool(compiled.variables - {parameter})
+
+    def __call__(self, num, is_degree=True):
+        if self._free:
+            scope = dict(self.variables)
+            scope[self.parameter] = num
+        else:
+            scope = {self.parameter: num}
+        return self._code(scope, is_degree)
+
+    def array(self, values, is_degree=True):
+        """(values, errors) over a NumPy array, for calc_vector"""
+        import calc_vector
+        scope = dict(self.variables)
+        scope[self.parameter] = values
+        return calc_vector.evaluate_tree(self.compiled.tree, scope, is_degree)
+
+    def precise(self, num, is_degree, mode, precision):
+        """Value in a decimal or exact mode, for calc_precision"""
+        import calc_precision
+        scope = dict(self.variables)
+        scope[self.parameter] = num
+        return calc_precision.evaluate_tree(self.compiled.tree, scope, is_degree, mode, precision)
+    def __repr__(self):
+        return f"UserFunction({self.source!r})"
+
+
+def _calls(node):
+    """Names of the functions a parse tree calls"""
+    if node[0] == 'call':
+        return {node[1]} | _calls(node[2])
+    if node[0] == 'binary':
+        return _calls(node[2]) | _calls(node[3])
+    return set()
+
+
+class Workspace:
+    """User variables and functions, registered with calc_engine and saved to a file"""
+
+    def __init__(self, path=DEFINITIONS_FILE, registry=None):
+        self.path = path
+        self.registry = registry or calc_engine.REGISTRY
+        self.variables = {}
+        self.functions = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def define(self, text, is_degree=True, save=True):
+        """Define "name = expression" or "name(x) = expression"
+
+        A variable gets the expression's value now; a function keeps its
+        body. Returns the name. Raises CalculationError.
+        """
+        match = _DEFINITION_RE.match(text)
+        if match is None or not match.group('body').strip():
+            raise calc_engine.CalculationError("Invalid definition")
+        name, parameter, body = match.group('name', 'parameter', 'body')
+        if parameter is None:
+            self._check_name(name, variable=True)
+            value = calc_engine.evaluate(body, is_degree, **self.variables)
+            if not isinstance(value, (int, float)):
+                raise calc_engine.CalculationError("Invalid calculation")
+            self.variables[name] = value
+        else:
+            self._check_name(name, variable=False)
+            self._define_function(name, parameter, body)
+        if save:
+            self.save()
+        return name
+
+    def _check_name(self, name, variable):
+        if name == ANSWER:
+            raise calc_engine.CalculationError(f"'{ANSWER}' is the last result")
+        if (name in calc_engine.CONSTANTS or name in calc_engine.OPERATOR_ALIASES
+                or (name in calc_engine.FUNCTIONS and name not in self.functions)):
+            raise calc_engine.CalculationError(f"'{name}' is built in")
+        if variable and name in self.functions:
+            raise calc_engine.CalculationError(f"'{name}' is a function")
+        if not variable and name in self.variables:
+            raise calc_engine.CalculationError(f"'{name}' is a variable")
+
+    def _register(self, name, parameter):
+        function = UserFunction(name, parameter, self.variables)
+        self.functions[name] = function
+        self.registry.register(name, function, mode_dependent=True,
+                               description=f"User function of {parameter}")
+        return function
+
+    def _unregister(self, name):
+        del self.functions[name]
+        self.registry.unregister(name)
+
+    def _define_function(self, name, parameter, body):
+        # Registered before its body is compiled, so the body parses name(
+        # as a call and recursion is caught below
+        function = self.functions.get(name) or self._register(name, parameter)
+        previous = (function.parameter, function.source.split('=', 1)[1]) if function.source else None
+        try:
+            function.compile(parameter, body)
+            if name in self._reachable(function.calls):
+                raise calc_engine.CalculationError(f"'{name}' cannot call itself")
+        except Exception:
+            if previous is None:
+                self._unregister(name)
+            else:
+                function.compile(*previous)
+            raise
+
+    def _reachable(self, names):
+        """User functions called, directly or indirectly, by the given names"""
+        seen = set()
+        pending = [name for name in names if name in self.functions]
+        while pending:
+            name = pending.pop()
+            if name not in seen:
+                seen.add(name)
+                pending.extend(call for call in self.functions[name].calls
+                               if call in self.functions)
+        return seen
+
+    def remove(self, name, save=True):
+        """Delete a variable or function (not one another function calls)"""
+        if name in self.variables:
+            del self.variables[name]
+        elif name in self.functions:
+            users = [other for other, function in self.functions.items()
+                     if other != name and name in function.calls]
+            if users:
+                raise calc_engine.CalculationError(f"'{name}' is used by {', '.join(users)}")
+            self._unregister(name)
+        else:
+            raise calc_engine.CalculationError(f"'{name}' is not defined")
+        if save:
+            self.save()
+
+    def set_answer(self, value):
+        """Make value (a number or display text) the ans variable"""
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                try:
+                    import fractions
+                    value = float(fractions.Fraction(value))
+                except (ValueError, ZeroDivisionError, OverflowError):
+                    return
+        if isinstance(value, float) and math.isnan(value):
+            return
+        self.variables[ANSWER] = value
+
+    def definitions(self):
+        """Source text of every user function, in definition order"""
+        return tuple(function.source for function in self.functions.values())
+
+    def install(self, definitions):
+        """Define functions from definitions() of another workspace (a worker's)"""
+        if self.definitions() == tuple(definitions):
+            return
+        # Register every name first: bodies may call functions defined later
+        matches = [_DEFINITION_RE.match(source) for source in definitions]
+        for match in matches:
+            if match.group('name') not in self.functions:
+                self._register(match.group('name'), match.group('parameter'))
+        for match in matches:
+            self.functions[match.group('name')].compile(match.group('parameter'),
+                                                        match.group('body'))
+        for name, function in self.functions.items():
+            if name in self._reachable(function.calls):
+                raise calc_engine.CalculationError(f"'{name}' cannot call itself")
+
+    def load(self):
+        """Read saved definitions; ones that no longer compile are skipped"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, value in saved.get('variables', {}).items():
+            if isinstance(value, (int, float)) and name != ANSWER:
+                self.variables[name] = value
+        sources = [source for source in saved.get('functions', [])
+                   if isinstance(source, str) and _DEFINITION_RE.match(source)]
+        try:
+            self.install(sources)
+        except calc_engine.CalculationError:
+            # Start over one definition at a time, keeping the ones that work
+            for name in list(self.functions):
+                self._unregister(name)
+            for source in sources:
+                try:
+                    self.define(source, save=False)
+                except calc_engine.CalculationError:
+                    pass
+
+    def save(self):
+        """Write the definitions file (replaced atomically)"""
+        if self.path is None:
+            return
+        saved = {
+            'variables': {name: value for name, value in self.variables.items()
+                          if name != ANSWER and isinstance(value, (int, float))},
+            'functions': list(self.definitions()),
+        }
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2)
+        os.replace(temporary, self.path)
+
+    def names(self):
+        """(variable names, function names), sorted"""
+        return sorted(self.variables), sorted(self.functions)
+
+
+# Workspace of a worker process, receiving the calculator's definitions
+_worker_workspace = None
+
+
+def install(definitions, variables=None):
+    """Make user functions (Workspace.definitions() text) and the variables
+    they read current in this process
+
+    A worker process may have no copy of the calculator's workspace, or a
+    stale one from when it was started.
+    """
+    global _worker_workspace
+    functions = []
+    for source in definitions:
+        spec = calc_engine.FUNCTIONS.get(_DEFINITION_RE.match(source).group('name'))
+        function = spec.function if spec is not None else None
+        if not isinstance(function, UserFunction) or function.source != source:
+            break
+        functions.append(function)
+    else:
+        definitions = None
+    if definitions is not None:
+        if _worker_workspace is None:
+            _worker_workspace = Workspace(path=None)
+        _worker_workspace.install(definitions)
+        functions = list(_worker_workspace.functions.values())
+    if variables is not None:
+        for scope in {id(function.variables): function.variables for function in functions}.values():
+            if scope is not variables:
+                scope.clear()
+                scope.update(variables)
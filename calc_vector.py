@@ -0,0 +1,400 @@
+"""
+Vectorized Batch Evaluation
+NumPy versions of the calculator's scientific functions.
+
+Each function takes a whole array and returns a result array in one pass,
+together with a boolean error mask marking the elements that fail the same
+domain checks the GUI performs (negative square root, non-positive logarithm,
+non-integer factorial). Failed elements are NaN in the result array.
+
+Usage:
+    values, errors = evaluate_array('sin', angles, is_degree=True)
+    values, errors = evaluate_expression('x**2 + sin(x)', xs, is_degree=False)
+    f = expression_function(*compile_function('x**2 + r'), False, {'r': 2})
+    ys = f(xs)                                   # NaN where undefined
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+import calc_engine
+import calc_trig
+from calc_engine import CalculationError
+
+
+BatchResult = namedtuple('BatchResult', ['values', 'errors'])
+
+# Largest n whose factorial fits in a float64
+MAX_FLOAT_FACTORIAL = 170
+_FACTORIAL_TABLE = np.array(
+    [float(math.factorial(n)) for n in range(MAX_FLOAT_FACTORIAL + 1)]
+)
+
+
+# Below this magnitude values are reduced with float arithmetic; larger
+# whole parts are reduced as int64 up to _INT_REDUCE_LIMIT, the rest by
+# np.fmod (slow for large arguments)
+_FLOAT_REDUCE_LIMIT = 2.0 ** 43
+_INT_REDUCE_LIMIT = 2.0 ** 62
+# Elements the degree trig functions process at a time (128 KiB of floats;
+# sin and cos work on the even and odd quadrants apart, in halves of that)
+_BLOCK = 16384
+
+# Sign of the quadrant's result: sin is negative in quadrants 2 and 3
+_QUADRANT_SIGN = np.array([1.0, 1.0, -1.0, -1.0])
+# sin, cos and tan of |d| = 0°, 30° and 45°, indexed by |d| / 15
+_EXACT_SIN = np.array([0.0, np.nan, 0.5, calc_trig.SQRT_HALF])
+_EXACT_COS = np.array([1.0, np.nan, calc_trig.COS_30, calc_trig.SQRT_HALF])
+_EXACT_TAN = np.array([0.0, np.nan, calc_trig.TAN_30, 1.0])
+
+
+def _reduce_degrees(values):
+    """Quadrant q (int 0..3) and |d| <= 45 with values ≡ 90q + d, exactly"""
+    # The steps work in place where they can: every temporary of a block
+    # costs an allocation and a pass over memory
+    if values.size and -_FLOAT_REDUCE_LIMIT < values.min() and values.max() < _FLOAT_REDUCE_LIMIT:
+        # Exact: 360·k is an integer below 2**53, and values - 360·k is
+        # either values itself (k = 0) or a difference of floats within a
+        # factor of two. r has the sign of values, like fmod, except just
+        # below a multiple of 360 where k rounds up: r is then a tiny
+        # negative number rather than just under 360, with the same
+        # quadrant and d.
+        r = np.divide(values, 360.0)
+        np.trunc(r, out=r)
+        r *= 360.0
+        np.subtract(values, r, out=r)
+    else:
+        # The whole part is reduced as an int64 and the (exact) fraction
+        # added back. fmod keeps the sign of the whole part, which the
+        # fraction shares, so the sum is exact as well (a positive
+        # remainder plus a negative fraction would round)
+        whole = np.trunc(values)
+        big = ~(np.abs(whole) < _INT_REDUCE_LIMIT)
+        r = np.fmod(np.where(big, 0.0, whole).astype(np.int64), 360) + (values - whole)
+        if big.any():
+            r[big] = np.fmod(values[big], 360.0)
+    q = np.divide(r, 90.0)
+    np.rint(q, out=q)
+    # NaN/inf give an arbitrary quadrant, but d (and the result) stays NaN
+    with np.errstate(invalid='ignore'):
+        quadrant = q.astype(np.int64)
+    quadrant &= 3
+    q *= 90.0
+    return quadrant, np.subtract(r, q, out=q)
+
+
+def _exact_angles(d):
+    """Indices where d is 0, ±30 or ±45, and those angles' index into _EXACT_*"""
+    magnitude = np.abs(d)
+    index = np.flatnonzero((magnitude == 0) | (magnitude == 30) | (magnitude == 45))
+    return index, (magnitude[index] / 15.0).astype(np.intp)
+
+
+def _by_block(function, values, *args):
+    """Results of function(block, *args), a tuple of arrays, computed over
+    _BLOCK-sized pieces of the flattened values and reshaped like values
+
+    The degree functions make a dozen temporaries; for a block they stay in
+    cache and their memory is reused, where whole-array temporaries would
+    each be mapped (and page-faulted) afresh.
+    """
+    flat = np.ravel(values)
+    if flat.size <= _BLOCK:
+        results = function(flat, *args)
+    else:
+        blocks = [function(flat[start:start + _BLOCK], *args)
+                  for start in range(0, flat.size, _BLOCK)]
+        results = [np.concatenate(parts) for parts in zip(*blocks)]
+    return [result.reshape(np.shape(values)) for result in results]
+
+
+def _sin_degrees(values, quarter_turns):
+    """Array version of calc_trig.sin_degrees (same steps); quarter_turns=1
+    gives cos_degrees, as cos x = sin(x + 90°)"""
+    q, d = _reduce_degrees(values)
+    if quarter_turns:
+        q += quarter_turns
+        q &= 3
+    # Quadrant q: sin d (q even) or cos d (q odd), negated for q >= 2. The
+    # two kinds are gathered and computed apart, so each element costs one
+    # sin or cos rather than both; the corrections are
+    # low·(1 - h²(1/2 - h²/24)) and low·high·(1 - h²(1/6 - h²/120)),
+    # evaluated in place
+    odd = (q & 1).astype(bool)
+    high, low = calc_trig.radians_split(d)
+    result = np.empty_like(d)
+
+    part = np.flatnonzero(~odd)
+    h = high[part]
+    h2 = h * h
+    c = h2 / 24.0
+    np.subtract(0.5, c, out=c)
+    c *= h2
+    np.subtract(1.0, c, out=c)
+    c *= low[part]
+    np.sin(h, out=h)
+    h += c
+    result[part] = h
+
+    part = np.flatnonzero(odd)
+    h = high[part]
+    h2 = h * h
+    c = h2 / 120.0
+    np.subtract(1.0 / 6.0, c, out=c)
+    c *= h2
+    np.subtract(1.0, c, out=c)
+    l = low[part]
+    l *= h
+    c *= l
+    np.cos(h, out=h)
+    h -= c
+    result[part] = h
+
+    exact, angle = _exact_angles(d)
+    if exact.size:
+        result[exact] = np.where(odd[exact], _EXACT_COS[angle],
+                                 np.copysign(_EXACT_SIN[angle], d[exact]))
+    result *= _QUADRANT_SIGN[q]
+    # + 0.0 turns -0.0 into 0.0
+    result += 0.0
+    return (result,)
+
+
+def _tan_degrees(values):
+    """Array version of calc_trig.tan_degrees: (result, undefined mask)"""
+    q, d = _reduce_degrees(values)
+    high, low = calc_trig.radians_split(d)
+    t = np.tan(high)
+    t += low * (1.0 + t * t)
+    exact, angle = _exact_angles(d)
+    if exact.size:
+        t[exact] = np.copysign(_EXACT_TAN[angle], d[exact])
+    odd = (q & 1).astype(bool)
+    # Odd multiples of 90° are undefined, like the scalar path
+    errors = odd & (d == 0)
+    with np.errstate(divide='ignore'):
+        t = np.where(odd, -1.0 / t, t)
+    return t + 0.0, errors
+
+
+def _sin(values, is_degree):
+    if is_degree:
+        return _by_block(_sin_degrees, values, 0)[0], None
+    return np.sin(values), None
+
+
+def _cos(values, is_degree):
+    if is_degree:
+        return _by_block(_sin_degrees, values, 1)[0], None
+    return np.cos(values), None
+
+
+def _tan(values, is_degree):
+    if not is_degree:
+        return np.tan(values), None
+    return tuple(_by_block(_tan_degrees, values))
+
+
+def _sqrt(values, is_degree):
+    errors = values < 0
+    return np.sqrt(values), errors
+
+
+def _cbrt(values, is_degree):
+    # Matches the scalar path, where num ** (1/3) is invalid for negatives
+    errors = values < 0
+    return np.cbrt(values), errors
+
+
+def _ln(values, is_degree):
+    errors = values <= 0
+    return np.log(values), errors
+
+
+def _log(values, is_degree):
+    errors = values <= 0
+    return np.log10(values), errors
+
+
+def _square(values, is_degree):
+    return np.square(values), None
+
+
+def _abs(values, is_degree):
+    return np.abs(values), None
+
+
+def _factorial(values, is_degree):
+    errors = (values < 0) | (values != np.floor(values)) | ~np.isfinite(values)
+    index = np.where(errors, 0, values)
+    # Factorials beyond the float64 range become inf, like float(math.factorial(n))
+    overflow = index > MAX_FLOAT_FACTORIAL
+    index = np.minimum(index, MAX_FLOAT_FACTORIAL).astype(np.intp)
+    result = _FACTORIAL_TABLE[index]
+    result[overflow] = np.inf
+    return result, errors
+
+
+def _percent(values, is_degree):
+    return values / 100, None
+
+
+def _negate(values, is_degree):
+    return np.negative(values), None
+
+
+# Button label / name -> vectorized function(values, is_degree)
+ARRAY_FUNCTIONS = {
+    'sin': _sin,
+    'cos': _cos,
+    'tan': _tan,
+    '√': _sqrt,
+    'sqrt': _sqrt,
+    '∛': _cbrt,
+    'cbrt': _cbrt,
+    'ln': _ln,
+    'log': _log,
+    'x²': _square,
+    'sqr': _square,
+    '|x|': _abs,
+    'abs': _abs,
+    'n!': _factorial,
+    'fact': _factorial,
+    '%': _percent,
+    'percent': _percent,
+    '+/-': _negate,
+    'neg': _negate,
+}
+
+
+def array_function(func):
+    """Vectorized function(values, is_degree) of a label or name
+
+    Registered functions without an entry in ARRAY_FUNCTIONS are used when
+    they bring their own array method (user functions, see calc_variables).
+    """
+    function = ARRAY_FUNCTIONS.get(func)
+    if function is None:
+        spec = calc_engine.FUNCTIONS.get(func)
+        function = getattr(spec.function, 'array', None) if spec is not None else None
+        if function is None:
+            raise CalculationError("Invalid operation")
+    return function
+
+
+def evaluate_array(func, values, is_degree=True):
+    """Apply a scientific function to every element of an array"""
+    function = array_function(func)
+
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        result, errors = function(values, is_degree)
+    if errors is None:
+        errors = np.zeros(values.shape, dtype=bool)
+    elif errors.any():
+        result = np.where(errors, np.nan, result)
+    return BatchResult(result, errors)
+
+
+# Binary operators on arrays; the error mask marks what the scalar path rejects
+_ARRAY_OPERATORS = {
+    '+': lambda a, b: (np.add(a, b), None),
+    '-': lambda a, b: (np.subtract(a, b), None),
+    '*': lambda a, b: (np.multiply(a, b), None),
+    '/': lambda a, b: (np.divide(a, b), b == 0),
+    '%': lambda a, b: (np.mod(a, b), b == 0),
+    # Negative base with fractional exponent is complex in the scalar path,
+    # zero to a negative power a ZeroDivisionError
+    '**': lambda a, b: (np.power(a, b),
+                        ((a < 0) & (b != np.floor(b))) | ((a == 0) & (b < 0))),
+}
+
+
+def evaluate_tree(node, variables, is_degree):
+    """Return (values, errors) for a parse tree node; errors may be None"""
+    kind = node[0]
+    if kind == 'num':
+        return np.float64(node[1]), None
+    if kind == 'var':
+        try:
+            return variables[node[1]], None
+        except KeyError:
+            raise CalculationError(f"Unknown variable '{node[1]}'")
+    if kind == 'call':
+        function = array_function(node[1])
+        values, errors = evaluate_tree(node[2], variables, is_degree)
+        result, own_errors = function(np.asarray(values, dtype=np.float64), is_degree)
+        return result, _merge(errors, own_errors)
+    left, left_errors = evaluate_tree(node[2], variables, is_degree)
+    right, right_errors = evaluate_tree(node[3], variables, is_degree)
+    result, own_errors = _ARRAY_OPERATORS[node[1]](left, right)
+    return result, _merge(_merge(left_errors, right_errors), own_errors)
+
+
+def _merge(errors, more):
+    if errors is None:
+        return more
+    if more is None:
+        return errors
+    return errors | more
+
+
+def _evaluate(compiled, variables, shape, is_degree):
+    """(values, errors or None) of a compiled expression, broadcast to shape,
+    with NaN where errors is set"""
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        result, errors = evaluate_tree(compiled.tree, variables, is_degree)
+    result = np.broadcast_to(np.asarray(result, dtype=np.float64), shape)
+    if errors is not None:
+        errors = np.broadcast_to(errors, shape)
+        if errors.any():
+            result = np.where(errors, np.nan, result)
+    return result, errors
+
+
+def evaluate_expression(expr, values, is_degree=True, variable='x', **variables):
+    """Evaluate an expression over an array bound to one variable
+
+    expr is an expression string or calc_engine.CompiledExpression; other
+    variables are passed as scalars or arrays of the same shape.
+    """
+    compiled = calc_engine.compile(expr)
+    values = np.asarray(values, dtype=np.float64)
+    variables[variable] = values
+    result, errors = _evaluate(compiled, variables, values.shape, is_degree)
+    if errors is None:
+        errors = np.zeros(values.shape, dtype=bool)
+    return BatchResult(np.array(result), np.array(errors))
+
+
+def compile_function(expr, variables=(), message="Expression needs a single variable"):
+    """Compiled expression and its variable (x unless it uses another name)
+
+    variables are names with known values, so they are not the variable;
+    an expression with more than one other name raises CalculationError
+    with message.
+    """
+    compiled = calc_engine.compile(expr)
+    unknowns = compiled.variables - set(variables)
+    if len(unknowns) > 1:
+        raise CalculationError(message)
+    return compiled, next(iter(unknowns), 'x')
+
+
+def expression_function(compiled, variable, is_degree=True, variables=None):
+    """Array -> array version of a compiled expression in one variable, NaN
+    where it is undefined; variables holds the values of its other names"""
+    scope = dict(variables or {})
+
+    def f(x):
+        scope[variable] = x
+        return _evaluate(compiled, scope, x.shape, is_degree)[0]
+
+    return f
+
+
+def format_array(values):
+    """Round results to 10 decimal places like the display does"""
+    return np.round(values, 10)
@@ -0,0 +1,190 @@
+"""
+Background Computation
+Keeps long computations off the Tk mainloop.
+
+Cheap calculations run inline as before. Calculations estimated to be heavy
+(big-integer powers and factorials) are sent to a worker process - a process
+rather than a thread, because big-integer arithmetic holds the GIL and would
+starve the UI thread. The result is collected by polling with root.after, and
+an in-flight job can be cancelled, which terminates the worker.
+"""
+
+import math
+import multiprocessing
+import numbers
+
+import calc_engine
+import calc_factorial
+
+POLL_MS = 30
+WORKER_PROCESSES = 1
+
+# Results estimated above this many bits are computed in the background
+HEAVY_RESULT_BITS = 2_000_000
+# Decimal steps with more significant digits than this are computed in the
+# background (a transcendental function takes about 1 ms at 200 digits and
+# grows faster than quadratically)
+HEAVY_DIGITS = 200
+
+
+def evaluate_operation(operator, num1, num2):
+    """Formatted result of a pending binary operation (picklable for workers)"""
+    return calc_engine.format_result(calc_engine.apply_operator(operator, num1, num2))
+
+
+def evaluate_function(func, num, is_degree):
+    """Display value of a scientific function (picklable for workers)"""
+    spec = calc_engine.FUNCTIONS.get(func)
+    if spec is None:
+        raise calc_engine.CalculationError("Invalid operation")
+    return spec.display(num, is_degree)
+
+
+def is_heavy(op, operands, display=False, is_degree=True, digits=None):
+    """Estimate whether an operation is too expensive to run on the UI thread
+
+    display is set when the caller shows the result through the function's
+    display shortcut (evaluate_function in float mode) rather than needing
+    the full number, as the decimal and exact modes and any further
+    arithmetic do. A user function is heavy if a step of its body is, for
+    which the body is evaluated step by step in is_degree's angle unit.
+    digits is the significant digits of a decimal or exact mode step; every
+    step above HEAVY_DIGITS is heavy.
+    """
+    if digits is not None and digits > HEAVY_DIGITS:
+        return True
+    if op == '**' and len(operands) == 2:
+        base, exponent = operands
+        # Float and Decimal powers are O(1) (or overflow); only exact integer
+        # and rational powers grow
+        if (isinstance(base, numbers.Rational) and isinstance(exponent, numbers.Rational)
+                and exponent.denominator == 1 and exponent > 0):
+            size = max(abs(base.numerator), base.denominator)
+            return size > 1 and exponent * math.log2(size) > HEAVY_RESULT_BITS
+        return False
+    if op in ('n!', 'fact') and len(operands) == 1:
+        spec = calc_engine.FUNCTIONS[op]
+        # The display path is O(1) for huge n; only the full integer is costly
+        return ((not display or spec.display_function is None)
+                and operands[0] >= calc_factorial.SWING_THRESHOLD)
+    function = getattr(calc_engine.FUNCTIONS.get(op), 'function', None)
+    if len(operands) == 1 and hasattr(function, 'compiled'):
+        try:
+            _body_value(function, float(operands[0]), is_degree)
+        except _HeavyStep:
+            return True
+        except Exception:
+            # The body fails at a light step, so evaluating it fails quickly
+            return False
+    return False
+
+
+class _HeavyStep(Exception):
+    """Raised by _body_value at a heavy step"""
+
+
+def _body_value(function, num, is_degree):
+    """Value of a user function's body, raising _HeavyStep before a heavy step"""
+    scope = dict(function.variables)
+    scope[function.parameter] = num
+    return _node_value(function.compiled.tree, scope, is_degree)
+
+
+def _node_value(node, scope, is_degree):
+    kind = node[0]
+    if kind == 'num':
+        return node[1]
+    if kind == 'var':
+        return scope[node[1]]
+    if kind == 'call':
+        op, operands = node[1], (_node_value(node[2], scope, is_degree),)
+        function = calc_engine.FUNCTIONS[op].function
+        if hasattr(function, 'compiled'):
+            # Nested user functions are walked rather than checked and then
+            # called, so each body is evaluated once
+            return _body_value(function, operands[0], is_degree)
+    else:
+        op = node[1]
+        operands = (_node_value(node[2], scope, is_degree), _node_value(node[3], scope, is_degree))
+    if is_heavy(op, operands):
+        raise _HeavyStep
+    if len(operands) == 2:
+        return calc_engine.apply_operator(op, *operands)
+    return calc_engine.apply_function(op, operands[0], is_degree)
+
+
+class ComputationScheduler:
+    """Runs one calculation at a time, inline or in a worker process"""
+
+    def __init__(self, root, poll_ms=POLL_MS, on_busy=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self._pool = None
+        self._job = None
+
+    @property
+    def busy(self):
+        return self._job is not None
+
+    def run(self, function, args, on_result, on_error, heavy=False):
+        """Compute function(*args) and deliver the outcome to a callback
+
+        Light work runs immediately; heavy work goes to the worker process and
+        its callback runs later on the Tk thread.
+        """
+        if not heavy:
+            try:
+                result = function(*args)
+            except Exception as error:
+                on_error(error)
+            else:
+                on_result(result)
+            return
+
+        self.cancel()
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(WORKER_PROCESSES)
+        self._job = (self._pool.apply_async(function, args), on_result, on_error)
+        self._set_busy(True)
+        self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        if self._job is None:
+            return
+        pending, on_result, on_error = self._job
+        if not pending.ready():
+            self.root.after(self.poll_ms, self._poll)
+            return
+
+        self._job = None
+        self._set_busy(False)
+        try:
+            result = pending.get()
+        except Exception as error:
+            on_error(error)
+        else:
+            on_result(result)
+
+    def cancel(self):
+        """Abort the in-flight job, if any; return True if one was cancelled"""
+        if self._job is None:
+            return False
+        self._job = None
+        # A running task cannot be interrupted, so the worker is killed and a
+        # fresh pool is started on the next heavy job
+        self._pool.terminate()
+        self._pool = None
+        self._set_busy(False)
+        return True
+
+    def _set_busy(self, busy):
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def shutdown(self):
+        """Stop the worker process"""
+        self._job = None
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
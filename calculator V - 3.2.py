@@ -6,19 +6,88 @@ Course: ENR106 Introduction to Programming
 
 Features:
 - Basic arithmetic operations (Add, Subtract, Multiply, Divide, Modulo)
+- Expressions with operator precedence, parentheses and live preview
 - Scientific functions (Trigonometry, Logarithms, Powers, Roots)
-- Sine curve visualization when calculating sin values
+- Function curve visualization (sin, cos, tan, ln, log, roots, x², |x|, f(x))
 - Error handling and validation
 - Calculation history tracking
+- Diagnostics panel with handler timings and profiling (F12)
+- Keyboard input and pasting of whole expressions
+- Variables (ans = last result) and user-defined functions, kept across sessions
+- Equation solver finding every root in an interval
+- Numeric integrals and derivatives with error estimates, shaded/tangent on the graph
+- Statistics of typed, pasted or file data in one streaming pass
 - User-friendly GUI with Tkinter
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import math
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import importlib
+import os
+import sys
+import threading
+import time
+import calc_cache
+import calc_engine
+import calc_expression
+import calc_history
+import calc_variables
+import calc_worker
+
+# Modules imported on demand by _load, by name: plotting (calc_plot), the
+# solver, calculus and statistics (calc_solver, calc_calculus, calc_stats),
+# all of which pull in NumPy, plus calc_precision and calc_profile
+_loaded = {}
+
+# Delay before the plotting stack is warmed up in the background
+PLOT_WARMUP_DELAY_MS = 500
+
+# Number of formatted scientific results kept in the LRU cache
+SCIENTIFIC_CACHE_SIZE = 4096
+
+# Number of stored history records loaded into the panel at a time
+HISTORY_PAGE_SIZE = 100
+
+# Precision modes cycled by the mode button, and the DEC/EXACT digit count
+PRECISION_MODES = {'float': "FLOAT", 'decimal': "DEC", 'exact': "EXACT"}
+DECIMAL_PRECISION = 50
+
+# Handlers timed by the diagnostics panel, and its refresh interval
+INSTRUMENTED_HANDLERS = (
+    'handle_button', 'handle_operator', 'calculate', 'handle_scientific',
+    'finish_calculation', 'finish_scientific', 'plot_function',
+    'plot_expression_curve', 'add_to_history', 'update_history_display',
+)
+DIAGNOSTICS_REFRESH_MS = 1000
+
+# Display refreshes are coalesced to at most one per frame
+DISPLAY_FRAME_MS = 16
+
+# Keys that act like a button (keysym or character -> button label); other
+# typed characters go to the expression as text
+KEY_BUTTONS = {
+    'Return': '=', 'KP_Enter': '=', '=': '=',
+    'BackSpace': '⌫', 'Escape': 'C', 'Delete': 'C',
+    's': 'sin', 'c': 'cos', 't': 'tan', 'l': 'ln', 'g': 'log',
+    'r': '√', '!': 'n!', '%': '%', 'p': 'π',
+}
+CONTROL_MASK = 0x4
+
+# Default solve interval, and the number of roots listed in a history entry
+SOLVE_RANGE = ('-360', '360')
+SOLVE_SHOWN_ROOTS = 10
+
+# Default bounds of the calculus bar (a is also the derivative's point)
+CALCULUS_BOUNDS = ('0', '1')
+
+
+def _load(name):
+    """Import the module name (e.g. 'calc_plot') on first use and return it"""
+    module = _loaded.get(name)
+    if module is None:
+        module = _loaded[name] = importlib.import_module(name)
+    return module
+
 
 class ScientificCalculator:
     def __init__(self, root):
@@ -30,18 +99,78 @@ class ScientificCalculator:
         
         # Variables
         self.display_var = tk.StringVar(value="0")
-        self.equation = ""
-        self.history = []
+        self.preview_var = tk.StringVar(value="")
+        self.history = calc_history.HistoryBuffer(calc_history.DEFAULT_CAPACITY)
+        self.history_loaded = 0
+        self.history_page_pending = False
+        try:
+            self.history_store = calc_history.HistoryStore()
+        except (OSError, ValueError):
+            self.history_store = None
+        self.workspace = calc_variables.Workspace()
+        if self.history_store is not None and len(self.history_store):
+            last = self.history_store.record(-1)
+            if not last.error:
+                self.workspace.set_answer(last.result)
         self.is_degree = True
+        self.precision_mode = 'float'
+        self.expression = calc_expression.ExpressionBuffer(self.arithmetic())
         self.error_message = tk.StringVar(value="")
+        self.display_update = None
         self.show_graph = False
+        self.scientific_cache = calc_cache.ScientificCache(SCIENTIFIC_CACHE_SIZE)
+        self.scheduler = calc_worker.ComputationScheduler(root, on_busy=self.set_busy)
         
-        # Graph variables
+        # Graph variables (one cached function plot per DEG/RAD mode)
         self.graph_frame = None
         self.canvas = None
+        self.plots = {}
+        self.active_plot = None
+        
+        # Diagnostics: handler timers and session profiler, off until asked for
+        self.instrumentation = None
+        self.profiler = None
+        self.diagnostics_window = None
+        self.diagnostics_refresh = None
+        
+        # Statistics window, built when first opened
+        self.stats_window = None
+        
+        # Dispatch tables: button label -> handler
+        self.button_actions = {
+            'C': lambda btn_text: self.clear(),
+            '⌫': lambda btn_text: self.backspace(),
+            '=': lambda btn_text: self.calculate(),
+            '÷': self.handle_operator,
+            '×': self.handle_operator,
+            '-': self.handle_operator,
+            '+': self.handle_operator,
+            '(': self.add_parenthesis,
+            ')': self.add_parenthesis,
+            '.': lambda btn_text: self.add_decimal(),
+        }
+        self.scientific_actions = {
+            'π': self.insert_pi,
+            'mod': lambda: self.handle_operator('%'),
+            'x^y': self.start_power,
+        }
         
         # Setup UI
         self.setup_ui()
+        self.load_history_page()
+        
+        # Hidden diagnostics panel
+        self.root.bind('<F12>', self.toggle_diagnostics)
+        self.root.bind('<Control-Shift-KeyPress-D>', self.toggle_diagnostics)
+        
+        # Keyboard and clipboard input
+        self.root.bind('<Key>', self.on_key)
+        self.root.bind('<<Paste>>', self.on_paste)
+        if os.environ.get('CALCULATOR_TIMINGS'):
+            self.toggle_timing()
+        
+        # Warm up the plotting stack once the window is on screen
+        self.root.after(PLOT_WARMUP_DELAY_MS, self.start_plot_warmup)
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -51,7 +180,7 @@ class ScientificCalculator:
         
         title_label = tk.Label(
             title_frame,
-            text="Scientific Calculator with Sine Curve Visualization",
+            text="Scientific Calculator with Function Curve Visualization",
             font=('Arial', 16, 'bold'),
             bg='#1a1a2e',
             fg='#ffffff'
@@ -104,6 +233,18 @@ class ScientificCalculator:
         )
         display.pack(fill='x', padx=5, pady=5)
         
+        # Live preview of the expression's value
+        preview_label = tk.Label(
+            display_frame,
+            textvariable=self.preview_var,
+            font=('Arial', 11),
+            bg='#16213e',
+            fg='#8d99ae',
+            anchor='e',
+            height=1
+        )
+        preview_label.pack(fill='x', padx=5)
+        
         # Error message
         error_label = tk.Label(
             display_frame,
@@ -131,6 +272,18 @@ class ScientificCalculator:
         )
         self.deg_rad_btn.pack(side='left', padx=5)
         
+        # Precision mode button
+        self.precision_btn = tk.Button(
+            mode_frame,
+            text=PRECISION_MODES[self.precision_mode],
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            width=8,
+            command=self.toggle_precision_mode
+        )
+        self.precision_btn.pack(side='left', padx=5)
+        
         # Graph toggle button
         self.graph_toggle_btn = tk.Button(
             mode_frame,
@@ -143,6 +296,17 @@ class ScientificCalculator:
         )
         self.graph_toggle_btn.pack(side='left', padx=5)
         
+        # Statistics window button
+        tk.Button(
+            mode_frame,
+            text="Stats",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            width=8,
+            command=self.toggle_stats
+        ).pack(side='left', padx=5)
+        
         # Scientific Functions Frame
         sci_frame = tk.Frame(calc_frame, bg='#2d2d44')
         sci_frame.pack(pady=5)
@@ -208,6 +372,153 @@ class ScientificCalculator:
                 )
                 btn.pack(side='left', padx=2, pady=2)
         
+        # Definitions bar: [r = 2 / f(x) = ...] [Define] [Names]
+        define_bar = tk.Frame(calc_frame, bg='#2d2d44')
+        define_bar.pack(fill='x', padx=10, pady=(0, 10))
+        
+        self.definition = tk.StringVar(value="")
+        definition_entry = tk.Entry(
+            define_bar,
+            textvariable=self.definition,
+            font=('Arial', 11),
+            bg='#16213e',
+            fg='#ffffff',
+            insertbackground='#ffffff'
+        )
+        definition_entry.pack(side='left', fill='x', expand=True, padx=5)
+        definition_entry.bind('<Return>', lambda event: self.define())
+        
+        tk.Button(
+            define_bar,
+            text="Define",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.define
+        ).pack(side='left')
+        
+        names_btn = tk.Menubutton(
+            define_bar,
+            text="Names ▾",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            relief='raised'
+        )
+        # Rebuilt each time it opens, so values like ans are current
+        self.names_menu = tk.Menu(names_btn, tearoff=0, postcommand=self.update_names_menu)
+        names_btn.config(menu=self.names_menu)
+        names_btn.pack(side='left', padx=5)
+        
+        # Solve bar: Solve [equation] in [low] to [high] [Solve]
+        solve_bar = tk.Frame(calc_frame, bg='#2d2d44')
+        solve_bar.pack(fill='x', padx=10, pady=(0, 10))
+        
+        tk.Label(
+            solve_bar,
+            text="Solve",
+            font=('Arial', 10, 'bold'),
+            bg='#2d2d44',
+            fg='#ffffff'
+        ).pack(side='left')
+        
+        self.solve_equation = tk.StringVar(value="")
+        equation_entry = tk.Entry(
+            solve_bar,
+            textvariable=self.solve_equation,
+            font=('Arial', 11),
+            bg='#16213e',
+            fg='#ffffff',
+            insertbackground='#ffffff'
+        )
+        equation_entry.pack(side='left', fill='x', expand=True, padx=5)
+        equation_entry.bind('<Return>', lambda event: self.solve())
+        
+        # Interval to search
+        self.solve_low = tk.StringVar(value=SOLVE_RANGE[0])
+        self.solve_high = tk.StringVar(value=SOLVE_RANGE[1])
+        for label, variable in (("in", self.solve_low), ("to", self.solve_high)):
+            tk.Label(solve_bar, text=label, font=('Arial', 10), bg='#2d2d44', fg='#ffffff').pack(side='left')
+            bound = tk.Entry(
+                solve_bar,
+                textvariable=variable,
+                font=('Arial', 11),
+                width=7,
+                bg='#16213e',
+                fg='#ffffff',
+                insertbackground='#ffffff'
+            )
+            bound.pack(side='left', padx=5)
+            bound.bind('<Return>', lambda event: self.solve())
+        
+        tk.Button(
+            solve_bar,
+            text="Solve",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.solve
+        ).pack(side='left')
+        
+        # Calculus bar: ∫ d/dx [expression] a [low] b [high] [∫ a→b] [d/dx at a]
+        calculus_bar = tk.Frame(calc_frame, bg='#2d2d44')
+        calculus_bar.pack(fill='x', padx=10, pady=(0, 10))
+        
+        tk.Label(
+            calculus_bar,
+            text="∫ d/dx",
+            font=('Arial', 10, 'bold'),
+            bg='#2d2d44',
+            fg='#ffffff'
+        ).pack(side='left')
+        
+        self.calculus_expression = tk.StringVar(value="")
+        calculus_entry = tk.Entry(
+            calculus_bar,
+            textvariable=self.calculus_expression,
+            font=('Arial', 11),
+            bg='#16213e',
+            fg='#ffffff',
+            insertbackground='#ffffff'
+        )
+        calculus_entry.pack(side='left', fill='x', expand=True, padx=5)
+        calculus_entry.bind('<Return>', lambda event: self.integrate())
+        
+        # Integration bounds; the derivative is taken at a
+        self.calculus_low = tk.StringVar(value=CALCULUS_BOUNDS[0])
+        self.calculus_high = tk.StringVar(value=CALCULUS_BOUNDS[1])
+        for label, variable in (("a", self.calculus_low), ("b", self.calculus_high)):
+            tk.Label(calculus_bar, text=label, font=('Arial', 10), bg='#2d2d44', fg='#ffffff').pack(side='left')
+            bound = tk.Entry(
+                calculus_bar,
+                textvariable=variable,
+                font=('Arial', 11),
+                width=7,
+                bg='#16213e',
+                fg='#ffffff',
+                insertbackground='#ffffff'
+            )
+            bound.pack(side='left', padx=5)
+            bound.bind('<Return>', lambda event: self.integrate())
+        
+        tk.Button(
+            calculus_bar,
+            text="∫ a→b",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.integrate
+        ).pack(side='left')
+        
+        tk.Button(
+            calculus_bar,
+            text="d/dx at a",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.differentiate
+        ).pack(side='left', padx=(5, 0))
+        
         # Right side - History
         history_frame = tk.Frame(main_container, bg='#2d2d44', relief='raised', bd=2)
         history_frame.pack(side='right', padx=10, pady=10, fill='both')
@@ -231,6 +542,7 @@ class ScientificCalculator:
             state='disabled'
         )
         self.history_text.pack(padx=5, pady=5)
+        self.history_text.configure(yscrollcommand=self.on_history_scroll)
         
         clear_history_btn = tk.Button(
             history_frame,
@@ -245,11 +557,44 @@ class ScientificCalculator:
         # Graph Frame (initially hidden)
         self.graph_container = tk.Frame(main_container, bg='#2d2d44', relief='raised', bd=2)
         
+        # Expression plot bar: f(x) = [entry] [Plot]
+        plot_bar = tk.Frame(self.graph_container, bg='#2d2d44')
+        plot_bar.pack(side='top', fill='x', padx=10, pady=(10, 0))
+        
+        tk.Label(
+            plot_bar,
+            text="f(x) =",
+            font=('Arial', 10, 'bold'),
+            bg='#2d2d44',
+            fg='#ffffff'
+        ).pack(side='left')
+        
+        self.plot_expression = tk.StringVar(value="")
+        plot_entry = tk.Entry(
+            plot_bar,
+            textvariable=self.plot_expression,
+            font=('Arial', 11),
+            bg='#16213e',
+            fg='#ffffff',
+            insertbackground='#ffffff'
+        )
+        plot_entry.pack(side='left', fill='x', expand=True, padx=5)
+        plot_entry.bind('<Return>', lambda event: self.plot_expression_curve())
+        
+        tk.Button(
+            plot_bar,
+            text="Plot",
+            font=('Arial', 10, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.plot_expression_curve
+        ).pack(side='left')
+        
         # Features info
         info_frame = tk.Frame(self.root, bg='#2d2d44', relief='raised', bd=2)
         info_frame.pack(padx=20, pady=10, fill='x')
         
-        info_text = "Features: Basic Operations | Scientific Functions | Sine Curve Visualization | Error Handling"
+        info_text = "Features: Basic Operations | Scientific Functions | Function Curve Visualization | Error Handling"
         info_label = tk.Label(
             info_frame,
             text=info_text,
@@ -261,10 +606,16 @@ class ScientificCalculator:
         )
         info_label.pack(pady=5)
     
+    def start_plot_warmup(self):
+        """Import matplotlib/NumPy in a background thread"""
+        if 'calc_plot' not in _loaded:
+            threading.Thread(target=_load, args=('calc_plot',), daemon=True).start()
+    
     def toggle_graph(self):
         """Toggle graph visibility"""
         self.show_graph = not self.show_graph
         if self.show_graph:
+            _load('calc_plot')
             self.graph_container.pack(side='right', padx=10, pady=10, fill='both', expand=True)
             self.graph_toggle_btn.config(text="Hide Graph")
             self.root.geometry("1400x650")
@@ -273,303 +624,529 @@ class ScientificCalculator:
             self.graph_toggle_btn.config(text="Show Graph")
             self.root.geometry("1100x650")
     
-    def plot_sine_curve(self, angle_input, result):
-        """Plot sine curve with the calculated point"""
-        # Clear previous graph
-        for widget in self.graph_container.winfo_children():
-            widget.destroy()
-        
-        # Create figure
-        fig, ax = plt.subplots(figsize=(5, 4), facecolor='#2d2d44')
-        ax.set_facecolor('#16213e')
-        
-        # Generate sine curve data
-        if self.is_degree:
-            x_degrees = np.linspace(-360, 360, 1000)
-            x_radians = np.radians(x_degrees)
-            angle_rad = np.radians(angle_input)
-            xlabel = 'Angle (degrees)'
-            angle_display = angle_input
-        else:
-            x_radians = np.linspace(-2*np.pi, 2*np.pi, 1000)
-            x_degrees = np.degrees(x_radians)
-            angle_rad = angle_input
-            xlabel = 'Angle (radians)'
-            angle_display = angle_input
-        
-        y = np.sin(x_radians)
-        
-        # Plot sine curve
-        ax.plot(x_degrees if self.is_degree else x_radians, y, 
-                color='#5e60ce', linewidth=2, label='sin(x)')
-        
-        # Mark the calculated point
-        ax.scatter(angle_display, result, color='#ff6b6b', s=100, 
-                  zorder=5, label=f'sin({angle_display:.2f}) = {result:.4f}')
-        
-        # Styling
-        ax.set_xlabel(xlabel, color='#ffffff', fontsize=10)
-        ax.set_ylabel('sin(x)', color='#ffffff', fontsize=10)
-        ax.set_title('Sine Curve', color='#ffffff', fontsize=12, fontweight='bold')
-        ax.grid(True, alpha=0.3, color='#a8a8ff')
-        ax.axhline(0, color='#ffffff', linewidth=0.5, alpha=0.5)
-        ax.axvline(0, color='#ffffff', linewidth=0.5, alpha=0.5)
-        ax.tick_params(colors='#ffffff', labelsize=8)
-        ax.legend(facecolor='#2d2d44', edgecolor='#5e60ce', 
-                 labelcolor='#ffffff', fontsize=8)
-        
-        # Adjust spines
-        for spine in ax.spines.values():
-            spine.set_color('#5e60ce')
-        
-        plt.tight_layout()
-        
-        # Embed in tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_container)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+    def current_plot(self):
+        """The graph for the current DEG/RAD mode, shown in the panel"""
+        # Figure, line and canvas are built once per mode and reused
+        plot = self.plots.get(self.is_degree)
+        if plot is None:
+            plot = _load('calc_plot').FunctionPlot(self.graph_container, self.is_degree)
+            self.plots[self.is_degree] = plot
+        
+        if plot is not self.active_plot:
+            if self.active_plot is not None:
+                self.active_plot.hide()
+            plot.show()
+            self.active_plot = plot
         
         # Store canvas reference
-        self.canvas = canvas
+        self.canvas = plot.canvas
+        return plot
+    
+    def plot_function(self, func, num, result):
+        """Plot a function's curve with the calculated point"""
+        try:
+            x = float(num)
+            text = str(result)
+            # Exact mode shows fractions as "p/q"
+            y = _load('calc_precision').to_number(text, 'float') if '/' in text else float(text)
+        except (OverflowError, ValueError):
+            return
+        plot = self.current_plot()
+        # Cached curves are swapped in; only the marker moves between presses
+        plot.plot(func)
+        plot.mark(x, y)
+    
+    def plot_expression_curve(self):
+        """Plot the expression typed in the graph panel"""
+        self.error_message.set("")
+        expr = self.plot_expression.get().strip()
+        if not expr:
+            return
+        try:
+            self.current_plot().plot(expr)
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
     
     def handle_button(self, btn_text):
         """Handle basic button clicks"""
         self.error_message.set("")
+        if self.scheduler.busy and btn_text != 'C':
+            return
         
-        if btn_text == 'C':
-            self.clear()
-        elif btn_text == '⌫':
-            self.backspace()
-        elif btn_text == '=':
-            self.calculate()
-        elif btn_text in ['÷', '×', '-', '+']:
-            self.handle_operator(btn_text)
-        elif btn_text in ['(', ')']:
-            self.add_parenthesis(btn_text)
-        elif btn_text == '.':
-            self.add_decimal()
-        else:
-            self.add_number(btn_text)
+        # Digits fall through to add_number
+        action = self.button_actions.get(btn_text, self.add_number)
+        action(btn_text)
+    
+    def insert_pi(self):
+        """Put π into the expression"""
+        if self.expression.constant('π'):
+            self.update_display()
+    
+    def start_power(self):
+        """Start an x^y operation"""
+        self.handle_operator('**')
     
     def add_number(self, num):
         """Add number to display"""
-        current = self.display_var.get()
-        if current == "0" or current == "Error":
-            self.display_var.set(num)
-        else:
-            self.display_var.set(current + num)
+        if self.expression.digit(num):
+            self.update_display()
     
     def add_decimal(self):
         """Add decimal point"""
-        current = self.display_var.get()
-        if '.' not in current:
-            self.display_var.set(current + '.')
+        if self.expression.point():
+            self.update_display()
     
     def add_parenthesis(self, paren):
         """Add parenthesis"""
-        current = self.display_var.get()
-        if current == "0":
-            self.display_var.set(paren)
-        else:
-            self.display_var.set(current + paren)
+        accepted = self.expression.open() if paren == '(' else self.expression.close()
+        if accepted:
+            self.update_display()
     
     def handle_operator(self, operator):
         """Handle operator button clicks"""
         if self.display_var.get() == "Error":
             return
         
-        # Map symbols
-        op_map = {'÷': '/', '×': '*'}
-        op = op_map.get(operator, operator)
-        
-        if self.equation and not self.equation.endswith(' '):
-            self.calculate()
-        
-        self.equation = self.display_var.get() + ' ' + op + ' '
-        self.equation_label.config(text=self.equation)
-        self.display_var.set("0")
+        # Precedence is left to the expression buffer
+        if self.expression.operator(operator):
+            self.update_display()
+    
+    def on_key(self, event):
+        """Keyboard input: button keys, or characters typed into the expression"""
+        # The f(x) entry keeps its keys, and Control shortcuts are left alone
+        if self.editing(event.widget) or event.state & CONTROL_MASK:
+            return
+        label = KEY_BUTTONS.get(event.keysym) or KEY_BUTTONS.get(event.char)
+        if label is None:
+            if event.char:
+                self.type_text(event.char)
+        elif label in self.button_actions:
+            self.handle_button(label)
+        else:
+            self.handle_scientific(label)
+    
+    def on_paste(self, event=None):
+        """Paste the clipboard into the expression"""
+        if event is not None and self.editing(event.widget):
+            return
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return
+        consumed = self.type_text(text)
+        if consumed < len(text.rstrip()):
+            self.error_message.set(f"Error: Cannot paste from '{text[consumed:consumed + 12]}'")
+    
+    def editing(self, widget):
+        """Whether keys go to an editable entry (f(x), definitions, solve, calculus), not the keypad"""
+        return isinstance(widget, tk.Entry) and str(widget.cget('state')) == 'normal'
+    
+    def type_text(self, text):
+        """Feed typed or pasted text to the expression; returns the characters used"""
+        if self.scheduler.busy:
+            return 0
+        # Only touch the error label when there is something to clear
+        if self.error_message.get():
+            self.error_message.set("")
+        consumed = self.expression.feed(text)
+        if consumed:
+            self.update_display()
+        return consumed
+    
+    def update_display(self):
+        """Refresh the display on the next frame (many keys, one refresh)"""
+        if self.display_update is None:
+            self.display_update = self.root.after(DISPLAY_FRAME_MS, self.refresh_display)
+    
+    def cancel_display_update(self):
+        """Drop a pending refresh before the display is set directly"""
+        if self.display_update is not None:
+            self.root.after_cancel(self.display_update)
+            self.display_update = None
+    
+    def refresh_display(self):
+        """Show the expression, the current entry and the live preview"""
+        self.display_update = None
+        expression = self.expression
+        self.display_var.set(expression.entry)
+        # A shown '=' result keeps its finished expression above it
+        if expression.answered:
+            self.preview_var.set("")
+            return
+        self.equation_label.config(text=expression.text)
+        preview = expression.preview()
+        if preview is None or preview == expression.entry:
+            self.preview_var.set("")
+        else:
+            self.preview_var.set(f"= {preview}")
+    
+    def arithmetic(self):
+        """Number handling of the current angle and precision mode"""
+        return calc_expression.Arithmetic(self.is_degree, self.precision_mode, DECIMAL_PRECISION,
+                                          self.workspace.variables)
     
     def calculate(self):
         """Calculate the result"""
         self.error_message.set("")
-        try:
-            if self.equation:
-                parts = self.equation.strip().split(' ')
-                num1 = float(parts[0])
-                operator = parts[1]
-                num2 = float(self.display_var.get())
-                
-                # Error checking
-                if operator == '/' and num2 == 0:
-                    self.error_message.set("Error: Division by zero")
-                    self.display_var.set("Error")
-                    self.equation = ""
-                    self.equation_label.config(text="")
-                    return
-                
-                if operator == '%' and num2 == 0:
-                    self.error_message.set("Error: Modulo by zero")
-                    self.display_var.set("Error")
-                    self.equation = ""
-                    self.equation_label.config(text="")
-                    return
-                
-                # Calculate
-                if operator == '+':
-                    result = num1 + num2
-                elif operator == '-':
-                    result = num1 - num2
-                elif operator == '*':
-                    result = num1 * num2
-                elif operator == '/':
-                    result = num1 / num2
-                elif operator == '%':
-                    result = num1 % num2
-                elif operator == '**':
-                    result = num1 ** num2
-                else:
-                    result = num2
-                
-                # Format result
-                if result == int(result):
-                    result = int(result)
-                else:
-                    result = round(result, 10)
-                
-                # Add to history
-                history_entry = f"{num1} {operator} {num2} = {result}"
-                self.add_to_history(history_entry)
-                
-                self.display_var.set(str(result))
-                self.equation = ""
-                self.equation_label.config(text="")
+        expression = self.expression
+        if expression.is_empty() or expression.answered:
+            return
+        text = expression.finished_text
         
-        except Exception as e:
+        # Light expressions are already evaluated as typed; ones with a heavy
+        # step are replayed in a worker
+        heavy = expression.needs_worker()
+        if heavy:
+            compute = calc_expression.evaluate_keys
+            args = (expression.keys, self.is_degree, self.precision_mode, DECIMAL_PRECISION,
+                    self.workspace.variables, self.workspace.definitions())
+        else:
+            compute, args = expression.evaluate, ()
+        self.scheduler.run(
+            compute, args,
+            on_result=lambda outcome: self.finish_calculation(text, *outcome),
+            on_error=lambda error: self.fail_calculation(error),
+            heavy=heavy
+        )
+    
+    def finish_calculation(self, text, result, steps):
+        """Show an expression result"""
+        # Add to history (a bare number or function result has no steps)
+        if steps:
+            self.add_to_history(f"{text} = {result}")
+            self.store_steps(steps)
+        
+        self.expression.answer(result)
+        self.workspace.set_answer(result)
+        self.cancel_display_update()
+        self.display_var.set(result)
+        self.equation_label.config(text=f"{text} =" if steps else "")
+        self.preview_var.set("")
+    
+    def fail_calculation(self, error):
+        """Show an expression error"""
+        if isinstance(error, calc_expression.ExpressionError):
+            self.record_error(error.op, error.operands)
+        if isinstance(error, calc_engine.CalculationError):
+            self.error_message.set(f"Error: {error}")
+        else:
             self.error_message.set("Error: Invalid calculation")
-            self.display_var.set("Error")
-            self.equation = ""
-            self.equation_label.config(text="")
+        self.cancel_display_update()
+        self.display_var.set("Error")
+        self.expression.clear()
+        self.equation_label.config(text="")
+        self.preview_var.set("")
     
     def handle_scientific(self, func):
         """Handle scientific function buttons"""
         self.error_message.set("")
+        if self.scheduler.busy:
+            return
         try:
-            current = self.display_var.get()
-            
-            if func == 'π':
-                self.display_var.set(str(math.pi))
-                return
-            
-            if func == 'mod':
-                self.handle_operator('%')
-                return
-            
-            if func == 'x^y':
-                if self.equation and not self.equation.endswith(' '):
-                    self.calculate()
-                self.equation = self.display_var.get() + ' ** '
-                self.equation_label.config(text=self.equation + '^')
-                self.display_var.set("0")
+            # Buttons that edit the input rather than compute
+            action = self.scientific_actions.get(func)
+            if action is not None:
+                action()
                 return
             
-            num = float(current)
-            result = None
-            
-            # Error checking for specific functions
-            if func == '√' and num < 0:
-                self.error_message.set("Error: Square root of negative number")
-                self.display_var.set("Error")
-                return
+            # The function applies to the current operand of the expression
+            num = self.expression.operand()
             
-            if func in ['ln', 'log'] and num <= 0:
-                self.error_message.set("Error: Logarithm of non-positive number")
-                self.display_var.set("Error")
-                return
-            
-            if func == 'n!' and (num < 0 or num != int(num)):
-                self.error_message.set("Error: Factorial requires non-negative integer")
-                self.display_var.set("Error")
-                return
-            
-            # Calculate scientific functions
-            if func == 'sin':
-                angle = math.radians(num) if self.is_degree else num
-                result = math.sin(angle)
-                # Plot sine curve if graph is visible
-                if self.show_graph:
-                    self.plot_sine_curve(num, result)
-            elif func == 'cos':
-                angle = math.radians(num) if self.is_degree else num
-                result = math.cos(angle)
-            elif func == 'tan':
-                angle = math.radians(num) if self.is_degree else num
-                result = math.tan(angle)
-            elif func == '√':
-                result = math.sqrt(num)
-            elif func == '∛':
-                result = num ** (1/3)
-            elif func == 'ln':
-                result = math.log(num)
-            elif func == 'log':
-                result = math.log10(num)
-            elif func == 'x²':
-                result = num ** 2
-            elif func == '|x|':
-                result = abs(num)
-            elif func == 'n!':
-                result = math.factorial(int(num))
-            elif func == '%':
-                result = num / 100
-            elif func == '+/-':
-                result = -num
-            
-            if result is not None:
-                # Format result
-                if result == int(result):
-                    result = int(result)
-                else:
-                    result = round(result, 10)
-                
-                # Add to history
-                history_entry = f"{func}({num}) = {result}"
-                self.add_to_history(history_entry)
-                
-                self.display_var.set(str(result))
+            # Memoized engine dispatch inline; heavy work in a worker process.
+            # The cache only holds float results.
+            heavy = calc_worker.is_heavy(func, (num,), display=self.precision_mode == 'float',
+                                         is_degree=self.is_degree)
+            if self.precision_mode != 'float':
+                compute = _load('calc_precision').evaluate_function
+                args = (func, num, self.is_degree, self.precision_mode, DECIMAL_PRECISION)
+            else:
+                compute = calc_worker.evaluate_function if heavy else self.scientific_cache.compute
+                args = (func, num, self.is_degree)
+            self.scheduler.run(
+                compute, args,
+                on_result=lambda result: self.finish_scientific(func, num, result),
+                on_error=lambda error: self.fail_scientific(func, num, error),
+                heavy=heavy
+            )
         
         except Exception as e:
             self.error_message.set(f"Error: Invalid operation")
+            self.cancel_display_update()
             self.display_var.set("Error")
     
+    def finish_scientific(self, func, num, result):
+        """Show a scientific function result"""
+        # Plot the function's curve if graph is visible
+        if self.show_graph and _load('calc_plot').can_plot(func):
+            self.plot_function(func, num, result)
+        
+        # Add to history
+        history_entry = f"{func}({num}) = {result}"
+        self.add_to_history(history_entry, func, (num,), result)
+        
+        # The result replaces the operand in the expression
+        self.expression.apply(func, str(result))
+        self.workspace.set_answer(result)
+        self.update_display()
+    
+    def fail_scientific(self, func, num, error):
+        """Show a scientific function error"""
+        self.record_error(func, (num,))
+        if isinstance(error, calc_engine.CalculationError):
+            self.error_message.set(f"Error: {error}")
+        else:
+            self.error_message.set("Error: Invalid operation")
+        self.cancel_display_update()
+        self.display_var.set("Error")
+    
+    def set_busy(self, busy):
+        """Pending indicator while a background calculation runs"""
+        if busy:
+            self.cancel_display_update()
+            self.display_var.set("…")
+    
     def clear(self):
-        """Clear display and equation"""
-        self.display_var.set("0")
-        self.equation = ""
-        self.equation_label.config(text="")
+        """Clear display and expression"""
+        self.scheduler.cancel()
+        self.expression.clear()
+        self.update_display()
         self.error_message.set("")
     
     def backspace(self):
-        """Remove last character"""
-        current = self.display_var.get()
-        if len(current) > 1 and current != "Error":
-            self.display_var.set(current[:-1])
-        else:
-            self.display_var.set("0")
+        """Undo the last key"""
+        self.expression.backspace()
+        self.update_display()
     
     def toggle_degree_radian(self):
         """Toggle between degree and radian mode"""
         self.is_degree = not self.is_degree
         self.deg_rad_btn.config(text="DEG" if self.is_degree else "RAD")
+        self.expression.set_arithmetic(self.arithmetic())
+        self.update_display()
+    
+    def toggle_precision_mode(self):
+        """Cycle between float, decimal and exact arithmetic"""
+        modes = list(PRECISION_MODES)
+        self.precision_mode = modes[(modes.index(self.precision_mode) + 1) % len(modes)]
+        if self.precision_mode != 'float':
+            _load('calc_precision')
+        self.precision_btn.config(text=PRECISION_MODES[self.precision_mode])
+        # What has been typed is re-read in the new mode
+        self.expression.set_arithmetic(self.arithmetic())
+        self.update_display()
+    
+    def define(self):
+        """Define the variable or function typed in the definitions bar"""
+        self.error_message.set("")
+        text = self.definition.get().strip()
+        if not text:
+            return
+        try:
+            self.workspace.define(text, self.is_degree)
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
+            return
+        except OSError:
+            self.error_message.set("Error: Definitions could not be saved")
+        self.definition.set("")
+        self.names_changed()
+    
+    def remove_name(self, name):
+        """Delete a variable or function"""
+        try:
+            self.workspace.remove(name)
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
+            return
+        except OSError:
+            self.error_message.set("Error: Definitions could not be saved")
+        self.names_changed()
+    
+    def names_changed(self):
+        """Re-read the expression and drop curves computed with old definitions"""
+        if 'calc_plot' in _loaded:
+            _loaded['calc_plot'].calc_sampling.clear_cache()
+            for plot in self.plots.values():
+                plot.invalidate()
+            # The curve on screen is resampled now, the others when shown
+            if self.show_graph and self.active_plot is not None and self.active_plot.function:
+                try:
+                    self.active_plot.plot(self.active_plot.function)
+                except calc_engine.CalculationError:
+                    # A removed function: the old curve stays until the next plot
+                    pass
+        self.expression.set_arithmetic(self.arithmetic())
+        self.update_display()
+    
+    def update_names_menu(self):
+        """Fill the Names menu: insert a name, or remove one"""
+        menu = self.names_menu
+        menu.delete(0, 'end')
+        variables, functions = self.workspace.names()
+        for name in variables:
+            value = calc_engine.display_string(self.workspace.variables[name])
+            menu.add_command(label=f"{name} = {value}", command=lambda n=name: self.insert_name(n))
+        if variables and functions:
+            menu.add_separator()
+        for name in functions:
+            menu.add_command(label=self.workspace.functions[name].source,
+                             command=lambda n=name: self.insert_name(n))
+        removable = [name for name in variables + functions if name != calc_variables.ANSWER]
+        if removable:
+            remove_menu = tk.Menu(menu, tearoff=0)
+            for name in removable:
+                remove_menu.add_command(label=name, command=lambda n=name: self.remove_name(n))
+            menu.add_separator()
+            menu.add_cascade(label="Remove", menu=remove_menu)
+        if not (variables or functions):
+            menu.add_command(label="Nothing defined yet", state='disabled')
     
-    def add_to_history(self, entry):
+    def solve(self):
+        """Find every root of the solve bar's equation in its interval"""
+        self.error_message.set("")
+        text = self.solve_equation.get().strip()
+        if not text:
+            return
+        solver = _load('calc_solver')
+        variables = self.workspace.variables
+        try:
+            low, high = float(self.solve_low.get()), float(self.solve_high.get())
+            equation = solver.parse_equation(text, variables)
+            roots = solver.solve(equation, low, high, self.is_degree, variables=variables)
+        except ValueError:
+            self.error_message.set("Error: Invalid interval")
+            return
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
+            return
+        if not roots:
+            self.error_message.set(f"Error: No roots in [{low:g}, {high:g}]")
+            return
+        
+        unknown = equation[1]
+        shown = [calc_engine.display_string(root) for root in roots]
+        entry = f"{text}: {unknown} = {', '.join(shown[:SOLVE_SHOWN_ROOTS])}"
+        if len(roots) > SOLVE_SHOWN_ROOTS:
+            entry += f" … ({len(roots)} roots)"
+        self.add_to_history(entry)
+        
+        # The first root is the result
+        self.show_answer(shown[0], roots[0], f"{text}: {unknown} =")
+    
+    def integrate(self):
+        """Integrate the calculus bar's expression from a to b"""
+        self.error_message.set("")
+        text = self.calculus_expression.get().strip()
+        if not text:
+            return
+        calculus = _load('calc_calculus')
+        variables = self.workspace.variables
+        try:
+            low, high = float(self.calculus_low.get()), float(self.calculus_high.get())
+            expression = calculus.parse_expression(text, variables)
+            result = calculus.integrate(expression, low, high, self.is_degree, variables=variables)
+        except ValueError:
+            self.error_message.set("Error: Invalid bounds")
+            return
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
+            return
+        
+        unknown = expression[1]
+        value = calc_engine.display_string(result.value)
+        label = f"∫ {text} d{unknown} from {low:g} to {high:g}"
+        self.add_to_history(f"{label} = {value} ± {result.error:.1e}")
+        self.show_answer(value, result.value, f"{label} (± {result.error:.1e}) =")
+        
+        # Shade the area under the curve
+        if self.show_graph:
+            try:
+                self.current_plot().shade(text, low, high)
+            except calc_engine.CalculationError:
+                # Expressions with user variables have no curve
+                pass
+    
+    def differentiate(self):
+        """Differentiate the calculus bar's expression at a"""
+        self.error_message.set("")
+        text = self.calculus_expression.get().strip()
+        if not text:
+            return
+        calculus = _load('calc_calculus')
+        variables = self.workspace.variables
+        try:
+            x = float(self.calculus_low.get())
+            expression = calculus.parse_expression(text, variables)
+            result = calculus.differentiate(expression, x, self.is_degree, variables=variables)
+        except ValueError:
+            self.error_message.set("Error: Invalid point")
+            return
+        except calc_engine.CalculationError as e:
+            self.error_message.set(f"Error: {e}")
+            return
+        
+        compiled, unknown = expression
+        value = calc_engine.display_string(result.value)
+        label = f"d/d{unknown} {text} at {unknown} = {x:g}"
+        self.add_to_history(f"{label}: {value} ± {result.error:.1e}")
+        self.show_answer(value, result.value, f"{label} (± {result.error:.1e}):")
+        
+        # Draw the tangent line at the point
+        if self.show_graph:
+            try:
+                y = calc_engine.evaluate(compiled, self.is_degree, **{**variables, unknown: x})
+                self.current_plot().tangent(text, x, y, result.value,
+                                            f"f′({x:.2f}) = {result.value:.4f}")
+            except calc_engine.CalculationError:
+                # Expressions with user variables have no curve
+                pass
+    
+    def show_answer(self, text, value, label):
+        """Show a result computed outside the expression, ready for further calculation"""
+        self.expression.answer(text)
+        self.workspace.set_answer(value)
+        self.cancel_display_update()
+        self.display_var.set(text)
+        self.equation_label.config(text=label)
+        self.preview_var.set("")
+    
+    def insert_name(self, name):
+        """Put a variable, or the start of a user function call, into the expression"""
+        if self.scheduler.busy:
+            return
+        if name in self.workspace.functions:
+            accepted = self.expression.open(name)
+        else:
+            accepted = self.expression.constant(name)
+        if accepted:
+            self.update_display()
+    
+    def add_to_history(self, entry, op=None, operands=(), result=None):
         """Add calculation to history"""
-        self.history.insert(0, entry)
-        if len(self.history) > 50:
-            self.history.pop()
+        evicted = self.history.add(entry)
         
-        self.update_history_display()
+        # Write through to the persistent store
+        if self.history_store is not None and op is not None:
+            self.history_store.append(op, operands, result)
+            self.history_loaded += 1
+        
+        # Patch the widget: new line on top, evicted line off the bottom
+        self.history_text.config(state='normal')
+        self.history_text.insert('1.0', entry + '\n')
+        if evicted is not None:
+            self.history_text.delete('end-2l', 'end-1l')
+        self.history_text.config(state='disabled')
+    
+    def store_steps(self, steps):
+        """Write each operation of an evaluated expression to the persistent store"""
+        if self.history_store is None:
+            return
+        for op, operands, result in steps:
+            self.history_store.append(op, operands, result)
+            self.history_loaded += 1
     
     def update_history_display(self):
-        """Update history text widget"""
+        """Rebuild history text widget from the buffer"""
         self.history_text.config(state='normal')
         self.history_text.delete(1.0, tk.END)
         for entry in self.history:
@@ -579,14 +1156,346 @@ class ScientificCalculator:
     def clear_history(self):
         """Clear calculation history"""
         self.history.clear()
+        # The persistent audit trail is kept; just stop paging it back in
+        if self.history_store is not None:
+            self.history_loaded = len(self.history_store)
         self.update_history_display()
+    
+    def record_error(self, op, operands):
+        """Record a failed calculation in the persistent store"""
+        if self.history_store is not None:
+            self.history_store.append(op, operands, None, error=True)
+            self.history_loaded += 1
+    
+    def load_history_page(self):
+        """Page older entries from the persistent store into the History panel"""
+        self.history_page_pending = False
+        if self.history_store is None:
+            return
+        room = self.history.capacity - len(self.history)
+        records = self.history_store.page(self.history_loaded, min(HISTORY_PAGE_SIZE, room))
+        if not records:
+            return
+        
+        entries = [calc_history.format_record(record) for record in records]
+        self.history.extend_older(entries)
+        self.history_loaded += len(records)
+        
+        self.history_text.config(state='normal')
+        self.history_text.insert(tk.END, ''.join(entry + '\n' for entry in entries))
+        self.history_text.config(state='disabled')
+    
+    def on_history_scroll(self, first, last):
+        """Scrollbar update; load the next page when the bottom is visible"""
+        self.history_text.vbar.set(first, last)
+        if float(last) >= 1.0 and not self.history_page_pending:
+            self.history_page_pending = True
+            self.root.after_idle(self.load_history_page)
+    
+    def toggle_timing(self):
+        """Switch the handler timers on or off"""
+        if self.instrumentation is None:
+            self.instrumentation = _load('calc_profile').Instrumentation(
+                self, INSTRUMENTED_HANDLERS, tables=[self.button_actions])
+        if self.instrumentation.enabled:
+            self.instrumentation.disable()
+        else:
+            self.instrumentation.enable()
+        if self.diagnostics_window is not None:
+            self.timing_btn.config(
+                text="Timing: ON" if self.instrumentation.enabled else "Timing: OFF")
+    
+    def toggle_profiler(self, kind):
+        """Start a session profile of the given kind, or stop the running one"""
+        profiler = self.profiler
+        if profiler is not None and profiler.running:
+            profiler.stop()
+            self.diagnostics_status.set(f"{profiler.kind} profile stopped")
+            if profiler.kind == _load('calc_profile').PROFILERS[kind].kind:
+                return
+        self.profiler = _load('calc_profile').PROFILERS[kind]()
+        self.profiler.start()
+        self.diagnostics_status.set(f"{self.profiler.kind} profile running")
+    
+    def cache_stats(self):
+        """Counters of the result and curve caches"""
+        caches = {'scientific': self.scientific_cache.stats()}
+        # The curve cache exists once the plotting stack has finished loading
+        if 'calc_plot' in _loaded:
+            caches['curve'] = _loaded['calc_plot'].calc_sampling.cache_stats()
+        return caches
+    
+    def toggle_stats(self):
+        """Show or hide the statistics window"""
+        if self.stats_window is not None:
+            self.stats_window.destroy()
+            self.stats_window = None
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Statistics")
+        window.configure(bg='#1a1a2e')
+        window.protocol('WM_DELETE_WINDOW', self.toggle_stats)
+        self.stats_window = window
+        
+        button_frame = tk.Frame(window, bg='#1a1a2e')
+        button_frame.pack(fill='x', padx=5, pady=5)
+        for text, command in [
+            ("Summarize", self.summarize_stats),
+            ("Load File…", self.load_stats_file),
+        ]:
+            tk.Button(
+                button_frame,
+                text=text,
+                font=('Arial', 9, 'bold'),
+                bg='#4a4e69',
+                fg='#ffffff',
+                command=command
+            ).pack(side='left', padx=2)
+        
+        self.stats_quantiles = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            button_frame,
+            text="Quantiles",
+            variable=self.stats_quantiles,
+            font=('Arial', 9),
+            bg='#1a1a2e',
+            fg='#ffffff',
+            selectcolor='#16213e'
+        ).pack(side='left', padx=2)
+        
+        # Columns (1-based); blank: every number is a value, x is the row number
+        self.stats_column = tk.StringVar(value="")
+        self.stats_x_column = tk.StringVar(value="")
+        for label, variable in (("Column", self.stats_column), ("x column", self.stats_x_column)):
+            tk.Label(button_frame, text=label, font=('Arial', 9), bg='#1a1a2e', fg='#ffffff').pack(side='left')
+            tk.Entry(
+                button_frame,
+                textvariable=variable,
+                font=('Arial', 9),
+                width=4,
+                bg='#16213e',
+                fg='#ffffff',
+                insertbackground='#ffffff'
+            ).pack(side='left', padx=2)
+        
+        self.stats_status = tk.StringVar(value="Type or paste numbers, or load a text/CSV file")
+        tk.Label(
+            window,
+            textvariable=self.stats_status,
+            font=('Arial', 9),
+            bg='#1a1a2e',
+            fg='#a8a8ff',
+            anchor='w'
+        ).pack(fill='x', padx=5)
+        
+        self.stats_text = scrolledtext.ScrolledText(
+            window,
+            font=('Courier', 9),
+            bg='#16213e',
+            fg='#ffffff',
+            insertbackground='#ffffff',
+            width=50,
+            height=20
+        )
+        self.stats_text.pack(padx=5, pady=5, fill='both', expand=True)
+    
+    def stats_columns(self):
+        """(column, x column) of the statistics window, None where blank"""
+        return tuple(int(text) if text else None
+                     for text in (self.stats_column.get().strip(), self.stats_x_column.get().strip()))
+    
+    def summarize_stats(self):
+        """Summarize the numbers typed or pasted into the statistics window"""
+        try:
+            column, x_column = self.stats_columns()
+            summary = _load('calc_stats').summarize_text(self.stats_text.get('1.0', tk.END),
+                                                  column, x_column, self.stats_quantiles.get())
+        except ValueError:
+            self.stats_status.set("Columns must be whole numbers")
+            return
+        except calc_engine.CalculationError as e:
+            self.stats_status.set(str(e))
+            return
+        self.finish_stats(summary)
+    
+    def load_stats_file(self):
+        """Summarize a text/CSV file in the background, reading it in chunks"""
+        if self.scheduler.busy:
+            return
+        try:
+            column, x_column = self.stats_columns()
+        except ValueError:
+            self.stats_status.set("Columns must be whole numbers")
+            return
+        path = filedialog.askopenfilename(
+            parent=self.stats_window,
+            title="Summarize file",
+            filetypes=[("Text and CSV", "*.csv *.tsv *.txt *.dat"), ("All files", "*")]
+        )
+        if not path:
+            return
+        self.stats_status.set(f"Reading {os.path.basename(path)}…")
+        # Files may be many GB: a worker process reads them so the UI stays live
+        self.scheduler.run(
+            _load('calc_stats').summarize_file,
+            (path, column, x_column, self.stats_quantiles.get()),
+            on_result=self.finish_stats,
+            on_error=self.fail_stats,
+            heavy=True
+        )
+    
+    def finish_stats(self, summary):
+        """Write a summary to the history; its mean becomes the result"""
+        # Entries go on top of the history, so the heading is added last
+        for line in reversed(summary.lines()):
+            self.add_to_history(line)
+        stats = summary.stats
+        if self.stats_window is not None:
+            skipped = f", {summary.skipped} skipped" if summary.skipped else ""
+            self.stats_status.set(f"{summary.source}: {stats.count} values{skipped}")
+        if not stats.count:
+            self.update_display()
+            return
+        self.show_answer(calc_engine.display_string(stats.mean), stats.mean,
+                         f"mean of {summary.source} =")
+    
+    def fail_stats(self, error):
+        """Report a file that could not be summarized"""
+        if isinstance(error, OSError):
+            message = f"Cannot read file: {error.strerror or error}"
+        elif isinstance(error, calc_engine.CalculationError):
+            message = str(error)
+        else:
+            message = "Invalid data"
+        if self.stats_window is not None:
+            self.stats_status.set(message)
+        self.error_message.set(f"Error: {message}")
+        self.update_display()
+    
+    def toggle_diagnostics(self, event=None):
+        """Show or hide the diagnostics panel"""
+        if self.diagnostics_window is not None:
+            self.root.after_cancel(self.diagnostics_refresh)
+            self.diagnostics_window.destroy()
+            self.diagnostics_window = None
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.configure(bg='#1a1a2e')
+        window.protocol('WM_DELETE_WINDOW', self.toggle_diagnostics)
+        self.diagnostics_window = window
+        
+        button_frame = tk.Frame(window, bg='#1a1a2e')
+        button_frame.pack(fill='x', padx=5, pady=5)
+        timing_on = self.instrumentation is not None and self.instrumentation.enabled
+        self.timing_btn = tk.Button(
+            button_frame,
+            text="Timing: ON" if timing_on else "Timing: OFF",
+            font=('Arial', 9, 'bold'),
+            bg='#4a4e69',
+            fg='#ffffff',
+            command=self.toggle_timing
+        )
+        self.timing_btn.pack(side='left', padx=2)
+        for text, command in [
+            ("cProfile", lambda: self.toggle_profiler('cprofile')),
+            ("Sampling", lambda: self.toggle_profiler('sampling')),
+            ("Reset", self.reset_diagnostics),
+            ("Export", self.export_diagnostics),
+        ]:
+            tk.Button(
+                button_frame,
+                text=text,
+                font=('Arial', 9, 'bold'),
+                bg='#4a4e69',
+                fg='#ffffff',
+                command=command
+            ).pack(side='left', padx=2)
+        
+        self.diagnostics_status = tk.StringVar(value="")
+        tk.Label(
+            window,
+            textvariable=self.diagnostics_status,
+            font=('Arial', 9),
+            bg='#1a1a2e',
+            fg='#a8a8ff',
+            anchor='w'
+        ).pack(fill='x', padx=5)
+        
+        self.diagnostics_text = scrolledtext.ScrolledText(
+            window,
+            font=('Courier', 9),
+            bg='#16213e',
+            fg='#ffffff',
+            width=80,
+            height=30,
+            state='disabled'
+        )
+        self.diagnostics_text.pack(padx=5, pady=5, fill='both', expand=True)
+        self.refresh_diagnostics()
+    
+    def diagnostics_report(self):
+        """Text shown in the diagnostics panel"""
+        timings = self.instrumentation.summary() if self.instrumentation is not None else {}
+        report = _load('calc_profile').format_report(timings, self.cache_stats())
+        # Profiles are read once stopped (reading stops a cProfile run)
+        if self.profiler is not None and not self.profiler.running:
+            report += f"\n\n{self.profiler.kind} profile\n{self.profiler.report()}"
+        return report
+    
+    def refresh_diagnostics(self):
+        """Redraw the diagnostics panel while it is open"""
+        if self.diagnostics_window is None:
+            return
+        self.diagnostics_text.config(state='normal')
+        self.diagnostics_text.delete(1.0, tk.END)
+        self.diagnostics_text.insert(tk.END, self.diagnostics_report())
+        self.diagnostics_text.config(state='disabled')
+        self.diagnostics_refresh = self.root.after(DIAGNOSTICS_REFRESH_MS, self.refresh_diagnostics)
+    
+    def reset_diagnostics(self):
+        """Zero the timers and drop the last profile"""
+        if self.instrumentation is not None:
+            self.instrumentation.reset()
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+        self.profiler = None
+        self.diagnostics_status.set("")
+    
+    def export_diagnostics(self):
+        """Write timings, cache stats and the last profile to the home folder"""
+        timings = self.instrumentation.summary() if self.instrumentation is not None else {}
+        profiler = self.profiler if self.profiler is not None and not self.profiler.running else None
+        path = os.path.join(os.path.expanduser('~'),
+                            time.strftime('calculator-diagnostics-%Y%m%d-%H%M%S.json'))
+        try:
+            written = _load('calc_profile').export(path, timings, self.cache_stats(), profiler)
+        except OSError as e:
+            self.diagnostics_status.set(f"Export failed: {e}")
+            return
+        self.diagnostics_status.set("Exported " + ", ".join(written))
 
 
 def main():
     """Main function to run the calculator"""
+    # Any command-line arguments select the headless batch mode
+    if len(sys.argv) > 1:
+        import calc_cli
+        sys.exit(calc_cli.main(sys.argv[1:]))
+    
+    # Plugin modules (comma-separated) may register extra functions
+    for plugin in os.environ.get('CALCULATOR_PLUGINS', '').split(','):
+        if plugin.strip():
+            calc_engine.REGISTRY.load_plugin(plugin.strip())
+    
     root = tk.Tk()
     app = ScientificCalculator(root)
     root.mainloop()
+    app.scheduler.shutdown()
+    if app.history_store is not None:
+        app.history_store.close()
 
 
 if __name__ == "__main__":
@@ -15,6 +15,12 @@ Features:
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import math
+import calc_engine
+
+# Pending operation (equation operator) -> compiled engine expression
+OPERATION_EXPRESSIONS = {
+    op: calc_engine.compile(f"a {op} b") for op in calc_engine.OPERATORS
+}
 
 class ScientificCalculator:
     def __init__(window, root):
@@ -303,42 +309,19 @@ class ScientificCalculator:
                 operator = parts[1]
                 num2 = float(window.display_var.get())
                 
-                # Error checking
-                if operator == '/' and num2 == 0:
-                    window.error_message.set("Error: Division by zero")
+                # Evaluate through the expression engine
+                try:
+                    result = calc_engine.evaluate(OPERATION_EXPRESSIONS[operator],
+                                                  a=num1, b=num2)
+                except calc_engine.CalculationError as e:
+                    window.error_message.set(f"Error: {e}")
                     window.display_var.set("Error")
                     window.equation = ""
                     window.equation_label.config(text="")
                     return
                 
-                if operator == '%' and num2 == 0:
-                    window.error_message.set("Error: Modulo by zero")
-                    window.display_var.set("Error")
-                    window.equation = ""
-                    window.equation_label.config(text="")
-                    return
-                
-                # Calculate
-                if operator == '+':
-                    result = num1 + num2
-                elif operator == '-':
-                    result = num1 - num2
-                elif operator == '*':
-                    result = num1 * num2
-                elif operator == '/':
-                    result = num1 / num2
-                elif operator == '%':
-                    result = num1 % num2
-                elif operator == '**':
-                    result = num1 ** num2
-                else:
-                    result = num2
-                
                 # Format result
-                if result == int(result):
-                    result = int(result)
-                else:
-                    result = round(result, 10)
+                result = calc_engine.format_result(result)
                 
                 # Add to history
                 history_entry = f"{num1} {operator} {num2} = {result}"
@@ -379,57 +362,17 @@ class ScientificCalculator:
             num = float(current)
             result = None
             
-            # Error checking for specific functions
-            if func == '√' and num < 0:
-                window.error_message.set("Error: Square root of negative number")
+            # Calculate scientific function through the expression engine
+            try:
+                result = calc_engine.apply_function(func, num, window.is_degree)
+            except calc_engine.CalculationError as e:
+                window.error_message.set(f"Error: {e}")
                 window.display_var.set("Error")
                 return
             
-            if func in ['ln', 'log'] and num <= 0:
-                window.error_message.set("Error: Logarithm of non-positive number")
-                window.display_var.set("Error")
-                return
-            
-            if func == 'n!' and (num < 0 or num != int(num)):
-                window.error_message.set("Error: Factorial requires non-negative integer")
-                window.display_var.set("Error")
-                return
-            
-            # Calculate scientific functions
-            if func == 'sin':
-                angle = math.radians(num) if window.is_degree else num
-                result = math.sin(angle)
-            elif func == 'cos':
-                angle = math.radians(num) if window.is_degree else num
-                result = math.cos(angle)
-            elif func == 'tan':
-                angle = math.radians(num) if window.is_degree else num
-                result = math.tan(angle)
-            elif func == '√':
-                result = math.sqrt(num)
-            elif func == '∛':
-                result = num ** (1/3)
-            elif func == 'ln':
-                result = math.log(num)
-            elif func == 'log':
-                result = math.log10(num)
-            elif func == 'x²':
-                result = num ** 2
-            elif func == '|x|':
-                result = abs(num)
-            elif func == 'n!':
-                result = math.factorial(int(num))
-            elif func == '%':
-                result = num / 100
-            elif func == '+/-':
-                result = -num
-            
             if result is not None:
                 # Format result
-                if result == int(result):
-                    result = int(result)
-                else:
-                    result = round(result, 10)
+                result = calc_engine.format_result(result)
                 
                 # Add to history
                 history_entry = f"{func}({num}) = {result}"